@@ -1,30 +1,836 @@
-from flask import Flask, request, jsonify
-import importlib.util
+from flask import Flask, request, jsonify, Response, stream_with_context
+import codecs
+import functools
+import json
+import math
 import os
+import sys
+import uuid
 
-# Caminho absoluto para o script
-script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cultivation-dashboard-streamlit.py')
+# Garante que o núcleo do simulador seja importável mesmo quando a API é iniciada de outro diretório
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-spec = importlib.util.spec_from_file_location('cultivation_dashboard_streamlit', script_path)
-cds = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(cds)
+from simulador_cultivo import (SetupInvestimento, ParametrosCiclo, CustosMercado, SimuladorCultivoCompleto, SimuladorLote,
+                               CAMPOS_RESULTADO, serializar_resultado)
+from cache_resultados import cache_do_ambiente, chave_canonica
+from jobs import gerenciador_do_ambiente, CONCLUIDO, ESTADOS_FINAIS, FilaCheia as FilaJobsCheia
+from metricas import metricas_do_ambiente, instrumentar, coletor_cache
+import perfilamento
 
-SetupInvestimento = cds.SetupInvestimento
-ParametrosCiclo = cds.ParametrosCiclo
-CustosMercado = cds.CustosMercado
-SimuladorCultivoCompleto = cds.SimuladorCultivoCompleto
+# Quantidade de cenários acumulados antes de cada avaliação vetorizada no endpoint em lote
+TAMANHO_BLOCO = 1024
+TAMANHO_LEITURA = 64 * 1024
+# Limite de sorteios aceitos pela rota síncrona de Monte Carlo
+MAX_AMOSTRAS_MONTE_CARLO = 5_000_000
+# Limite de salas de uma instalação (somando os `count` de cada sala)
+MAX_SALAS_INSTALACAO = 100_000
 
 app = Flask(__name__)
+cache = cache_do_ambiente()
+metricas = metricas_do_ambiente()
+instrumentar(app, metricas)
+metricas.coletor(coletor_cache(cache))
+perfilador = perfilamento.perfilador_do_ambiente()
+perfilamento.instrumentar(app, perfilador)
 
 @app.route('/api/calculate', methods=['POST'])
 def calculate():
-    data = request.json
-    setup = SetupInvestimento(**data['setup'])
-    ciclo = ParametrosCiclo(**data['cycle'])
-    mercado = CustosMercado(**data['market'])
+    """Resultados de um cenário; `?format=compact` devolve só as métricas com chaves estáveis."""
+    with metricas.etapa('desserializacao'):
+        data = request.get_json(silent=True)
+    try:
+        setup, ciclo, mercado = _validar_cenario(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
     simulador = SimuladorCultivoCompleto(setup, ciclo, mercado)
-    resultados = simulador.simular()
-    return jsonify(resultados)
+    chave = chave_canonica(setup, ciclo, mercado)
+
+    if request.args.get('format') == 'compact':
+        def calcular_compacto():
+            with metricas.etapa('motor'):
+                resultado = simulador.calcular()
+            with metricas.etapa('serializacao'):
+                return serializar_resultado(resultado)
+
+        # O cache guarda o próprio texto JSON, então um acerto não serializa nada
+        return Response(cache.obter_ou_calcular(chave + ':compacto', calcular_compacto), mimetype='application/json')
+
+    def calcular():
+        with metricas.etapa('motor'):
+            return simulador.simular()
+
+    resultados = cache.obter_ou_calcular(chave, calcular)
+    with metricas.etapa('serializacao'):
+        return jsonify(resultados)
+
+@app.route('/api/lighting', methods=['POST'])
+def lighting():
+    """PPF, potência, DLI e altura recomendada para uma ou muitas tendas (campos escalares ou listas).
+
+    Potências acima da última linha da tabela não têm altura recomendada: as alturas saem como null.
+    """
+    return _responder(_executar_iluminacao)
+
+@app.route('/api/lighting/map', methods=['POST'])
+def lighting_map():
+    """Mapa de PPFD no dossel de uma tenda e métricas de uniformidade."""
+    return _responder(_executar_mapa_iluminacao)
+
+# --- ANÁLISES (também executáveis como jobs) ---
+# Cada `_executar_*` recebe o corpo JSON da requisição e um callback opcional
+# de progresso; erros de validação saem como TypeError/ValueError.
+
+def _executar_sensibilidade(data, progresso=None):
+    # Importado sob demanda para não carregar o NumPy na inicialização do worker
+    from sensibilidade import analisar_sensibilidade
+
+    setup, ciclo, mercado = _validar_cenario(data)
+    return analisar_sensibilidade(setup, ciclo, mercado, float(data.get('variation', 0.10)))
+
+def _executar_monte_carlo(data, progresso=None):
+    from monte_carlo import simular_monte_carlo, TAMANHO_BLOCO, MIN_TAMANHO_BLOCO, MAX_TAMANHO_BLOCO, MAX_WORKERS
+
+    setup, ciclo, mercado = _validar_cenario(data)
+    distribuicoes = data.get('distributions')
+    if not isinstance(distribuicoes, dict) or not distribuicoes:
+        raise ValueError("Campo 'distributions' ausente ou vazio.")
+    num_amostras = int(data.get('samples', 100_000))
+    if not 0 < num_amostras <= MAX_AMOSTRAS_MONTE_CARLO:
+        raise ValueError(f"'samples' deve estar entre 1 e {MAX_AMOSTRAS_MONTE_CARLO}.")
+    tamanho_bloco = int(data.get('chunk_size', TAMANHO_BLOCO))
+    if not MIN_TAMANHO_BLOCO <= tamanho_bloco <= MAX_TAMANHO_BLOCO:
+        raise ValueError(f"'chunk_size' deve estar entre {MIN_TAMANHO_BLOCO} e {MAX_TAMANHO_BLOCO}.")
+    workers = data.get('workers')
+    if workers is not None and not 1 <= int(workers) <= MAX_WORKERS:
+        raise ValueError(f"'workers' deve estar entre 1 e {MAX_WORKERS}.")
+    semente = data.get('seed')
+    return simular_monte_carlo(
+        setup, ciclo, mercado, distribuicoes, num_amostras,
+        semente=int(semente) if semente is not None else None,
+        tamanho_bloco=tamanho_bloco,
+        workers=int(workers) if workers is not None else None,
+        progresso=progresso,
+    )
+
+def _executar_otimizacao(data, progresso=None):
+    from otimizador import Otimizador, Restricoes, Acoplamentos
+
+    setup, ciclo, mercado = _validar_cenario(data)
+    restricoes = data.get('constraints') or {}
+    acoplamentos = data.get('coupling') or {}
+    faixas = {nome: tuple(faixa) for nome, faixa in (data.get('ranges') or {}).items()}
+    for nome, faixa in faixas.items():
+        if len(faixa) != 3:
+            raise ValueError(f"Faixa de '{nome}' deve ser [min, max, passo].")
+    variaveis = data.get('variables', ['potencia_watts', 'num_plantas'])
+    if not isinstance(variaveis, list) or not all(isinstance(v, str) for v in variaveis):
+        raise ValueError("'variables' deve ser uma lista de nomes de campos.")
+    otimizador = Otimizador(
+        setup, ciclo, mercado,
+        variaveis=variaveis,
+        objetivo=data.get('objective', 'roi_investimento_1_ano'),
+        restricoes=Restricoes(
+            orcamento_max=restricoes.get('budget_max'),
+            kwh_max_ciclo=restricoes.get('kwh_max_cycle'),
+            plantas_max=restricoes.get('plants_max'),
+            plantas_por_m2_max=restricoes.get('plants_per_m2_max'),
+        ),
+        acoplamentos=Acoplamentos(
+            custo_iluminacao_por_watt=acoplamentos.get('lighting_cost_per_watt'),
+            gramas_por_watt_max=acoplamentos.get('max_grams_per_watt'),
+        ),
+        faixas=faixas,
+    )
+    return otimizador.otimizar(progresso=progresso)
+
+def _executar_inverso(data, progresso=None):
+    from solucionador_inverso import SolucionadorInverso, PONTOS_CURVA
+
+    setup, ciclo, mercado = _validar_cenario(data)
+    if 'target' not in data:
+        raise ValueError("Campo 'target' ausente.")
+    campos = data.get('fields')
+    if not isinstance(campos, list) or len(campos) not in (1, 2):
+        raise ValueError("'fields' deve listar um ou dois campos.")
+    faixas = {nome: tuple(faixa) for nome, faixa in (data.get('ranges') or {}).items()}
+    for nome, faixa in faixas.items():
+        if len(faixa) != 3:
+            raise ValueError(f"Faixa de '{nome}' deve ser [min, max, passo].")
+    solucionador = SolucionadorInverso(setup, ciclo, mercado, meta=data.get('metric', 'periodo_payback_ciclos'), faixas=faixas)
+    if len(campos) == 1:
+        resultado = solucionador.resolver(campos[0], data['target'])
+    elif data.get('surface'):
+        pontos = data.get('points', [PONTOS_CURVA, PONTOS_CURVA])
+        if not isinstance(pontos, list) or len(pontos) != 2:
+            raise ValueError("'points' da superfície deve ser [pontos_x, pontos_y].")
+        resultado = solucionador.superficie(campos[0], campos[1], data['target'], (int(pontos[0]), int(pontos[1])))
+    else:
+        resultado = solucionador.curva(campos[0], campos[1], data['target'], int(data.get('points', PONTOS_CURVA)))
+    # Sem solução ou fora do domínio sai NaN, que `_json_finito` converte em null
+    return {chave: valor.tolist() if hasattr(valor, 'tolist') else valor for chave, valor in resultado.items()}
+
+def _executar_fluxo_caixa(data, progresso=None):
+    from fluxo_caixa import analisar_fluxo_caixa, MAX_ANOS
+
+    cenario = _validar_cenario(data)
+    anos = float(data.get('years', 3))
+    if not 0 < anos <= MAX_ANOS:
+        raise ValueError(f"'years' deve estar entre 0 e {MAX_ANOS}.")
+    resultado = analisar_fluxo_caixa(
+        SimuladorLote.de_cenarios([cenario]),
+        anos=anos,
+        taxa_desconto_anual=float(data.get('discount_rate', 0.10)),
+        detalhar=bool(data.get('daily', False)),
+        progresso=progresso,
+        dias_inicio=float(data.get('start_day', 0)),
+    )
+    resposta = {chave: (valores[0].tolist() if valores.ndim > 1 else float(valores[0]))
+                for chave, valores in resultado.items() if chave != 'dias'}
+    resposta['dias'] = resultado['dias']
+    return resposta
+
+def _executar_tarifa(data, progresso=None):
+    from tarifas import agendar_fotoperiodo
+
+    if not isinstance(data, dict) or 'tariff' not in data:
+        raise ValueError("Campo 'tariff' ausente.")
+    cenario = _validar_cenario(data)
+    resultado = agendar_fotoperiodo(SimuladorLote.de_cenarios([cenario]), data['tariff'],
+                                    detalhar=bool(data.get('detail', False)))
+    return {chave: valores[0].tolist() for chave, valores in resultado.items()}
+
+def _executar_iluminacao(data, progresso=None):
+    from iluminacao import calcular_iluminacao_lote
+
+    if not isinstance(data, dict):
+        raise ValueError("Corpo JSON inválido.")
+    for campo in ('width', 'depth', 'phase', 'light_type'):
+        if campo not in data:
+            raise ValueError(f"Campo '{campo}' ausente.")
+    resultado = calcular_iluminacao_lote(
+        data['width'], data['depth'], data['phase'], data['light_type'],
+        fotoperiodo=data.get('photoperiod'),
+        interpolar=bool(data.get('interpolate', False)),
+    )
+    return {chave: valores.tolist() for chave, valores in resultado.items()}
+
+def _executar_mapa_iluminacao(data, progresso=None):
+    from iluminacao import mapa_ppfd
+
+    if not isinstance(data, dict):
+        raise ValueError("Corpo JSON inválido.")
+    for campo in ('width', 'depth', 'phase', 'light_type', 'height_cm'):
+        if campo not in data:
+            raise ValueError(f"Campo '{campo}' ausente.")
+    resultado = mapa_ppfd(
+        data['width'], data['depth'], data['phase'], data['light_type'], float(data['height_cm']),
+        luminarias=data.get('fixtures', 1),
+        potencia_watts=data.get('fixture_watts'),
+        exponente=float(data.get('beam_exponent', 1.0)),
+        refletancia=float(data.get('wall_reflectance', 0.0)),
+        resolucao_m=float(data.get('resolution_m', 0.01)),
+    )
+    mapa = resultado.pop('mapa')
+    x, y = resultado.pop('x'), resultado.pop('y')
+    resultado['luminarias'] = resultado['luminarias'].tolist()
+    if data.get('include_grid'):
+        resultado.update(grade=mapa.tolist(), x=x.tolist(), y=y.tolist())
+    return resultado
+
+def _executar_instalacao(data, progresso=None):
+    from instalacao import SimuladorInstalacao, EquipamentoCompartilhado, escalonar
+    from fluxo_caixa import MAX_ANOS
+
+    if not isinstance(data, dict):
+        raise ValueError("Corpo JSON inválido.")
+    salas = data.get('rooms')
+    if not isinstance(salas, list) or not salas:
+        raise ValueError("Campo 'rooms' ausente ou vazio.")
+    mercado = data.get('market', {})
+    cenarios = []
+    for sala in salas:
+        if not isinstance(sala, dict):
+            raise ValueError("Cada sala deve ser um objeto JSON.")
+        quantidade = sala.get('count', 1)
+        if isinstance(quantidade, bool) or not isinstance(quantidade, int) or quantidade < 1:
+            raise ValueError("'count' deve ser um inteiro positivo.")
+        cenario = _validar_cenario({'setup': sala.get('setup', {}), 'cycle': sala.get('cycle', {}), 'market': mercado})
+        cenarios.extend([cenario] * quantidade)
+        if len(cenarios) > MAX_SALAS_INSTALACAO:
+            raise ValueError(f"A instalação pode ter no máximo {MAX_SALAS_INSTALACAO} salas.")
+    lote = SimuladorLote.de_cenarios(cenarios)
+    anos = float(data.get('years', 3))
+    if not 0 < anos <= MAX_ANOS:
+        raise ValueError(f"'years' deve estar entre 0 e {MAX_ANOS}.")
+
+    if 'start_days' in data:
+        inicio = data['start_days']
+        if isinstance(inicio, list) and len(inicio) != lote.tamanho:
+            raise ValueError("'start_days' deve ter um dia por sala.")
+    else:
+        intervalo = data.get('stagger_days')
+        inicio = escalonar(lote.get_duracao_total_ciclo(), None if intervalo is None else float(intervalo))
+    horas_luz = data.get('light_start_hours', 0)
+    if isinstance(horas_luz, list) and len(horas_luz) != lote.tamanho:
+        raise ValueError("'light_start_hours' deve ter uma hora por sala.")
+    equipamentos = data.get('shared_equipment') or []
+    if not isinstance(equipamentos, list) or not all(isinstance(e, dict) for e in equipamentos):
+        raise ValueError("'shared_equipment' deve ser uma lista de objetos JSON.")
+    compartilhados = [EquipamentoCompartilhado(
+        nome=str(e.get('name', 'Equipamento')),
+        custo_investimento=float(e.get('cost', 0.0)),
+        potencia_kw=float(e.get('power_kw', 0.0)),
+        horas_por_dia=float(e.get('hours_per_day', 24.0)),
+        hora_inicio=float(e.get('start_hour', 0.0)),
+    ) for e in equipamentos]
+
+    instalacao = SimuladorInstalacao(lote, inicio, horas_luz, compartilhados,
+                                     preco_kwh_compartilhado=data.get('shared_kwh_price'))
+    diario, horario = bool(data.get('daily', False)), bool(data.get('hourly', False))
+    # A carga hora a hora (dias × 24) só é montada quando o pico é pedido
+    pico = horario or bool(data.get('peak', False))
+    resultado = instalacao.simular(anos=anos, taxa_desconto_anual=float(data.get('discount_rate', 0.10)),
+                                   detalhar=diario or horario, pico=pico)
+    resposta = {'summary': resultado['resumo'], 'start_days': instalacao.inicio.tolist(), 'dias': resultado['dias']}
+    if diario:
+        resposta.update({chave: resultado[chave].tolist() for chave in (
+            'kwh_dia', 'pico_kw_dia', 'salas_em_cultivo', 'colheitas_dia', 'gramas_colhidas_dia',
+            'capex', 'energia', 'insumos', 'receita', 'fluxo', 'acumulado') if chave in resultado})
+        resposta['calendario_colheitas'] = {chave: valores.tolist() for chave, valores in resultado['calendario_colheitas'].items()}
+    if horario:
+        resposta['carga_horaria_kw'] = resultado['carga_horaria_kw'].tolist()
+    return resposta
+
+def _executar_lote(data, progresso=None):
+    """Versão em job do endpoint em lote: uma lista de cenários, resultados na mesma ordem."""
+    if not isinstance(data, list):
+        raise ValueError("Os parâmetros do job em lote devem ser uma lista de cenários.")
+    linhas = []
+    for inicio in range(0, len(data), TAMANHO_BLOCO):
+        bloco = []
+        for indice, item in enumerate(data[inicio:inicio + TAMANHO_BLOCO], start=inicio):
+            try:
+                bloco.append((indice, _validar_cenario(item), None))
+            except (TypeError, ValueError) as e:
+                bloco.append((indice, None, str(e)))
+        linhas.extend({'index': indice, 'error': erro} if erro is not None
+                      else {'index': indice, 'result': dict(zip(CAMPOS_RESULTADO, valores))}
+                      for indice, erro, valores in _avaliar_bloco(bloco))
+        if progresso is not None:
+            progresso(len(linhas) / len(data))
+    return linhas
+
+def _finitos(valor):
+    """Troca NaN e ±inf por None, inclusive dentro de dicionários e listas aninhados."""
+    if isinstance(valor, dict):
+        return {chave: _finitos(v) for chave, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_finitos(v) for v in valor]
+    if isinstance(valor, float) and not math.isfinite(valor):
+        return None
+    return valor
+
+def _json_finito(resultado):
+    """Resposta JSON das análises, com NaN e ±inf como null (não são JSON válido).
+
+    A serialização estrita é tentada primeiro; a varredura de `_finitos` só
+    roda quando ela falha, então resultados grandes e finitos não pagam por ela.
+    """
+    try:
+        texto = app.json.dumps(resultado, allow_nan=False, separators=(',', ':'))
+    except ValueError:
+        texto = app.json.dumps(_finitos(resultado), separators=(',', ':'))
+    return app.response_class(texto + '\n', mimetype=app.json.mimetype)
+
+def _responder(executar):
+    with metricas.etapa('desserializacao'):
+        data = request.get_json(silent=True)
+    try:
+        with metricas.etapa('motor'):
+            resultado = executar(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    with metricas.etapa('serializacao'):
+        return _json_finito(resultado)
+
+@app.route('/api/sensitivity', methods=['POST'])
+def sensitivity():
+    """Derivadas analíticas e tornado de ±variation para lucro, payback e ROI (indefinidos saem como null)."""
+    return _responder(_executar_sensibilidade)
+
+@app.route('/api/monte-carlo', methods=['POST'])
+def monte_carlo():
+    """Percentis e probabilidades de prejuízo sob incerteza nos parâmetros de ciclo e mercado."""
+    return _responder(_executar_monte_carlo)
+
+@app.route('/api/optimize', methods=['POST'])
+def optimize():
+    """Busca a combinação de variáveis que otimiza o objetivo, com restrições e fronteira de Pareto."""
+    return _responder(_executar_otimizacao)
+
+@app.route('/api/solve', methods=['POST'])
+def solve():
+    """Problema inverso: valor de um campo (ou curva de equilíbrio de dois) que atinge a meta."""
+    return _responder(_executar_inverso)
+
+@app.route('/api/cash-flow', methods=['POST'])
+def cash_flow():
+    """Linha do tempo de caixa diária de um cenário: payback em dias, VPL e TIR."""
+    return _responder(_executar_fluxo_caixa)
+
+@app.route('/api/tariff-schedule', methods=['POST'])
+def tariff_schedule():
+    """Melhor horário do fotoperíodo numa tarifa horária e economia frente ao preço único."""
+    return _responder(_executar_tarifa)
+
+@app.route('/api/facility', methods=['POST'])
+def facility():
+    """Instalação com várias salas escalonadas: energia, colheitas e caixa diários; pico de carga com `peak`."""
+    return _responder(_executar_instalacao)
+
+# --- JOBS ASSÍNCRONOS ---
+
+jobs = gerenciador_do_ambiente()
+jobs.registrar_tipo('sensitivity', _executar_sensibilidade)
+jobs.registrar_tipo('monte-carlo', _executar_monte_carlo)
+jobs.registrar_tipo('optimize', _executar_otimizacao)
+jobs.registrar_tipo('solve', _executar_inverso)
+jobs.registrar_tipo('cash-flow', _executar_fluxo_caixa)
+jobs.registrar_tipo('tariff-schedule', _executar_tarifa)
+jobs.registrar_tipo('facility', _executar_instalacao)
+jobs.registrar_tipo('lighting', _executar_iluminacao)
+jobs.registrar_tipo('lighting-map', _executar_mapa_iluminacao)
+jobs.registrar_tipo('batch', _executar_lote)
+
+def _job_ou_404(job_id):
+    job = jobs.obter(job_id)
+    if job is None:
+        return None, (jsonify({'error': 'Job não encontrado.'}), 404)
+    return job, None
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Enfileira uma análise: {"type": ..., "params": <corpo da rota síncrona>}."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Corpo JSON inválido.'}), 400
+    envolver = perfil_id = None
+    if data.get('type') in jobs.tipos and perfilador.deve_perfilar(perfilamento.solicitado(request)):
+        # O perfil cobre a execução no worker, não só o enfileiramento
+        perfil_id = uuid.uuid4().hex
+        envolver = lambda executar: perfilador.envolver(executar, f"job {data['type']}", perfil_id)
+    try:
+        job = jobs.submeter(data.get('type'), data.get('params'), envolver=envolver, perfil=perfil_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except FilaJobsCheia:
+        return jsonify({'error': 'Muitos jobs pendentes; tente novamente.'}), 503, {'Retry-After': '5'}
+    return jsonify(job.resumo()), 202, {'Location': f'/api/jobs/{job.id}'}
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job, erro = _job_ou_404(job_id)
+    return erro or jsonify(job.resumo())
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancela o job; se já estiver rodando, ele para no próximo ponto de controle."""
+    job = jobs.cancelar(job_id)
+    if job is None:
+        return jsonify({'error': 'Job não encontrado.'}), 404
+    return jsonify(job.resumo()), 202
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job, erro = _job_ou_404(job_id)
+    if erro:
+        return erro
+    if job.estado != CONCLUIDO:
+        return jsonify(job.resumo()), 409
+    return _json_finito(job.resultado)
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Acompanha o progresso por Server-Sent Events até o job terminar."""
+    job, erro = _job_ou_404(job_id)
+    if erro:
+        return erro
+
+    def gerar():
+        versao = -1
+        while True:
+            atual = jobs.aguardar_mudanca(job, versao, timeout=15)
+            if atual == versao:
+                # Comentário SSE para manter a conexão viva através de proxies
+                yield ': ping\n\n'
+                continue
+            versao = atual
+            resumo = job.resumo()
+            yield f"data: {json.dumps(resumo)}\n\n"
+            if resumo['status'] in ESTADOS_FINAIS:
+                return
+
+    return Response(stream_with_context(gerar()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(cache.estatisticas())
+
+# --- RELATÓRIO DE VIABILIDADE (IMAGEM) ---
+
+@functools.lru_cache(maxsize=None)
+def _relatorios():
+    # O matplotlib só é carregado nos processos do pool, no primeiro relatório
+    from relatorio_viabilidade import renderizador_do_ambiente
+    return renderizador_do_ambiente()
+
+def _cenario_da_query(args):
+    """{setup, cycle, market} a partir de parâmetros `grupo.campo=valor`; campos ausentes ficam com o padrão."""
+    cenario = {'setup': {}, 'cycle': {}, 'market': {}}
+    for nome, texto in args.items():
+        if nome == 'dpi':
+            continue
+        grupo, _, campo = nome.partition('.')
+        if grupo not in cenario or not campo:
+            raise ValueError(f"Parâmetro desconhecido: '{nome}'. Use setup.<campo>, cycle.<campo> ou market.<campo>.")
+        try:
+            valor = float(texto)
+        except ValueError:
+            raise ValueError(f"'{nome}' deve ser numérico.") from None
+        cenario[grupo][campo] = int(valor) if valor.is_integer() else valor
+    return cenario
+
+@app.route('/api/report.<any(png, svg):formato>', methods=['GET', 'POST'])
+def report(formato):
+    """Relatório de viabilidade renderizado como imagem.
+
+    GET recebe o cenário na query (`cycle.potencia_watts=600&market.preco_kwh=1.1`,
+    bom para `<img src>`); POST recebe o corpo de `/api/calculate`. `?dpi=` vale
+    para PNG. A ETag é a chave de conteúdo da imagem, então um `If-None-Match`
+    igual responde 304 sem renderizar nada.
+    """
+    from relatorio_viabilidade import chave_relatorio, FORMATOS, FilaCheia, DPI_PADRAO
+
+    try:
+        data = request.get_json(silent=True) if request.method == 'POST' else _cenario_da_query(request.args)
+        setup, ciclo, mercado = _validar_cenario(data)
+        dpi = _numero_parametro('dpi', int, DPI_PADRAO)
+        chave = chave_relatorio(setup, ciclo, mercado, formato, dpi)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    cabecalhos = {'ETag': f'"{chave}"', 'Cache-Control': 'public, max-age=3600'}
+    if request.method != 'POST' and chave in request.if_none_match:
+        return Response(status=304, headers=cabecalhos)
+    try:
+        with metricas.etapa('renderizacao'):
+            _, imagem = _relatorios().renderizar(setup, ciclo, mercado, formato, dpi)
+    except FilaCheia:
+        return jsonify({'error': 'Muitos relatórios em renderização; tente novamente.'}), 503, {'Retry-After': '1'}
+    except TimeoutError:
+        return jsonify({'error': 'A renderização do relatório excedeu o tempo limite.'}), 503, {'Retry-After': '5'}
+    return Response(imagem, mimetype=FORMATOS[formato], headers=cabecalhos)
+
+@app.route('/api/report/stats', methods=['GET'])
+def report_stats():
+    return jsonify(_relatorios().estatisticas())
+
+# --- CATÁLOGO DE STRAINS ---
+
+@functools.lru_cache(maxsize=None)
+def _catalogo():
+    # Criado no primeiro uso, para que o NumPy e a leitura do CSV fiquem fora da inicialização
+    from catalogo_strains import catalogo_do_ambiente
+    return catalogo_do_ambiente()
+
+def _lista_parametro(nome):
+    return [valor for valor in request.args.get(nome, '').split(',') if valor.strip()]
+
+def _numero_parametro(nome, tipo=float, padrao=None):
+    valor = request.args.get(nome)
+    if valor in (None, ''):
+        return padrao
+    try:
+        return tipo(valor)
+    except ValueError:
+        raise ValueError(f"Parâmetro '{nome}' inválido.") from None
+
+def _filtro_strains(indice, parametros):
+    """Máscara dos filtros opcionais (type, effects, flavors, min_rating, max_rating) ou None sem filtros."""
+    def lista(nome):
+        valor = parametros.get(nome) or []
+        return [v for v in (valor.split(',') if isinstance(valor, str) else valor) if v.strip()]
+    filtros = dict(tipos=lista('type'), efeitos=lista('effects'), sabores=lista('flavors'),
+                   nota_min=parametros.get('min_rating'), nota_max=parametros.get('max_rating'))
+    if not any(filtros.values()) and filtros['nota_min'] is None and filtros['nota_max'] is None:
+        return None
+    for chave in ('nota_min', 'nota_max'):
+        if filtros[chave] is not None:
+            filtros[chave] = float(filtros[chave])
+    return indice.filtrar(**filtros)
+
+@app.route('/api/strains', methods=['GET'])
+def list_strains():
+    """Strains filtradas por tipo, efeitos, sabores e faixa de nota, paginadas."""
+    try:
+        resultado = _catalogo().buscar(
+            tipos=_lista_parametro('type'),
+            efeitos=_lista_parametro('effects'),
+            sabores=_lista_parametro('flavors'),
+            nota_min=_numero_parametro('min_rating'),
+            nota_max=_numero_parametro('max_rating'),
+            pagina=_numero_parametro('page', int, 1),
+            por_pagina=_numero_parametro('per_page', int, 20),
+            ordenar=request.args.get('sort', 'rating'),
+            facetas=request.args.get('facets', '').lower() in ('1', 'true'),
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except FileNotFoundError:
+        return jsonify({'error': 'Catálogo de strains indisponível.'}), 503
+    return jsonify(resultado)
+
+@functools.lru_cache(maxsize=None)
+def _busca():
+    from busca_strains import BuscaStrains
+    return BuscaStrains(_catalogo())
+
+@app.route('/api/strains/search', methods=['GET'])
+def search_strains():
+    """Busca BM25 em nomes e descrições: termos, "frases" e prefixos*; mode=all exige todas as cláusulas."""
+    consulta = request.args.get('q', '').strip()
+    if not consulta:
+        return jsonify({'error': "Parâmetro 'q' ausente."}), 400
+    try:
+        busca = _busca()
+        indice, _ = busca.indices()
+        resultado = busca.buscar(
+            consulta,
+            todas=request.args.get('mode', 'any') == 'all',
+            mascara=_filtro_strains(indice, request.args),
+            pagina=_numero_parametro('page', int, 1),
+            por_pagina=_numero_parametro('per_page', int, 20),
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except FileNotFoundError:
+        return jsonify({'error': 'Catálogo de strains indisponível.'}), 503
+    return jsonify(resultado)
+
+@app.route('/api/strains/<nome>', methods=['GET'])
+def get_strain(nome):
+    try:
+        strain = _catalogo().obter(nome)
+    except FileNotFoundError:
+        return jsonify({'error': 'Catálogo de strains indisponível.'}), 503
+    if strain is None:
+        return jsonify({'error': 'Strain não encontrada.'}), 404
+    return jsonify(strain)
+
+@functools.lru_cache(maxsize=None)
+def _recomendador():
+    from recomendador_strains import RecomendadorCatalogo
+    return RecomendadorCatalogo(_catalogo())
+
+def _k_vizinhos(valor):
+    k = int(valor if valor is not None else 10)
+    if not 1 <= k <= 100:
+        raise ValueError("'k' deve estar entre 1 e 100.")
+    return k
+
+@app.route('/api/strains/<nome>/similar', methods=['GET'])
+def similar_strains(nome):
+    """Strains mais parecidas com `nome` por tipo, efeitos, sabores e descrição, com filtros opcionais."""
+    try:
+        recomendador = _recomendador().recomendador()
+        mascara = _filtro_strains(recomendador.indice, request.args)
+        return jsonify(recomendador.semelhantes(nome, _k_vizinhos(request.args.get('k')), mascara))
+    except KeyError:
+        return jsonify({'error': 'Strain não encontrada.'}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except FileNotFoundError:
+        return jsonify({'error': 'Catálogo de strains indisponível.'}), 503
+
+@app.route('/api/strains/similar', methods=['POST'])
+def similar_strains_batch():
+    """Vizinhos de várias strains (`names`) de uma vez, ou das tags de uma consulta (`type`, `effects`, `flavors`)."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Corpo JSON inválido.'}), 400
+    try:
+        recomendador = _recomendador().recomendador()
+        k = _k_vizinhos(data.get('k'))
+        if 'names' in data:
+            nomes = data['names']
+            if not isinstance(nomes, list) or not all(isinstance(n, str) for n in nomes):
+                raise ValueError("'names' deve ser uma lista de nomes.")
+            ids, valores = recomendador.semelhantes_lote(nomes, k)
+            registros = recomendador.indice.registros
+            return jsonify({nome: [{'strain': registros[i]['strain'], 'similarity': round(v, 6)} for i, v in zip(linha_ids, linha_valores)]
+                            for nome, linha_ids, linha_valores in zip(nomes, ids.tolist(), valores.tolist())})
+        mascara = _filtro_strains(recomendador.indice, data.get('filters') or {})
+        return jsonify(recomendador.por_tags(data.get('type'), data.get('effects') or [], data.get('flavors') or [], k, mascara))
+    except KeyError as e:
+        return jsonify({'error': f'Strain não encontrada: {e.args[0]}'}), 404
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except FileNotFoundError:
+        return jsonify({'error': 'Catálogo de strains indisponível.'}), 503
+
+# --- ENDPOINT EM LOTE (NDJSON) ---
+
+def _ler_itens(stream):
+    """Lê cenários do corpo da requisição sem carregá-lo inteiro na memória.
+
+    Aceita um array JSON (`[{...}, {...}]`) ou NDJSON (um objeto por linha).
+    Produz tuplas (item, erro): linhas NDJSON inválidas viram erros individuais;
+    um array malformado encerra a leitura com um último erro.
+    """
+    decodificador = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    buffer = ''
+    fim = False
+
+    def ler_mais():
+        nonlocal buffer, fim
+        bloco = stream.read(TAMANHO_LEITURA)
+        if not bloco:
+            fim = True
+            buffer += decodificador.decode(b'', final=True)
+        else:
+            buffer += decodificador.decode(bloco)
+
+    while not buffer.strip() and not fim:
+        ler_mais()
+    buffer = buffer.lstrip()
+
+    if not buffer.startswith('['):
+        # NDJSON: cada linha é independente
+        while True:
+            while '\n' not in buffer and not fim:
+                ler_mais()
+            if '\n' in buffer:
+                linha, buffer = buffer.split('\n', 1)
+            elif buffer:
+                linha, buffer = buffer, ''
+            else:
+                return
+            if not linha.strip():
+                continue
+            try:
+                yield json.loads(linha), None
+            except ValueError as e:
+                yield None, f"JSON inválido: {e}"
+
+    decoder = json.JSONDecoder()
+    pos = 1
+    esperando_item = True
+    while True:
+        while pos < len(buffer) and buffer[pos].isspace():
+            pos += 1
+        if pos >= len(buffer):
+            if fim:
+                yield None, "Array JSON incompleto."
+                return
+            buffer, pos = buffer[pos:], 0
+            ler_mais()
+            continue
+        if buffer[pos] == ']':
+            return
+        if not esperando_item:
+            if buffer[pos] != ',':
+                yield None, "Separador inesperado entre os itens do array."
+                return
+            pos += 1
+            esperando_item = True
+            continue
+        try:
+            item, final = decoder.raw_decode(buffer, pos)
+        except ValueError as e:
+            if fim:
+                yield None, f"JSON inválido: {e}"
+                return
+            buffer, pos = buffer[pos:], 0
+            ler_mais()
+            continue
+        if final >= len(buffer) and not fim:
+            # O item pode estar truncado (ex.: número no fim do bloco); relê com mais dados
+            buffer, pos = buffer[pos:], 0
+            ler_mais()
+            continue
+        yield item, None
+        pos = final
+        esperando_item = False
+
+def _validar_cenario(item):
+    """Converte um objeto {setup, cycle, market} nas dataclasses do simulador."""
+    if not isinstance(item, dict):
+        raise ValueError("Cada cenário deve ser um objeto JSON.")
+    partes = []
+    for chave, classe in (('setup', SetupInvestimento), ('cycle', ParametrosCiclo), ('market', CustosMercado)):
+        valores = item.get(chave)
+        if not isinstance(valores, dict):
+            raise ValueError(f"Campo '{chave}' ausente ou inválido.")
+        for nome, valor in valores.items():
+            if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+                raise ValueError(f"'{chave}.{nome}' deve ser numérico.")
+        partes.append(classe(**valores))
+    ciclo = partes[1]
+    # O ROI anualiza por 365 / duração: com duração zero o motor escalar divide por zero
+    if ciclo.dias_vegetativo + ciclo.dias_floracao + ciclo.dias_secagem_cura <= 0:
+        raise ValueError("A duração do ciclo (vegetativo + floração + secagem/cura) deve ser positiva.")
+    return tuple(partes)
+
+def _avaliar_bloco(bloco):
+    """Avalia de uma vez os cenários válidos do bloco.
+
+    Devolve, na ordem do bloco, tuplas (índice, erro, valores), com os valores
+    na ordem de `CAMPOS_RESULTADO` (None quando o cenário tem erro).
+    """
+    validos = [cenario for _, cenario, erro in bloco if erro is None]
+    if not validos:
+        return [(indice, erro, None) for indice, _, erro in bloco]
+    with metricas.etapa('motor'):
+        resultados = SimuladorLote.de_cenarios(validos).simular()
+    linhas = zip(*(resultados[campo].tolist() for campo in CAMPOS_RESULTADO))
+    avaliados = []
+    for indice, _, erro in bloco:
+        valores = None if erro is not None else next(linhas)
+        # NaN não é JSON válido; o ciclo de duração zero já é recusado na validação, mas entradas extremas ainda podem gerá-lo
+        if valores is not None and any(v != v for v in valores):
+            erro, valores = "Resultado indefinido (NaN): verifique a duração do ciclo e os valores de entrada.", None
+        avaliados.append((indice, erro, valores))
+    return avaliados
+
+@app.route('/api/calculate/batch', methods=['POST'])
+def calculate_batch():
+    """Avalia vários cenários e devolve um resultado NDJSON por cenário, na ordem de entrada."""
+    def ndjson(bloco):
+        linhas = _avaliar_bloco(bloco)
+        with metricas.etapa('serializacao'):
+            return [json.dumps({'index': indice, 'error': erro}, ensure_ascii=False, separators=(',', ':')) + '\n'
+                    if erro is not None else '{"index":%d,"result":%s}\n' % (indice, serializar_resultado(valores))
+                    for indice, erro, valores in linhas]
+
+    def gerar():
+        bloco = []
+        for indice, (item, erro) in enumerate(_ler_itens(request.stream)):
+            cenario = None
+            if erro is None:
+                try:
+                    cenario = _validar_cenario(item)
+                except (TypeError, ValueError) as e:
+                    erro = str(e)
+            bloco.append((indice, cenario, erro))
+            if len(bloco) >= TAMANHO_BLOCO:
+                yield from ndjson(bloco)
+                bloco = []
+        if bloco:
+            yield from ndjson(bloco)
+
+    return Response(stream_with_context(gerar()), mimetype='application/x-ndjson',
+                    headers={'X-Accel-Buffering': 'no'})
 
 if __name__ == '__main__':
-    app.run(port=5001, debug=True) 
\ No newline at end of file
+    app.run(port=5001, debug=True)
\ No newline at end of file
@@ -0,0 +1,377 @@
+"""Benchmarks e verificação de regressão dos scripts Python.
+
+Mede a latência de uma chamada de `simular()` e de `calcular()`, a vazão do `SimuladorLote`,
+requisições por segundo de `/api/calculate` e `/api/calculate/batch` (cliente
+de teste do Flask, sem rede), o callback de `ppfd-calculator.py`, o quadro interativo
+do dashboard ipywidgets, a reexecução do dashboard Streamlit, o tempo de inicialização da API e o pico de memória de
+um lote grande. Antes de medir,
+confere as saídas do motor (incluindo os casos de borda de `CASOS_LIMITE`) contra `benchmarks/golden.json`, para que nenhuma
+otimização altere os resultados financeiros sem ser percebida.
+
+Os resultados vão para um JSON (`--saida`) e podem ser comparados com uma
+linha de base (`--baseline`); qualquer métrica pior que o limite relativo
+(`--limite`, 20% por padrão) ou qualquer divergência no golden faz o script
+sair com código 1. A linha de base depende da máquina: regrave-a com
+`--gravar-baseline` no ambiente de referência.
+
+Uso: python scripts/benchmark.py [--rapido] [--saida resultados.json]
+                                 [--baseline scripts/benchmarks/baseline.json] [--limite 0.2]
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict
+from typing import Any, Callable, Dict, List
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, DIRETORIO)
+
+from simulador_cultivo import (SetupInvestimento, ParametrosCiclo, CustosMercado, SimuladorCultivoCompleto,
+                               SimuladorLote, FAIXAS_BARRA_LATERAL)
+
+CAMINHO_GOLDEN = os.path.join(DIRETORIO, 'benchmarks', 'golden.json')
+CAMINHO_BASELINE = os.path.join(DIRETORIO, 'benchmarks', 'baseline.json')
+# Tolerância relativa do golden: permite reassociação de somas em ponto flutuante, não mudanças de modelo
+TOLERANCIA_GOLDEN = 1e-9
+NUM_CENARIOS_GOLDEN = 50
+# Casos de borda gravados no golden, como alterações sobre o cenário padrão
+CASOS_LIMITE = {
+    'producao_zero': {'cycle': {'producao_por_planta_g': 0}},
+    'ciclo_duracao_zero': {'cycle': {'dias_vegetativo': 0, 'dias_floracao': 0, 'dias_secagem_cura': 0}},
+    'lucro_negativo': {'market': {'preco_venda_por_grama': 1.0}},
+    'investimento_zero': {'setup': {'custo_equip_iluminacao': 0.0, 'custo_tenda_estrutura': 0.0,
+                                    'custo_ventilacao_exaustao': 0.0, 'custo_outros_equipamentos': 0.0}},
+}
+
+# --- CENÁRIOS ---
+
+def cenarios_aleatorios(n: int, semente: int = 2024) -> List[Dict[str, Dict[str, float]]]:
+    """Cenários reprodutíveis sobre as faixas da barra lateral, alinhados ao passo de cada controle."""
+    gerador = random.Random(semente)
+    grupos = {'setup': SetupInvestimento, 'cycle': ParametrosCiclo, 'market': CustosMercado}
+    cenarios = []
+    for _ in range(n):
+        cenario = {}
+        for grupo, classe in grupos.items():
+            valores = {}
+            for nome in asdict(classe()):
+                minimo, maximo, passo = FAIXAS_BARRA_LATERAL[nome]
+                valores[nome] = round(minimo + gerador.randrange(int(round((maximo - minimo) / passo)) + 1) * passo, 6)
+            cenario[grupo] = valores
+        cenarios.append(cenario)
+    return cenarios
+
+def _dataclasses(cenario):
+    return (SetupInvestimento(**cenario['setup']), ParametrosCiclo(**cenario['cycle']), CustosMercado(**cenario['market']))
+
+# --- GOLDEN ---
+
+def _cenario_padrao() -> Dict[str, Dict[str, float]]:
+    return {'setup': asdict(SetupInvestimento()), 'cycle': asdict(ParametrosCiclo()), 'market': asdict(CustosMercado())}
+
+def _escalar(cenario, metodo: str) -> Dict[str, Any]:
+    """Saída do motor escalar; o ciclo de duração zero levanta erro lá (no lote vira ±inf/NaN) e é gravado como tal."""
+    try:
+        saida = getattr(SimuladorCultivoCompleto(*_dataclasses(cenario)), metodo)()
+    except ZeroDivisionError as e:
+        return {'erro': type(e).__name__}
+    return saida if isinstance(saida, dict) else saida._asdict()
+
+def _saidas(cenarios) -> List[Dict[str, Any]]:
+    resultados = SimuladorLote.de_cenarios([_dataclasses(c) for c in cenarios]).simular()
+    saidas = []
+    for i, cenario in enumerate(cenarios):
+        saidas.append({
+            'escalar': _escalar(cenario, 'simular'),
+            'lote': {chave: float(valores[i]) for chave, valores in resultados.items()},
+        })
+    return saidas
+
+def _divergencias(esperado, obtido, caminho: str) -> List[str]:
+    if isinstance(esperado, dict):
+        if not isinstance(obtido, dict) or set(esperado) != set(obtido):
+            return [f"{caminho}: chaves diferentes"]
+        return [d for chave in esperado for d in _divergencias(esperado[chave], obtido[chave], f"{caminho}.{chave}")]
+    if esperado == obtido or (isinstance(esperado, float) and isinstance(obtido, float)
+                              and math.isnan(esperado) and math.isnan(obtido)):
+        return []
+    if not isinstance(esperado, (int, float)) or not isinstance(obtido, (int, float)):
+        return [f"{caminho}: esperado {esperado!r}, obtido {obtido!r}"]
+    if math.isfinite(esperado) and math.isfinite(obtido) and math.isclose(esperado, obtido, rel_tol=TOLERANCIA_GOLDEN, abs_tol=1e-12):
+        return []
+    return [f"{caminho}: esperado {esperado!r}, obtido {obtido!r}"]
+
+def gravar_golden(caminho: str = CAMINHO_GOLDEN) -> None:
+    padrao = _cenario_padrao()
+    limites = []
+    for alteracoes in CASOS_LIMITE.values():
+        cenario = _cenario_padrao()
+        for grupo, valores in alteracoes.items():
+            cenario[grupo].update(valores)
+        limites.append(cenario)
+    cenarios = [padrao] + cenarios_aleatorios(NUM_CENARIOS_GOLDEN) + limites
+    casos = [None] * (1 + NUM_CENARIOS_GOLDEN) + list(CASOS_LIMITE)
+    dados = [{'entrada': c, 'saida': s} if caso is None else {'caso': caso, 'entrada': c, 'saida': s}
+             for caso, c, s in zip(casos, cenarios, _saidas(cenarios))]
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(dados, arquivo, ensure_ascii=False, indent=1)
+
+def verificar_golden(caminho: str = CAMINHO_GOLDEN) -> Dict[str, Any]:
+    with open(caminho, encoding='utf-8') as arquivo:
+        dados = json.load(arquivo)
+    obtidas = _saidas([d['entrada'] for d in dados])
+    divergencias = [d for i, (dado, obtida) in enumerate(zip(dados, obtidas))
+                    for d in _divergencias(dado['saida'], obtida, f"cenario[{i}]")]
+    # `calcular()` tem as mesmas chaves e valores das colunas do lote (ou o mesmo erro de `simular()`)
+    divergencias += [d for i, dado in enumerate(dados)
+                     for d in _divergencias(dado['saida']['escalar'] if 'erro' in dado['saida']['escalar'] else dado['saida']['lote'],
+                                            _escalar(dado['entrada'], 'calcular'), f"cenario[{i}].calcular")]
+    return {'cenarios': len(dados), 'ok': not divergencias, 'divergencias': divergencias[:20]}
+
+# --- MEDIÇÕES ---
+
+def _cronometrar(funcao: Callable[[], Any], repeticoes: int, numero: int) -> float:
+    """Menor, entre `repeticoes`, tempo médio por chamada em `numero` chamadas (o menos afetado por ruído)."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for _ in range(numero):
+            funcao()
+        tempos.append((time.perf_counter() - inicio) / numero)
+    return min(tempos)
+
+def _metrica(valor: float, unidade: str, maior_melhor: bool) -> Dict[str, Any]:
+    return {'valor': valor, 'unidade': unidade, 'maior_melhor': maior_melhor}
+
+def medir_simular(escala: float) -> Dict[str, Any]:
+    simulador = SimuladorCultivoCompleto(SetupInvestimento(), ParametrosCiclo(), CustosMercado())
+    return _metrica(_cronometrar(simulador.simular, 5, int(20_000 * escala)) * 1e6, 'us/chamada', False)
+
+# Não há reticulado pré-calculado dos controles da barra lateral: medida com os termos separáveis
+# (energia por fase, produção) em tabelas mapeadas, a consulta levou ~12.7 us por cenário contra
+# ~2.2 us de `calcular()`, e ~43 ms contra ~22 ms num lote de 200 mil. O cálculo direto é o caminho rápido.
+def medir_calcular(escala: float) -> Dict[str, Any]:
+    simulador = SimuladorCultivoCompleto(SetupInvestimento(), ParametrosCiclo(), CustosMercado())
+    return _metrica(_cronometrar(simulador.calcular, 5, int(20_000 * escala)) * 1e6, 'us/chamada', False)
+
+def medir_lote(escala: float) -> Dict[str, Any]:
+    cenarios = [_dataclasses(c) for c in cenarios_aleatorios(int(100_000 * escala), semente=7)]
+    lote = SimuladorLote.de_cenarios(cenarios)
+    segundos = _cronometrar(lote.simular, 5, 1)
+    return _metrica(lote.tamanho / segundos, 'cenarios/s', True)
+
+def medir_pico_memoria_lote(escala: float) -> Dict[str, Any]:
+    cenarios = [_dataclasses(c) for c in cenarios_aleatorios(int(100_000 * escala), semente=7)]
+    tracemalloc.start()
+    SimuladorLote.de_cenarios(cenarios).simular()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return _metrica(pico / 2 ** 20, 'MB', False)
+
+def medir_api(escala: float) -> Dict[str, Dict[str, Any]]:
+    import api
+
+    cliente = api.app.test_client()
+    corpos = cenarios_aleatorios(int(1_000 * escala), semente=11)
+
+    def enviar_todos(consulta=''):
+        for corpo in corpos:
+            cliente.post('/api/calculate' + consulta, json=corpo)
+
+    # Parâmetros distintos com o cache limpo medem o cálculo; sem limpar, medem os acertos do cache
+    sem_cache = len(corpos) / _cronometrar(lambda: (api.cache.limpar(), enviar_todos()), 3, 1)
+    com_cache = len(corpos) / _cronometrar(enviar_todos, 3, 1)
+    compacto = len(corpos) / _cronometrar(lambda: (api.cache.limpar(), enviar_todos('?format=compact')), 3, 1)
+
+    corpo_lote = '\n'.join(json.dumps(c) for c in cenarios_aleatorios(int(20_000 * escala), semente=13))
+    segundos = _cronometrar(lambda: cliente.post('/api/calculate/batch', data=corpo_lote,
+                                                 content_type='application/x-ndjson').get_data(), 3, 1)
+    lote = corpo_lote.count('\n') + 1
+    return {
+        'api_calculate_sem_cache': _metrica(sem_cache, 'req/s', True),
+        'api_calculate_com_cache': _metrica(com_cache, 'req/s', True),
+        'api_calculate_compacto_sem_cache': _metrica(compacto, 'req/s', True),
+        'api_batch_vazao': _metrica(lote / segundos, 'cenarios/s', True),
+    }
+
+def medir_ppfd(escala: float) -> Dict[str, Any]:
+    """Callback do botão de `ppfd-calculator.py`, incluindo a saída impressa."""
+    try:
+        spec = importlib.util.spec_from_file_location('ppfd_calculator', os.path.join(DIRETORIO, 'ppfd-calculator.py'))
+        modulo = importlib.util.module_from_spec(spec)
+        with contextlib.redirect_stdout(io.StringIO()):
+            spec.loader.exec_module(modulo)
+    except ImportError as e:
+        return {'indisponivel': f"ipywidgets/IPython ausentes ({e})"}
+    with contextlib.redirect_stdout(io.StringIO()):
+        segundos = _cronometrar(lambda: modulo.calcular_iluminacao(None), 5, int(2_000 * escala))
+    return _metrica(segundos * 1e6, 'us/chamada', False)
+
+def medir_redesenho_widgets(escala: float) -> Dict[str, Any]:
+    """Quadro interativo de `cultivation-dashboard.py` (simulação, redesenho parcial e JPEG) ao mover o preço de venda."""
+    try:
+        spec = importlib.util.spec_from_file_location('cultivation_dashboard', os.path.join(DIRETORIO, 'cultivation-dashboard.py'))
+        modulo = importlib.util.module_from_spec(spec)
+        with contextlib.redirect_stdout(io.StringIO()):
+            spec.loader.exec_module(modulo)
+    except ImportError as e:
+        return {'indisponivel': f"ipywidgets/IPython ausentes ({e})"}
+    valores = modulo.valores_widgets()
+    precos = itertools.cycle(range(10, 101))
+
+    def quadro():
+        valores['preco_venda_por_grama'] = float(next(precos))
+        modulo.atualizar_dashboard_completo('jpeg', **valores)
+
+    segundos = _cronometrar(quadro, 5, max(2, int(20 * escala)))
+    return _metrica(segundos * 1000, 'ms', False)
+
+def medir_dashboard(escala: float) -> Dict[str, Dict[str, Any]]:
+    """Reexecução do dashboard Streamlit após mover um controle da barra lateral (AppTest, sem navegador).
+
+    Com valores novos a simulação e os gráficos afetados são recalculados;
+    voltando a valores já vistos tudo sai do cache.
+    """
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError as e:
+        indisponivel = {'indisponivel': f"streamlit ausente ({e})"}
+        return {'dashboard_rerun_latencia': indisponivel, 'dashboard_rerun_cache_latencia': indisponivel}
+    import logging
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+    app = AppTest.from_file(os.path.join(DIRETORIO, 'cultivation-dashboard-streamlit.py'), default_timeout=120)
+    app.run()
+    preco_venda = next(w for w in app.sidebar.slider if w.label.startswith('Preço Venda'))
+    execucoes = max(3, int(10 * escala))
+
+    def rerun(valor):
+        preco_venda.set_value(valor)
+        inicio = time.perf_counter()
+        app.run()
+        return time.perf_counter() - inicio
+
+    novos = [rerun(20.0 + i) for i in range(execucoes)]
+    repetidos = [rerun(20.0 + i % 2) for i in range(execucoes)]
+    return {
+        'dashboard_rerun_latencia': _metrica(sorted(novos)[len(novos) // 2] * 1000, 'ms', False),
+        'dashboard_rerun_cache_latencia': _metrica(sorted(repetidos)[len(repetidos) // 2] * 1000, 'ms', False),
+    }
+
+def medir_startup(escala: float) -> Dict[str, Dict[str, Any]]:
+    from medir_inicializacao import medir
+
+    r = medir('import api', max(1, int(5 * escala)))
+    return {
+        'inicializacao_api': _metrica(r['segundos'] * 1000, 'ms', False),
+        'inicializacao_api_memoria': _metrica(r['maxrss_mb'], 'MB', False),
+    }
+
+def executar(rapido: bool) -> Dict[str, Any]:
+    escala = 0.1 if rapido else 1.0
+    # A inicialização vem primeiro: no Linux o ru_maxrss do processo filho herda o pico do pai
+    benchmarks = medir_startup(escala)
+    benchmarks.update({
+        'simular_latencia': medir_simular(escala),
+        'calcular_latencia': medir_calcular(escala),
+        'lote_vazao': medir_lote(escala),
+        'lote_pico_memoria': medir_pico_memoria_lote(escala),
+        'ppfd_callback_latencia': medir_ppfd(escala),
+        'dashboard_widgets_redesenho': medir_redesenho_widgets(escala),
+    })
+    benchmarks.update(medir_api(escala))
+    benchmarks.update(medir_dashboard(escala))
+    import numpy
+
+    return {
+        'meta': {
+            'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': numpy.__version__,
+            'plataforma': platform.platform(),
+            'rapido': rapido,
+        },
+        'golden': verificar_golden(),
+        'benchmarks': benchmarks,
+    }
+
+# --- COMPARAÇÃO COM A LINHA DE BASE ---
+
+def comparar(atual: Dict[str, Any], baseline: Dict[str, Any], limite: float) -> List[Dict[str, Any]]:
+    """Variação relativa de cada métrica presente nas duas execuções; positiva = pior."""
+    comparacoes = []
+    for nome, base in baseline['benchmarks'].items():
+        medida = atual['benchmarks'].get(nome)
+        if 'valor' not in base or not medida or 'valor' not in medida or not base['valor']:
+            continue
+        variacao = (medida['valor'] - base['valor']) / base['valor']
+        piora = -variacao if base['maior_melhor'] else variacao
+        comparacoes.append({'nome': nome, 'baseline': base['valor'], 'atual': medida['valor'],
+                            'piora': piora, 'regressao': piora > limite})
+    return comparacoes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--saida', help='arquivo JSON com os resultados')
+    parser.add_argument('--baseline', default=CAMINHO_BASELINE, help='resultados de referência para comparação')
+    parser.add_argument('--limite', type=float, default=0.20, help='piora relativa tolerada (0.2 = 20%%)')
+    parser.add_argument('--rapido', action='store_true', help='cargas 10x menores')
+    parser.add_argument('--gravar-baseline', action='store_true', help='grava os resultados como nova linha de base')
+    parser.add_argument('--gravar-golden', action='store_true', help='regrava as saídas de referência do motor')
+    args = parser.parse_args()
+
+    if args.gravar_golden:
+        gravar_golden()
+        print(f"Golden gravado em {CAMINHO_GOLDEN}")
+        return
+
+    resultados = executar(args.rapido)
+    print(f"{'Benchmark':<30}{'Valor':>14}  Unidade")
+    for nome, medida in resultados['benchmarks'].items():
+        if 'valor' in medida:
+            print(f"{nome:<30}{medida['valor']:>14.2f}  {medida['unidade']}")
+        else:
+            print(f"{nome:<30}{'-':>14}  {medida['indisponivel']}")
+
+    golden = resultados['golden']
+    print(f"\nGolden: {golden['cenarios']} cenários, {'ok' if golden['ok'] else 'DIVERGENTE'}")
+    for divergencia in golden['divergencias']:
+        print(f"  {divergencia}")
+
+    falhou = not golden['ok']
+    if not args.gravar_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as arquivo:
+            baseline = json.load(arquivo)
+        if baseline['meta']['rapido'] != args.rapido:
+            print("\nAviso: a linha de base foi gravada com outro valor de --rapido; as cargas diferem.")
+        comparacoes = comparar(resultados, baseline, args.limite)
+        resultados['comparacao'] = {'baseline': args.baseline, 'limite': args.limite, 'metricas': comparacoes}
+        print(f"\nComparação com {args.baseline} (limite {args.limite:.0%}):")
+        for c in comparacoes:
+            marca = 'REGRESSÃO' if c['regressao'] else 'ok'
+            print(f"  {c['nome']:<30}{c['piora']:>+9.1%}  {marca}")
+        falhou |= any(c['regressao'] for c in comparacoes)
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultados, arquivo, ensure_ascii=False, indent=2)
+    if args.gravar_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultados, arquivo, ensure_ascii=False, indent=2)
+        print(f"\nLinha de base gravada em {args.baseline}")
+    sys.exit(1 if falhou else 0)
+
+if __name__ == '__main__':
+    main()
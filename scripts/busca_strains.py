@@ -0,0 +1,246 @@
+"""Busca textual ranqueada (BM25) nos nomes e descrições do catálogo de strains.
+
+O texto é tokenizado por `catalogo_strains.tokenizar` (minúsculas, sem
+acentos), de modo que "floração" e "floracao", ou "Pakalōlō" e "pakalolo",
+casam entre si; não há stemming, e variações como "relax", "relaxing" e
+"relaxed" são cobertas por consultas de prefixo (`relax*`).
+
+Sintaxe da consulta: termos soltos, frases entre aspas ("pain relief") e
+prefixos com asterisco (haw*). Por padrão basta casar uma das cláusulas
+(OU); com `todas=True` todas precisam casar. A pontuação é a soma do BM25 de
+cada cláusula: um prefixo vale o melhor termo que ele expande naquele
+documento, e uma frase usa como frequência o número de ocorrências da frase
+inteira.
+
+O índice é um conjunto de arrays `.npy` num diretório, aberto com
+`mmap_mode='r'`: os workers da API compartilham as páginas do sistema
+operacional em vez de cada um reconstruir o índice. O diretório leva a
+impressão digital do conteúdo do catálogo, então um CSV alterado gera um
+índice novo ao lado do antigo, publicado com um `rename` atômico.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from catalogo_strains import CatalogoStrains, IndiceStrains, tokenizar
+
+VERSAO_INDICE = '1'
+K1 = 1.2
+B = 0.75
+# Distância entre o nome e a descrição, para que uma frase não atravesse os dois campos
+INTERVALO_CAMPOS = 8
+ARRAYS = ('termos', 'inicio_postagens', 'documentos', 'frequencias', 'inicio_posicoes', 'posicoes', 'comprimentos')
+_CLAUSULA = re.compile(r'"([^"]*)"|(\S+)')
+
+def impressao_catalogo(indice: IndiceStrains) -> str:
+    """Hash dos nomes e descrições na ordem do índice; identifica o índice textual correspondente."""
+    h = hashlib.sha256(VERSAO_INDICE.encode())
+    for registro in indice.registros:
+        h.update(registro['strain'].encode() + b'\0' + registro['description'].encode() + b'\1')
+    return h.hexdigest()[:24]
+
+def _tokens_documento(registro: Dict[str, Any]) -> Tuple[List[str], List[int]]:
+    nome = tokenizar(registro['strain'])
+    descricao = tokenizar(registro['description'])
+    inicio = len(nome) + INTERVALO_CAMPOS
+    return nome + descricao, list(range(len(nome))) + list(range(inicio, inicio + len(descricao)))
+
+def construir(indice: IndiceStrains, diretorio: str) -> None:
+    """Monta as listas de postagens com posições e grava os arrays em `diretorio`."""
+    por_documento = [_tokens_documento(r) for r in indice.registros]
+    vocabulario = sorted({t for tokens, _ in por_documento for t in tokens})
+    ids = {termo: i for i, termo in enumerate(vocabulario)}
+    termos = np.fromiter((ids[t] for tokens, _ in por_documento for t in tokens), dtype=np.int32)
+    documentos = np.repeat(np.arange(len(por_documento), dtype=np.int32), [len(tokens) for tokens, _ in por_documento])
+    posicoes = np.fromiter((p for _, lista in por_documento for p in lista), dtype=np.int32)
+
+    # Ocorrências ordenadas por termo, documento e posição; cada (termo, documento) é uma postagem
+    ordem = np.lexsort((posicoes, documentos, termos))
+    termos, documentos, posicoes = termos[ordem], documentos[ordem], posicoes[ordem]
+    nova = np.ones(len(termos), dtype=bool)
+    nova[1:] = (termos[1:] != termos[:-1]) | (documentos[1:] != documentos[:-1])
+    inicio_posicoes = np.append(np.flatnonzero(nova), len(termos)).astype(np.int64)
+    termo_postagem = termos[nova]
+
+    arrays = {
+        'termos': np.array(vocabulario, dtype=str),
+        'inicio_postagens': np.searchsorted(termo_postagem, np.arange(len(vocabulario) + 1)).astype(np.int64),
+        'documentos': documentos[nova],
+        'frequencias': np.diff(inicio_posicoes).astype(np.int32),
+        'inicio_posicoes': inicio_posicoes,
+        'posicoes': posicoes,
+        'comprimentos': np.array([len(tokens) for tokens, _ in por_documento], dtype=np.int32),
+    }
+    for nome, valores in arrays.items():
+        np.save(os.path.join(diretorio, nome + '.npy'), valores)
+
+class IndiceBM25:
+    """Índice gravado por `construir`, aberto por mapeamento de memória."""
+
+    def __init__(self, diretorio: str):
+        for nome in ARRAYS:
+            setattr(self, nome, np.load(os.path.join(diretorio, nome + '.npy'), mmap_mode='r'))
+        self.total_documentos = len(self.comprimentos)
+        self.comprimento_medio = float(np.mean(self.comprimentos)) if self.total_documentos else 0.0
+        # Normalização de comprimento do BM25, fixa por documento
+        self._norma = K1 * (1 - B + B * np.asarray(self.comprimentos) / max(self.comprimento_medio, 1e-9))
+
+    def _faixa(self, termo: str, prefixo: bool = False) -> Tuple[int, int]:
+        """Faixa de ids de termo: um termo exato ou todos os que começam com `termo`."""
+        inicio = int(np.searchsorted(self.termos, termo, side='left'))
+        if prefixo:
+            return inicio, int(np.searchsorted(self.termos, termo + '\uffff', side='right'))
+        return (inicio, inicio + 1) if inicio < len(self.termos) and self.termos[inicio] == termo else (inicio, inicio)
+
+    def _bm25(self, documentos: np.ndarray, frequencias: np.ndarray, frequencia_documentos: int) -> np.ndarray:
+        idf = np.log(1 + (self.total_documentos - frequencia_documentos + 0.5) / (frequencia_documentos + 0.5))
+        return idf * frequencias * (K1 + 1) / (frequencias + self._norma[documentos])
+
+    def pontuar_termo(self, termo: str, prefixo: bool = False) -> np.ndarray:
+        """BM25 de um termo (ou o maior entre os termos de um prefixo) para cada documento."""
+        pontos = np.zeros(self.total_documentos)
+        primeiro, ultimo = self._faixa(termo, prefixo)
+        if primeiro == ultimo:
+            return pontos
+        # Os termos de um prefixo são vizinhos no vocabulário, então suas postagens são contíguas
+        limites = np.asarray(self.inicio_postagens[primeiro:ultimo + 1])
+        documentos = np.asarray(self.documentos[limites[0]:limites[-1]])
+        frequencia_documentos = np.repeat(np.diff(limites), np.diff(limites))
+        contribuicao = self._bm25(documentos, np.asarray(self.frequencias[limites[0]:limites[-1]], dtype=np.float64),
+                                  frequencia_documentos)
+        np.maximum.at(pontos, documentos, contribuicao)
+        return pontos
+
+    def _ocorrencias(self, termo_id: int) -> np.ndarray:
+        """Chaves documento × posição de todas as ocorrências de um termo."""
+        p0, p1 = int(self.inicio_postagens[termo_id]), int(self.inicio_postagens[termo_id + 1])
+        q0, q1 = int(self.inicio_posicoes[p0]), int(self.inicio_posicoes[p1])
+        documentos = np.repeat(np.asarray(self.documentos[p0:p1], dtype=np.int64), np.asarray(self.frequencias[p0:p1]))
+        return documentos << 32 | np.asarray(self.posicoes[q0:q1], dtype=np.int64)
+
+    def pontuar_frase(self, termos: List[str]) -> np.ndarray:
+        """BM25 da frase, com frequência = ocorrências consecutivas dos termos no documento."""
+        pontos = np.zeros(self.total_documentos)
+        if not termos:
+            return pontos
+        inicios = None
+        for deslocamento, termo in enumerate(termos):
+            primeiro, ultimo = self._faixa(termo)
+            if primeiro == ultimo:
+                return pontos
+            # Posição de início da frase implicada por esta ocorrência
+            chaves = self._ocorrencias(primeiro) - deslocamento
+            inicios = chaves if inicios is None else np.intersect1d(inicios, chaves, assume_unique=True)
+            if not inicios.size:
+                return pontos
+        documentos, frequencias = np.unique(inicios >> 32, return_counts=True)
+        pontos[documentos] = self._bm25(documentos, frequencias.astype(np.float64), len(documentos))
+        return pontos
+
+    def pontuar(self, consulta: str, todas: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Pontuação total e máscara dos documentos que casam com a consulta."""
+        pontos = np.zeros(self.total_documentos)
+        casou = np.full(self.total_documentos, todas)
+        clausulas = 0
+        for frase, palavra in _CLAUSULA.findall(consulta):
+            if frase:
+                parcial = self.pontuar_frase(tokenizar(frase))
+            else:
+                prefixo = palavra.endswith('*')
+                tokens = tokenizar(palavra)
+                if not tokens:
+                    continue
+                # "haw*" é o prefixo haw; "og-kush" vira a frase og kush
+                parcial = self.pontuar_termo(tokens[0], prefixo) if len(tokens) == 1 else self.pontuar_frase(tokens)
+            clausulas += 1
+            pontos += parcial
+            casou = (casou & (parcial > 0)) if todas else (casou | (parcial > 0))
+        if not clausulas:
+            casou[:] = False
+        return pontos, casou
+
+def diretorio_padrao(caminho_catalogo: Optional[str] = None) -> str:
+    """Raiz dos índices; com `caminho_catalogo`, um subdiretório exclusivo desse arquivo de catálogo."""
+    base = os.environ.get('SIMULADOR_BUSCA_DIR') or os.path.join(tempfile.gettempdir(), 'simulador-busca')
+    if caminho_catalogo is None:
+        return base
+    return os.path.join(base, hashlib.sha256(os.path.abspath(caminho_catalogo).encode()).hexdigest()[:16])
+
+def abrir_ou_construir(indice: IndiceStrains, raiz: Optional[str] = None) -> IndiceBM25:
+    """Abre o índice gravado para este conteúdo do catálogo, construindo-o antes se ainda não existir.
+
+    Os outros índices em `raiz` são tratados como versões anteriores e removidos,
+    então a raiz deve ser exclusiva de um catálogo (ver `diretorio_padrao`).
+    """
+    raiz = raiz or diretorio_padrao()
+    impressao = impressao_catalogo(indice)
+    destino = os.path.join(raiz, impressao)
+    if not os.path.isdir(destino):
+        os.makedirs(raiz, exist_ok=True)
+        temporario = tempfile.mkdtemp(prefix='.construindo-', dir=raiz)
+        try:
+            construir(indice, temporario)
+            with open(os.path.join(temporario, 'meta.json'), 'w', encoding='utf-8') as arquivo:
+                json.dump({'versao': VERSAO_INDICE, 'documentos': indice.tamanho}, arquivo)
+            os.rename(temporario, destino)
+        except OSError:
+            # Outro worker publicou o mesmo índice antes; o dele vale
+            if not os.path.isdir(destino):
+                raise
+        finally:
+            shutil.rmtree(temporario, ignore_errors=True)
+        _podar(raiz, manter=impressao)
+    return IndiceBM25(destino)
+
+def _podar(raiz: str, manter: str) -> None:
+    """Remove índices de versões anteriores do catálogo (mapeamentos já abertos continuam válidos)."""
+    for nome in os.listdir(raiz):
+        if nome != manter and not nome.startswith('.'):
+            shutil.rmtree(os.path.join(raiz, nome), ignore_errors=True)
+
+class BuscaStrains:
+    """Busca sobre o índice atual do catálogo; troca o índice BM25 quando o catálogo é reconstruído."""
+
+    def __init__(self, catalogo: CatalogoStrains, raiz: Optional[str] = None):
+        self.catalogo = catalogo
+        # Cada arquivo de catálogo tem sua raiz: a poda de versões antigas não alcança os índices de outro
+        self.raiz = raiz or diretorio_padrao(catalogo.caminho)
+        self._atual: Optional[Tuple[IndiceStrains, IndiceBM25]] = None
+        self._lock = threading.Lock()
+
+    def indices(self) -> Tuple[IndiceStrains, IndiceBM25]:
+        indice = self.catalogo.indice()
+        atual = self._atual
+        if atual is None or atual[0] is not indice:
+            with self._lock:
+                if self._atual is None or self._atual[0] is not indice:
+                    self._atual = (indice, abrir_ou_construir(indice, self.raiz))
+                atual = self._atual
+        return atual
+
+    def buscar(self, consulta: str, todas: bool = False, mascara: Optional[np.ndarray] = None,
+               pagina: int = 1, por_pagina: int = 20) -> Dict[str, Any]:
+        """Uma página dos resultados em ordem de relevância (empates pela ordem do catálogo)."""
+        if pagina < 1 or not 1 <= por_pagina <= 100:
+            raise ValueError("A página deve ser >= 1 e o tamanho da página entre 1 e 100.")
+        indice, bm25 = self.indices()
+        pontos, casou = bm25.pontuar(consulta, todas)
+        if mascara is not None:
+            casou &= mascara
+        ids = np.flatnonzero(casou)
+        ids = ids[np.argsort(-pontos[ids], kind='stable')]
+        inicio = (pagina - 1) * por_pagina
+        return {
+            'total': int(ids.size),
+            'page': pagina,
+            'per_page': por_pagina,
+            'results': [{**indice.registros[i], 'score': round(float(pontos[i]), 6)} for i in ids[inicio:inicio + por_pagina].tolist()],
+        }
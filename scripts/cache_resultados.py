@@ -0,0 +1,136 @@
+"""Cache de resultados do simulador.
+
+`simular()` é uma função pura das três dataclasses, então o resultado pode ser
+reaproveitado sempre que os mesmos parâmetros (já normalizados) voltarem. A
+chave inclui a impressão digital do motor — versão declarada mais o hash do
+código-fonte de `simulador_cultivo.py` — para que nenhuma alteração no motor
+sirva resultados antigos, nem da memória nem do disco compartilhado.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any, Callable, Dict, Optional
+
+import simulador_cultivo
+from simulador_cultivo import SetupInvestimento, ParametrosCiclo, CustosMercado
+
+def impressao_motor() -> str:
+    """Identifica a versão efetiva do motor de simulação."""
+    with open(simulador_cultivo.__file__, 'rb') as arquivo:
+        fonte = arquivo.read()
+    return hashlib.sha256(simulador_cultivo.VERSAO_MOTOR.encode() + b'\0' + fonte).hexdigest()[:16]
+
+IMPRESSAO_MOTOR = impressao_motor()
+
+def chave_canonica(setup: SetupInvestimento, ciclo: ParametrosCiclo, mercado: CustosMercado) -> str:
+    """Hash estável dos parâmetros normalizados (todos os valores como float, campos ordenados)."""
+    normalizado = {
+        'motor': IMPRESSAO_MOTOR,
+        'setup': {k: float(v) for k, v in asdict(setup).items()},
+        'cycle': {k: float(v) for k, v in asdict(ciclo).items()},
+        'market': {k: float(v) for k, v in asdict(mercado).items()},
+    }
+    texto = json.dumps(normalizado, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+class CacheResultados:
+    """Cache LRU limitado, com TTL opcional e, opcionalmente, um SQLite compartilhado entre workers."""
+
+    def __init__(self, capacidade: int = 1024, ttl: Optional[float] = None, caminho_sqlite: Optional[str] = None):
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self._itens: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos_memoria = 0
+        self.acertos_disco = 0
+        self.falhas = 0
+        self._db = None
+        if caminho_sqlite:
+            self._db = sqlite3.connect(caminho_sqlite, timeout=5, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS resultados (chave TEXT PRIMARY KEY, motor TEXT NOT NULL, criado REAL NOT NULL, valor TEXT NOT NULL)')
+            # Resultados de outras versões do motor nunca mais serão consultados
+            self._db.execute('DELETE FROM resultados WHERE motor != ?', (IMPRESSAO_MOTOR,))
+            self._db.commit()
+
+    def obter(self, chave: str) -> Optional[Dict[str, Any]]:
+        agora = time.time()
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                criado, valor = item
+                if self.ttl is None or agora - criado < self.ttl:
+                    self._itens.move_to_end(chave)
+                    self.acertos_memoria += 1
+                    return valor
+                del self._itens[chave]
+            if self._db is not None:
+                linha = self._db.execute('SELECT criado, valor FROM resultados WHERE chave = ? AND motor = ?',
+                                         (chave, IMPRESSAO_MOTOR)).fetchone()
+                if linha is not None and (self.ttl is None or agora - linha[0] < self.ttl):
+                    valor = json.loads(linha[1])
+                    self._inserir_memoria(chave, linha[0], valor)
+                    self.acertos_disco += 1
+                    return valor
+            self.falhas += 1
+            return None
+
+    def guardar(self, chave: str, valor: Dict[str, Any]) -> None:
+        agora = time.time()
+        with self._lock:
+            self._inserir_memoria(chave, agora, valor)
+            if self._db is not None:
+                self._db.execute('INSERT OR REPLACE INTO resultados (chave, motor, criado, valor) VALUES (?, ?, ?, ?)',
+                                 (chave, IMPRESSAO_MOTOR, agora, json.dumps(valor)))
+                self._db.commit()
+
+    def obter_ou_calcular(self, chave: str, calcular: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        valor = self.obter(chave)
+        if valor is None:
+            valor = calcular()
+            self.guardar(chave, valor)
+        return valor
+
+    def _inserir_memoria(self, chave: str, criado: float, valor: Dict[str, Any]) -> None:
+        self._itens[chave] = (criado, valor)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.capacidade:
+            self._itens.popitem(last=False)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+            if self._db is not None:
+                self._db.execute('DELETE FROM resultados')
+                self._db.commit()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            acertos = self.acertos_memoria + self.acertos_disco
+            total = acertos + self.falhas
+            return {
+                'motor': IMPRESSAO_MOTOR,
+                'tamanho': len(self._itens),
+                'capacidade': self.capacidade,
+                'ttl': self.ttl,
+                'sqlite': self._db is not None,
+                'acertos_memoria': self.acertos_memoria,
+                'acertos_disco': self.acertos_disco,
+                'falhas': self.falhas,
+                'taxa_acerto': acertos / total if total else 0.0,
+            }
+
+def cache_do_ambiente() -> CacheResultados:
+    """Cria o cache a partir das variáveis SIMULADOR_CACHE_TAMANHO, SIMULADOR_CACHE_TTL e SIMULADOR_CACHE_SQLITE."""
+    ttl = os.environ.get('SIMULADOR_CACHE_TTL')
+    return CacheResultados(
+        capacidade=int(os.environ.get('SIMULADOR_CACHE_TAMANHO', 1024)),
+        ttl=float(ttl) if ttl else None,
+        caminho_sqlite=os.environ.get('SIMULADOR_CACHE_SQLITE') or None,
+    )
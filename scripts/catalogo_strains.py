@@ -0,0 +1,211 @@
+"""Catálogo de strains indexado, sobre `data/strainscannabis.csv`.
+
+`getData()` (lib/getStrainsData.ts) relê e filtra o CSV inteiro a cada
+chamada. Aqui o arquivo é lido uma vez e vira um `IndiceStrains` imutável:
+
+- as strains ficam numa ordem fixa (nota decrescente, depois nome), de modo
+  que qualquer conjunto de resultados já sai ordenado;
+- cada tipo, efeito e sabor tem uma máscara booleana sobre essa ordem
+  (índice invertido, uma linha de uma matriz tag × strain por faceta), e
+  filtros combinados são ANDs de máscaras;
+- as notas distintas ficam ordenadas, com máscaras acumuladas, e uma faixa
+  de nota vira duas buscas binárias e um AND.
+
+A cada consulta o `CatalogoStrains` compara o mtime e o tamanho do arquivo
+com os da última leitura e, se mudaram, monta um índice novo e o troca de uma
+vez, sem bloquear as consultas em andamento.
+"""
+
+import bisect
+import csv
+import os
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+CAMINHO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'strainscannabis.csv')
+# Tags que no CSV significam "sem informação"
+TAGS_VAZIAS = {'', 'none'}
+ORDENACOES = ('rating', 'name')
+
+def _tags(texto: str) -> List[str]:
+    """Separa uma célula de tags ("Relaxed,Happy\\n") em tags limpas e sem repetição."""
+    vistas, tags = set(), []
+    for tag in texto.split(','):
+        tag = tag.strip()
+        if tag.lower() not in TAGS_VAZIAS and tag.lower() not in vistas:
+            vistas.add(tag.lower())
+            tags.append(tag)
+    return tags
+
+_PALAVRA = re.compile(r'[a-z0-9]+')
+# Marcas diacríticas combinantes que sobram da decomposição NFKD
+_ACENTOS = re.compile('[\u0300-\u036f]')
+
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas e sem acentos ("Floração" -> "floracao"), para casar português e inglês do mesmo jeito."""
+    texto = texto.lower()
+    if texto.isascii():
+        return texto
+    return _ACENTOS.sub('', unicodedata.normalize('NFKD', texto))
+
+def tokenizar(texto: str) -> List[str]:
+    return _PALAVRA.findall(normalizar_texto(texto))
+
+def _nota(texto: str) -> float:
+    try:
+        return float(texto)
+    except ValueError:
+        return float('nan')
+
+class IndiceStrains:
+    """Índices de uma leitura do CSV. Não muda depois de criado."""
+
+    def __init__(self, linhas: Sequence[Dict[str, str]]):
+        registros = [{
+            'strain': linha['Strain'].strip(),
+            'type': linha['Type'].strip().lower(),
+            'rating': _nota(linha['Rating']),
+            'effects': _tags(linha['Effects']),
+            'flavors': _tags(linha['Flavor']),
+            'description': linha['Description'].strip(),
+        } for linha in linhas]
+        # Ordem canônica: nota decrescente (sem nota no fim), depois nome
+        registros.sort(key=lambda r: (-(r['rating'] if r['rating'] == r['rating'] else -1.0), r['strain'].lower()))
+        self.registros = registros
+        self.tamanho = len(registros)
+        self.por_nome = {r['strain'].lower(): i for i, r in enumerate(registros)}
+        self.ordem_nome = np.array(sorted(range(self.tamanho), key=lambda i: registros[i]['strain'].lower()), dtype=np.intp)
+
+        # Índices invertidos: por faceta, uma matriz tag × strain; cada linha é a máscara de uma tag.
+        # `tags` guarda os nomes de exibição na ordem das linhas e `linhas` mapeia a tag em minúsculas.
+        self.tags: Dict[str, List[str]] = {}
+        self.linhas: Dict[str, Dict[str, int]] = {}
+        self.matrizes: Dict[str, np.ndarray] = {}
+        for faceta in ('type', 'effects', 'flavors'):
+            tags: List[str] = []
+            linhas: Dict[str, int] = {}
+            postagens: List[List[int]] = []
+            for i, registro in enumerate(registros):
+                for valor in ([registro['type']] if faceta == 'type' else registro[faceta]):
+                    linha = linhas.setdefault(valor.lower(), len(tags))
+                    if linha == len(tags):
+                        tags.append(valor)
+                        postagens.append([])
+                    postagens[linha].append(i)
+            matriz = np.zeros((len(tags), self.tamanho), dtype=bool)
+            for linha, ids in enumerate(postagens):
+                matriz[linha, ids] = True
+            self.tags[faceta], self.linhas[faceta], self.matrizes[faceta] = tags, linhas, matriz
+        # Cópias em float32 para contar tags de um resultado com um produto matriz-vetor
+        self._contadoras = {faceta: matriz.astype(np.float32) for faceta, matriz in self.matrizes.items()}
+
+        # Faixas de nota: notas distintas crescentes e, para cada uma, a máscara das notas >= ela
+        notas = np.array([r['rating'] for r in registros])
+        self.notas = notas
+        self.notas_distintas = sorted(set(notas[~np.isnan(notas)].tolist()))
+        self._nota_ao_menos = [notas >= nota for nota in self.notas_distintas] + [np.zeros(self.tamanho, dtype=bool)]
+        self._com_nota = ~np.isnan(notas)
+
+    def mascara(self, faceta: str, tag: str) -> Optional[np.ndarray]:
+        linha = self.linhas[faceta].get(tag.strip().lower())
+        return None if linha is None else self.matrizes[faceta][linha]
+
+    def _faixa_nota(self, minimo: Optional[float], maximo: Optional[float]) -> np.ndarray:
+        mascara = self._com_nota
+        if minimo is not None:
+            mascara = mascara & self._nota_ao_menos[bisect.bisect_left(self.notas_distintas, minimo)]
+        if maximo is not None:
+            mascara = mascara & ~self._nota_ao_menos[bisect.bisect_right(self.notas_distintas, maximo)]
+        return mascara
+
+    def filtrar(self, tipos: Sequence[str] = (), efeitos: Sequence[str] = (), sabores: Sequence[str] = (),
+                nota_min: Optional[float] = None, nota_max: Optional[float] = None) -> np.ndarray:
+        """Máscara das strains que atendem a todos os filtros.
+
+        Vários tipos combinam com OU (uma strain tem um tipo só); efeitos e
+        sabores combinam com E. Tags desconhecidas não casam com nada.
+        """
+        mascara = np.ones(self.tamanho, dtype=bool)
+        if tipos:
+            qualquer = np.zeros(self.tamanho, dtype=bool)
+            for tipo in tipos:
+                atual = self.mascara('type', tipo)
+                if atual is not None:
+                    qualquer |= atual
+            mascara &= qualquer
+        for faceta, tags in (('effects', efeitos), ('flavors', sabores)):
+            for tag in tags:
+                atual = self.mascara(faceta, tag)
+                if atual is None:
+                    return np.zeros(self.tamanho, dtype=bool)
+                mascara &= atual
+        if nota_min is not None or nota_max is not None:
+            mascara &= self._faixa_nota(nota_min, nota_max)
+        return mascara
+
+    def contagens(self, mascara: np.ndarray) -> Dict[str, Dict[str, int]]:
+        """Quantas strains do resultado têm cada tag, por faceta (para montar filtros na interface)."""
+        peso = mascara.astype(np.float32)
+        return {faceta: dict(zip(self.tags[faceta], (contadora @ peso).astype(int).tolist()))
+                for faceta, contadora in self._contadoras.items()}
+
+class CatalogoStrains:
+    """Consulta o índice do CSV e o reconstrói quando o arquivo muda."""
+
+    def __init__(self, caminho: str = CAMINHO_PADRAO):
+        self.caminho = caminho
+        self._indice: Optional[IndiceStrains] = None
+        self._assinatura = None
+        self._lock = threading.Lock()
+        self.reconstrucoes = 0
+
+    def _assinatura_arquivo(self):
+        estado = os.stat(self.caminho)
+        return (estado.st_mtime_ns, estado.st_size)
+
+    def indice(self) -> IndiceStrains:
+        assinatura = self._assinatura_arquivo()
+        if assinatura != self._assinatura:
+            with self._lock:
+                # Outra thread pode ter reconstruído enquanto esperávamos o lock
+                if assinatura != self._assinatura:
+                    with open(self.caminho, encoding='utf-8', newline='') as arquivo:
+                        indice = IndiceStrains(list(csv.DictReader(arquivo)))
+                    self._indice, self._assinatura = indice, assinatura
+                    self.reconstrucoes += 1
+        return self._indice
+
+    def buscar(self, tipos: Sequence[str] = (), efeitos: Sequence[str] = (), sabores: Sequence[str] = (),
+               nota_min: Optional[float] = None, nota_max: Optional[float] = None, pagina: int = 1,
+               por_pagina: int = 20, ordenar: str = 'rating', facetas: bool = False) -> Dict[str, Any]:
+        """Uma página das strains filtradas, com o total e, opcionalmente, as contagens por tag."""
+        if ordenar not in ORDENACOES:
+            raise ValueError(f"Ordenação inválida: '{ordenar}'. Use um de {', '.join(ORDENACOES)}.")
+        if pagina < 1 or not 1 <= por_pagina <= 500:
+            raise ValueError("A página deve ser >= 1 e o tamanho da página entre 1 e 500.")
+        indice = self.indice()
+        mascara = indice.filtrar(tipos, efeitos, sabores, nota_min, nota_max)
+        ids = np.flatnonzero(mascara) if ordenar == 'rating' else indice.ordem_nome[mascara[indice.ordem_nome]]
+        inicio = (pagina - 1) * por_pagina
+        resposta = {
+            'total': int(ids.size),
+            'page': pagina,
+            'per_page': por_pagina,
+            'results': [indice.registros[i] for i in ids[inicio:inicio + por_pagina].tolist()],
+        }
+        if facetas:
+            resposta['facets'] = indice.contagens(mascara)
+        return resposta
+
+    def obter(self, nome: str) -> Optional[Dict[str, Any]]:
+        indice = self.indice()
+        posicao = indice.por_nome.get(nome.strip().lower())
+        return None if posicao is None else indice.registros[posicao]
+
+def catalogo_do_ambiente() -> CatalogoStrains:
+    """Catálogo do CSV em SIMULADOR_STRAINS_CSV (padrão: data/strainscannabis.csv do repositório)."""
+    return CatalogoStrains(os.environ.get('SIMULADOR_STRAINS_CSV') or CAMINHO_PADRAO)
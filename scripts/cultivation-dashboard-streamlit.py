@@ -1,107 +1,97 @@
+import io
+import math
+import statistics
+import time
+from collections import deque
+from dataclasses import asdict
+
 import streamlit as st
-import matplotlib.pyplot as plt
-import numpy as np
-import pandas as pd
-from dataclasses import dataclass, asdict
-from typing import Dict, Any
-
-# --- ESTRUTURA DE DADOS MODULAR (COM DATACLASSES) ---
-
-@dataclass
-class SetupInvestimento:
-    """Parâmetros do setup e custos de investimento inicial."""
-    area_m2: float = 1.00
-    custo_equip_iluminacao: float = 2000.0
-    custo_tenda_estrutura: float = 1500.0
-    custo_ventilacao_exaustao: float = 800.0
-    custo_outros_equipamentos: float = 500.0
-
-@dataclass
-class ParametrosCiclo:
-    """Parâmetros que definem um ciclo de cultivo."""
-    potencia_watts: int = 240
-    num_plantas: int = 6
-    producao_por_planta_g: int = 50
-    dias_vegetativo: int = 50
-    horas_luz_veg: int = 16
-    dias_floracao: int = 90
-    horas_luz_flor: int = 12
-    dias_secagem_cura: int = 15
-
-@dataclass
-class CustosMercado:
-    """Custos operacionais por ciclo e condições de mercado."""
-    preco_kwh: float = 0.95
-    custo_sementes_clones: float = 500.0
-    custo_substrato: float = 120.0
-    custo_nutrientes: float = 350.0
-    custos_operacionais_misc: float = 100.0
-    preco_venda_por_grama: float = 45.0
-
-# --- MOTOR DE SIMULAÇÃO ---
-
-class SimuladorCultivoCompleto:
-    def __init__(self, setup: SetupInvestimento, ciclo: ParametrosCiclo, mercado: CustosMercado):
-        self.setup = setup
-        self.ciclo = ciclo
-        self.mercado = mercado
-    
-    def simular(self) -> Dict[str, Any]:
-        # --- Custos de Investimento ---
-        custo_total_investimento = sum(asdict(self.setup).values()) - self.setup.area_m2
-        
-        # --- Custos Operacionais por Ciclo ---
-        consumo_kwh_veg = (self.ciclo.potencia_watts / 1000) * self.ciclo.horas_luz_veg * self.ciclo.dias_vegetativo
-        consumo_kwh_flor = (self.ciclo.potencia_watts / 1000) * self.ciclo.horas_luz_flor * self.ciclo.dias_floracao
-        custo_energia = (consumo_kwh_veg + consumo_kwh_flor) * self.mercado.preco_kwh
-        
-        custos_operacionais_dict = {
-            'Energia Elétrica': custo_energia,
-            'Sementes/Clones': self.mercado.custo_sementes_clones,
-            'Substrato': self.mercado.custo_substrato,
-            'Nutrientes': self.mercado.custo_nutrientes,
-            'Outros Custos (Ciclo)': self.mercado.custos_operacionais_misc
-        }
-        custo_operacional_total_ciclo = sum(custos_operacionais_dict.values())
-        
-        # --- Produção e Receita por Ciclo ---
-        producao_total_g = self.ciclo.num_plantas * self.ciclo.producao_por_planta_g
-        receita_bruta_ciclo = producao_total_g * self.mercado.preco_venda_por_grama
-        lucro_liquido_ciclo = receita_bruta_ciclo - custo_operacional_total_ciclo
-        
-        # --- Métricas de Eficiência e Negócio ---
-        custo_por_grama = custo_operacional_total_ciclo / producao_total_g if producao_total_g > 0 else 0
-        gramas_por_watt = producao_total_g / self.ciclo.potencia_watts if self.ciclo.potencia_watts > 0 else 0
-        gramas_por_m2 = producao_total_g / self.setup.area_m2 if self.setup.area_m2 > 0 else 0
-        
-        # --- Análise de Payback e ROI ---
-        periodo_payback_ciclos = custo_total_investimento / lucro_liquido_ciclo if lucro_liquido_ciclo > 0 else float('inf')
-        roi_investimento_1_ano = ((lucro_liquido_ciclo * (365 / self.get_duracao_total_ciclo())) - custo_total_investimento) / custo_total_investimento * 100 if custo_total_investimento > 0 else float('inf')
-        
-        return {
-            # Resultados Financeiros
-            'Custo Total Investimento (R$)': custo_total_investimento,
-            'Custo Operacional p/ Ciclo (R$)': custo_operacional_total_ciclo,
-            'Receita Bruta p/ Ciclo (R$)': receita_bruta_ciclo,
-            'Lucro Líquido p/ Ciclo (R$)': lucro_liquido_ciclo,
-            # Métricas de Eficiência
-            'Custo por Grama (R$/g)': custo_por_grama,
-            'Gramas por Watt (g/W)': gramas_por_watt,
-            'Gramas por m² (g/m²)': gramas_por_m2,
-            # Métricas de Negócio
-            'Período de Payback (ciclos)': periodo_payback_ciclos,
-            'ROI sobre Investimento (1º Ano %)': roi_investimento_1_ano,
-            # Dicionários para gráficos
-            'detalhe_custos_operacionais': custos_operacionais_dict,
-            'detalhe_custos_investimento': {k.replace('custo_', '').replace('_', ' ').title(): v for k, v in asdict(self.setup).items() if 'custo' in k},
-        }
-    
-    def get_duracao_total_ciclo(self) -> int:
-        return self.ciclo.dias_vegetativo + self.ciclo.dias_floracao + self.ciclo.dias_secagem_cura
+from matplotlib.figure import Figure
+
+from simulador_cultivo import (SetupInvestimento, ParametrosCiclo, CustosMercado, SimuladorCultivoCompleto,
+                               FAIXAS_BARRA_LATERAL, ROTULOS_RESULTADO)
+from sensibilidade import analisar_sensibilidade
+
+ROTULOS_SENSIBILIDADE = {metrica: ROTULOS_RESULTADO[metrica]
+                         for metrica in ('lucro_liquido_ciclo', 'periodo_payback_ciclos', 'roi_investimento_1_ano')}
+
+# Execuções guardadas por sessão para o painel de desempenho
+HISTORICO_TEMPOS = 50
+
+def _controle(widget, rotulo: str, campo: str, padrao):
+    """Controle da barra lateral com mínimo, máximo e passo de `FAIXAS_BARRA_LATERAL`."""
+    minimo, maximo, passo = FAIXAS_BARRA_LATERAL[campo]
+    return widget(rotulo, minimo, maximo, padrao, passo)
+
+# --- CACHE DE RESULTADOS E GRÁFICOS ---
+# As funções abaixo recebem só valores simples (dicts e tuplas), que o cache do Streamlit
+# usa como chave; o cache é global, então vale entre sessões e usuários.
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def simular_cenario(setup: dict, ciclo: dict, mercado: dict) -> dict:
+    simulador = SimuladorCultivoCompleto(SetupInvestimento(**setup), ParametrosCiclo(**ciclo), CustosMercado(**mercado))
+    resultados = simulador.simular()
+    resultados['duracao_ciclo'] = simulador.get_duracao_total_ciclo()
+    return resultados
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def sensibilidade_cenario(setup: dict, ciclo: dict, mercado: dict, variacao: float) -> dict:
+    return analisar_sensibilidade(SetupInvestimento(**setup), ParametrosCiclo(**ciclo), CustosMercado(**mercado), variacao)['metricas']
+
+def _png(fig: Figure) -> bytes:
+    # Figure sem pyplot: nada de estado global compartilhado entre as sessões nem figuras esquecidas abertas
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=120, bbox_inches='tight')
+    return buffer.getvalue()
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def grafico_custos(custos: tuple) -> bytes:
+    fig = Figure(figsize=(8, 6))
+    ax = fig.subplots()
+    ax.pie([v for _, v in custos], labels=[k for k, _ in custos], autopct='%1.1f%%', startangle=90)
+    ax.set_title('Distribuição dos Custos Operacionais por Ciclo')
+    return _png(fig)
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def grafico_linha_tempo(dias_vegetativo: int, dias_floracao: int, dias_secagem_cura: int) -> bytes:
+    fig = Figure(figsize=(8, 6))
+    ax = fig.subplots()
+    fases = ['Vegetativo', 'Floração', 'Secagem/Cura']
+    duracao = [dias_vegetativo, dias_floracao, dias_secagem_cura]
+    cores = ['#4CAF50', '#FFC107', '#795548']
+    ax.barh(fases, duracao, color=cores)
+    ax.set_title(f'Linha do Tempo do Ciclo ({dias_vegetativo + dias_floracao + dias_secagem_cura} dias)')
+    ax.set_xlabel('Dias')
+    ax.grid(axis='x', linestyle=':', alpha=0.7)
+    return _png(fig)
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def grafico_tornado(nomes: tuple, baixos: tuple, altos: tuple, base: float, variacao: int, titulo: str) -> bytes:
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.barh(nomes, [b - base for b in baixos], left=base, color='#F44336', label=f'-{variacao}%')
+    ax.barh(nomes, [a - base for a in altos], left=base, color='#4CAF50', label=f'+{variacao}%')
+    ax.axvline(base, color='black', linewidth=1)
+    ax.set_title(f'Tornado: {titulo}')
+    ax.grid(axis='x', linestyle=':', alpha=0.7)
+    ax.legend()
+    return _png(fig)
+
+# --- MEDIÇÃO DE LATÊNCIA DAS EXECUÇÕES ---
+
+def registrar_tempo(chave: str, segundos: float) -> None:
+    st.session_state.setdefault(chave, deque(maxlen=HISTORICO_TEMPOS)).append(segundos)
+
+def resumo_tempos(chave: str) -> str:
+    tempos = st.session_state.get(chave)
+    if not tempos:
+        return "sem medições"
+    return f"última {tempos[-1] * 1000:.0f} ms · mediana {statistics.median(tempos) * 1000:.0f} ms ({len(tempos)} execuções)"
 
 # --- INTERFACE STREAMLIT ---
 
 def main():
+    inicio = time.perf_counter()
     st.set_page_config(
         page_title="Dashboard de Cultivo Indoor",
         page_icon="🌱",
@@ -116,31 +106,31 @@ def main():
     
     # Aba 1: Setup e Investimento
     st.sidebar.subheader("💰 Setup e Investimento")
-    area_m2 = st.sidebar.slider("Área de Cultivo (m²)", 0.36, 10.0, 2.25, 0.1)
-    custo_equip_iluminacao = st.sidebar.number_input("Custo Iluminação (R$)", 500.0, 10000.0, 2000.0, 100.0)
-    custo_tenda_estrutura = st.sidebar.number_input("Custo Tenda/Estrutura (R$)", 500.0, 5000.0, 1500.0, 100.0)
-    custo_ventilacao_exaustao = st.sidebar.number_input("Custo Ventilação (R$)", 200.0, 2000.0, 800.0, 50.0)
-    custo_outros_equipamentos = st.sidebar.number_input("Outros Equipamentos (R$)", 100.0, 2000.0, 500.0, 50.0)
+    area_m2 = _controle(st.sidebar.slider, "Área de Cultivo (m²)", 'area_m2', 2.25)
+    custo_equip_iluminacao = _controle(st.sidebar.number_input, "Custo Iluminação (R$)", 'custo_equip_iluminacao', 2000.0)
+    custo_tenda_estrutura = _controle(st.sidebar.number_input, "Custo Tenda/Estrutura (R$)", 'custo_tenda_estrutura', 1500.0)
+    custo_ventilacao_exaustao = _controle(st.sidebar.number_input, "Custo Ventilação (R$)", 'custo_ventilacao_exaustao', 800.0)
+    custo_outros_equipamentos = _controle(st.sidebar.number_input, "Outros Equipamentos (R$)", 'custo_outros_equipamentos', 500.0)
     
     # Aba 2: Parâmetros do Ciclo
     st.sidebar.subheader("🌿 Parâmetros do Ciclo")
-    potencia_watts = st.sidebar.slider("Potência Iluminação (W)", 50, 2000, 480, 10)
-    num_plantas = st.sidebar.slider("Nº de Plantas", 1, 30, 6, 1)
-    producao_por_planta_g = st.sidebar.slider("Produção/Planta (g)", 10, 250, 80, 5)
-    dias_vegetativo = st.sidebar.slider("Dias Vegetativo", 15, 120, 60, 1)
-    horas_luz_veg = st.sidebar.slider("Horas Luz (Veg)", 12, 24, 18, 1)
-    dias_floracao = st.sidebar.slider("Dias Floração", 45, 120, 70, 1)
-    horas_luz_flor = st.sidebar.slider("Horas Luz (Flora)", 8, 16, 12, 1)
-    dias_secagem_cura = st.sidebar.slider("Dias Secagem/Cura", 7, 40, 20, 1)
+    potencia_watts = _controle(st.sidebar.slider, "Potência Iluminação (W)", 'potencia_watts', 480)
+    num_plantas = _controle(st.sidebar.slider, "Nº de Plantas", 'num_plantas', 6)
+    producao_por_planta_g = _controle(st.sidebar.slider, "Produção/Planta (g)", 'producao_por_planta_g', 80)
+    dias_vegetativo = _controle(st.sidebar.slider, "Dias Vegetativo", 'dias_vegetativo', 60)
+    horas_luz_veg = _controle(st.sidebar.slider, "Horas Luz (Veg)", 'horas_luz_veg', 18)
+    dias_floracao = _controle(st.sidebar.slider, "Dias Floração", 'dias_floracao', 70)
+    horas_luz_flor = _controle(st.sidebar.slider, "Horas Luz (Flora)", 'horas_luz_flor', 12)
+    dias_secagem_cura = _controle(st.sidebar.slider, "Dias Secagem/Cura", 'dias_secagem_cura', 20)
     
     # Aba 3: Custos e Mercado
     st.sidebar.subheader("💵 Custos e Mercado")
-    preco_kwh = st.sidebar.number_input("Preço kWh (R$)", 0.1, 2.0, 0.95, 0.05)
-    custo_sementes_clones = st.sidebar.number_input("Custo Sementes/Clones (R$)", 100.0, 2000.0, 500.0, 50.0)
-    custo_substrato = st.sidebar.number_input("Custo Substrato (R$)", 50.0, 500.0, 120.0, 10.0)
-    custo_nutrientes = st.sidebar.number_input("Custo Nutrientes (R$)", 100.0, 1000.0, 350.0, 25.0)
-    custos_operacionais_misc = st.sidebar.number_input("Outros Custos/Ciclo (R$)", 50.0, 500.0, 100.0, 25.0)
-    preco_venda_por_grama = st.sidebar.slider("Preço Venda (R$/g)", 10.0, 100.0, 45.0, 1.0)
+    preco_kwh = _controle(st.sidebar.number_input, "Preço kWh (R$)", 'preco_kwh', 0.95)
+    custo_sementes_clones = _controle(st.sidebar.number_input, "Custo Sementes/Clones (R$)", 'custo_sementes_clones', 500.0)
+    custo_substrato = _controle(st.sidebar.number_input, "Custo Substrato (R$)", 'custo_substrato', 120.0)
+    custo_nutrientes = _controle(st.sidebar.number_input, "Custo Nutrientes (R$)", 'custo_nutrientes', 350.0)
+    custos_operacionais_misc = _controle(st.sidebar.number_input, "Outros Custos/Ciclo (R$)", 'custos_operacionais_misc', 100.0)
+    preco_venda_por_grama = _controle(st.sidebar.slider, "Preço Venda (R$/g)", 'preco_venda_por_grama', 45.0)
     
     # Criar objetos dataclass
     setup = SetupInvestimento(
@@ -171,9 +161,8 @@ def main():
         preco_venda_por_grama=preco_venda_por_grama
     )
     
-    # Executar simulação
-    simulador = SimuladorCultivoCompleto(setup, ciclo, mercado)
-    resultados = simulador.simular()
+    # Executar simulação (ou reaproveitar o resultado em cache dos mesmos parâmetros)
+    resultados = simular_cenario(asdict(setup), asdict(ciclo), asdict(mercado))
     
     # Exibir métricas principais
     col1, col2, col3, col4 = st.columns(4)
@@ -181,28 +170,28 @@ def main():
     with col1:
         st.metric(
             "💰 Lucro por Ciclo",
-            f"R$ {resultados['Lucro Líquido p/ Ciclo (R$)']:.2f}",
+            f"R$ {resultados[ROTULOS_RESULTADO['lucro_liquido_ciclo']]:.2f}",
             delta=None
         )
     
     with col2:
         st.metric(
             "⏱️ Payback",
-            f"{resultados['Período de Payback (ciclos)']:.1f} ciclos",
+            f"{resultados[ROTULOS_RESULTADO['periodo_payback_ciclos']]:.1f} ciclos",
             delta=None
         )
     
     with col3:
         st.metric(
             "📈 ROI (1º Ano)",
-            f"{resultados['ROI sobre Investimento (1º Ano %)']:.1f}%",
+            f"{resultados[ROTULOS_RESULTADO['roi_investimento_1_ano']]:.1f}%",
             delta=None
         )
     
     with col4:
         st.metric(
             "⚡ Eficiência",
-            f"{resultados['Gramas por Watt (g/W)']:.2f} g/W",
+            f"{resultados[ROTULOS_RESULTADO['gramas_por_watt']]:.2f} g/W",
             delta=None
         )
     
@@ -211,26 +200,14 @@ def main():
     # Gráficos
     col1, col2 = st.columns(2)
     
+    # Cada gráfico só é redesenhado quando mudam os parâmetros que ele usa
     with col1:
         # Gráfico de custos operacionais
-        fig1, ax1 = plt.subplots(figsize=(8, 6))
-        custos_op = resultados['detalhe_custos_operacionais']
-        ax1.pie(custos_op.values(), labels=custos_op.keys(), autopct='%1.1f%%', startangle=90)
-        ax1.set_title('Distribuição dos Custos Operacionais por Ciclo')
-        st.pyplot(fig1)
+        st.image(grafico_custos(tuple(resultados['detalhe_custos_operacionais'].items())), width='stretch')
     
     with col2:
         # Gráfico de linha do tempo
-        fig2, ax2 = plt.subplots(figsize=(8, 6))
-        fases = ['Vegetativo', 'Floração', 'Secagem/Cura']
-        duracao = [ciclo.dias_vegetativo, ciclo.dias_floracao, ciclo.dias_secagem_cura]
-        cores = ['#4CAF50', '#FFC107', '#795548']
-        
-        ax2.barh(fases, duracao, color=cores)
-        ax2.set_title(f'Linha do Tempo do Ciclo ({simulador.get_duracao_total_ciclo()} dias)')
-        ax2.set_xlabel('Dias')
-        ax2.grid(axis='x', linestyle=':', alpha=0.7)
-        st.pyplot(fig2)
+        st.image(grafico_linha_tempo(ciclo.dias_vegetativo, ciclo.dias_floracao, ciclo.dias_secagem_cura), width='stretch')
     
     # Tabela de resultados detalhados
     st.subheader("📊 Resultados Detalhados")
@@ -239,17 +216,51 @@ def main():
     
     with col1:
         st.write("**Métricas Financeiras:**")
-        st.write(f"• Investimento Total: R$ {resultados['Custo Total Investimento (R$)']:.2f}")
-        st.write(f"• Custo Operacional/Ciclo: R$ {resultados['Custo Operacional p/ Ciclo (R$)']:.2f}")
-        st.write(f"• Receita Bruta/Ciclo: R$ {resultados['Receita Bruta p/ Ciclo (R$)']:.2f}")
-        st.write(f"• Lucro Líquido/Ciclo: R$ {resultados['Lucro Líquido p/ Ciclo (R$)']:.2f}")
+        st.write(f"• Investimento Total: R$ {resultados[ROTULOS_RESULTADO['custo_total_investimento']]:.2f}")
+        st.write(f"• Custo Operacional/Ciclo: R$ {resultados[ROTULOS_RESULTADO['custo_operacional_total_ciclo']]:.2f}")
+        st.write(f"• Receita Bruta/Ciclo: R$ {resultados[ROTULOS_RESULTADO['receita_bruta_ciclo']]:.2f}")
+        st.write(f"• Lucro Líquido/Ciclo: R$ {resultados[ROTULOS_RESULTADO['lucro_liquido_ciclo']]:.2f}")
     
     with col2:
         st.write("**Métricas de Eficiência:**")
-        st.write(f"• Custo por Grama: R$ {resultados['Custo por Grama (R$/g)']:.2f}")
-        st.write(f"• Gramas por Watt: {resultados['Gramas por Watt (g/W)']:.2f} g/W")
-        st.write(f"• Gramas por m²: {resultados['Gramas por m² (g/m²)']:.0f} g/m²")
-        st.write(f"• Duração do Ciclo: {simulador.get_duracao_total_ciclo()} dias")
+        st.write(f"• Custo por Grama: R$ {resultados[ROTULOS_RESULTADO['custo_por_grama']]:.2f}")
+        st.write(f"• Gramas por Watt: {resultados[ROTULOS_RESULTADO['gramas_por_watt']]:.2f} g/W")
+        st.write(f"• Gramas por m²: {resultados[ROTULOS_RESULTADO['gramas_por_m2']]:.0f} g/m²")
+        st.write(f"• Duração do Ciclo: {resultados['duracao_ciclo']} dias")
+    
+    secao_sensibilidade(asdict(setup), asdict(ciclo), asdict(mercado))
+    
+    registrar_tempo('tempos_execucao', time.perf_counter() - inicio)
+    with st.sidebar.expander("⏱️ Desempenho"):
+        st.caption(f"Execução completa: {resumo_tempos('tempos_execucao')}")
+        st.caption(f"Só a sensibilidade: {resumo_tempos('tempos_fragmento')}")
+
+@st.fragment
+def secao_sensibilidade(setup: dict, ciclo: dict, mercado: dict):
+    """Análise de sensibilidade (tornado); seus controles reexecutam só este trecho, não o painel inteiro."""
+    inicio = time.perf_counter()
+    st.subheader("🎯 Análise de Sensibilidade")
+    
+    col1, col2 = st.columns([1, 3])
+    
+    with col1:
+        metrica = st.selectbox("Métrica", list(ROTULOS_SENSIBILIDADE), format_func=ROTULOS_SENSIBILIDADE.get)
+        variacao = st.slider("Variação dos Parâmetros (±%)", 5, 50, 10, 5)
+        num_parametros = st.slider("Parâmetros Exibidos", 3, 15, 8, 1)
+    
+    analise = sensibilidade_cenario(setup, ciclo, mercado, variacao / 100)[metrica]
+    base = analise['base']
+    campos = [c for c in analise['campos'] if c['amplitude'] > 0 and math.isfinite(c['amplitude'])][:num_parametros]
+    
+    with col2:
+        if not math.isfinite(base) or not campos:
+            st.info("Sensibilidade indisponível para este cenário (métrica infinita ou sem variação).")
+        else:
+            campos = campos[::-1]
+            st.image(grafico_tornado(tuple(c['campo'] for c in campos), tuple(c['baixo'] for c in campos),
+                                     tuple(c['alto'] for c in campos), base, variacao, ROTULOS_SENSIBILIDADE[metrica]),
+                     width='stretch')
+    registrar_tempo('tempos_fragmento', time.perf_counter() - inicio)
 
 if __name__ == "__main__":
     main()
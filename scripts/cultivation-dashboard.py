@@ -1,107 +1,24 @@
+import asyncio
+import io
+import math
+import os
+import sys
+
 import ipywidgets as widgets
-from IPython.display import display, clear_output
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
 import numpy as np
-import pandas as pd
-from dataclasses import dataclass, asdict
-from typing import Dict, Any
-from datetime import date, timedelta
-
-# --- PASSO 1: ESTRUTURA DE DADOS MODULAR (COM DATACLASSES) ---
-# Usar dataclasses torna a passagem de parâmetros mais limpa e organizada.
-
-@dataclass
-class SetupInvestimento:
-    """Parâmetros do setup e custos de investimento inicial."""
-    area_m2: float = 2.25
-    custo_equip_iluminacao: float = 2000.0
-    custo_tenda_estrutura: float = 1500.0
-    custo_ventilacao_exaustao: float = 800.0
-    custo_outros_equipamentos: float = 500.0
-
-@dataclass
-class ParametrosCiclo:
-    """Parâmetros que definem um ciclo de cultivo."""
-    potencia_watts: int = 240
-    num_plantas: int = 6
-    producao_por_planta_g: int = 50
-    dias_vegetativo: int = 50
-    horas_luz_veg: int = 16
-    dias_floracao: int = 90
-    horas_luz_flor: int = 12
-    dias_secagem_cura: int = 15
-
-@dataclass
-class CustosMercado:
-    """Custos operacionais por ciclo e condições de mercado."""
-    preco_kwh: float = 0.95
-    custo_sementes_clones: float = 500.0
-    custo_substrato: float = 420.0
-    custo_nutrientes: float = 350.0
-    custos_operacionais_misc: float = 100.0
-    preco_venda_por_grama: float = 45.0
-
-# --- PASSO 2: O NOVO "MOTOR" DE SIMULAÇÃO ---
-
-class SimuladorCultivoCompleto:
-    def __init__(self, setup: SetupInvestimento, ciclo: ParametrosCiclo, mercado: CustosMercado):
-        self.setup = setup
-        self.ciclo = ciclo
-        self.mercado = mercado
-    
-    def simular(self) -> Dict[str, Any]:
-        # --- Custos de Investimento ---
-        custo_total_investimento = sum(asdict(self.setup).values()) - self.setup.area_m2
-        
-        # --- Custos Operacionais por Ciclo ---
-        consumo_kwh_veg = (self.ciclo.potencia_watts / 1000) * self.ciclo.horas_luz_veg * self.ciclo.dias_vegetativo
-        consumo_kwh_flor = (self.ciclo.potencia_watts / 1000) * self.ciclo.horas_luz_flor * self.ciclo.dias_floracao
-        custo_energia = (consumo_kwh_veg + consumo_kwh_flor) * self.mercado.preco_kwh
-        
-        custos_operacionais_dict = {
-            'Energia Elétrica': custo_energia,
-            'Sementes/Clones': self.mercado.custo_sementes_clones,
-            'Substrato': self.mercado.custo_substrato,
-            'Nutrientes': self.mercado.custo_nutrientes,
-            'Outros Custos (Ciclo)': self.mercado.custos_operacionais_misc
-        }
-        custo_operacional_total_ciclo = sum(custos_operacionais_dict.values())
-        
-        # --- Produção e Receita por Ciclo ---
-        producao_total_g = self.ciclo.num_plantas * self.ciclo.producao_por_planta_g
-        receita_bruta_ciclo = producao_total_g * self.mercado.preco_venda_por_grama
-        lucro_liquido_ciclo = receita_bruta_ciclo - custo_operacional_total_ciclo
-        
-        # --- Métricas de Eficiência e Negócio ---
-        custo_por_grama = custo_operacional_total_ciclo / producao_total_g if producao_total_g > 0 else 0
-        gramas_por_watt = producao_total_g / self.ciclo.potencia_watts if self.ciclo.potencia_watts > 0 else 0
-        gramas_por_m2 = producao_total_g / self.setup.area_m2 if self.setup.area_m2 > 0 else 0
-        
-        # --- Análise de Payback e ROI ---
-        periodo_payback_ciclos = custo_total_investimento / lucro_liquido_ciclo if lucro_liquido_ciclo > 0 else float('inf')
-        roi_investimento_1_ano = ((lucro_liquido_ciclo * (365 / self.get_duracao_total_ciclo())) - custo_total_investimento) / custo_total_investimento * 100 if custo_total_investimento > 0 else float('inf')
-        
-        return {
-            # Resultados Financeiros
-            'Custo Total Investimento (R$)': custo_total_investimento,
-            'Custo Operacional p/ Ciclo (R$)': custo_operacional_total_ciclo,
-            'Receita Bruta p/ Ciclo (R$)': receita_bruta_ciclo,
-            'Lucro Líquido p/ Ciclo (R$)': lucro_liquido_ciclo,
-            # Métricas de Eficiência
-            'Custo por Grama (R$/g)': custo_por_grama,
-            'Gramas por Watt (g/W)': gramas_por_watt,
-            'Gramas por m² (g/m²)': gramas_por_m2,
-            # Métricas de Negócio
-            'Período de Payback (ciclos)': periodo_payback_ciclos,
-            'ROI sobre Investimento (1º Ano %)': roi_investimento_1_ano,
-            # Dicionários para gráficos
-            'detalhe_custos_operacionais': custos_operacionais_dict,
-            'detalhe_custos_investimento': {k.replace('custo_', '').replace('_', ' ').title(): v for k, v in asdict(self.setup).items() if 'custo' in k},
-        }
-    
-    def get_duracao_total_ciclo(self) -> int:
-        return self.ciclo.dias_vegetativo + self.ciclo.dias_floracao + self.ciclo.dias_secagem_cura
+from IPython.display import display
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
+from PIL import Image
+
+# Garante que o núcleo do simulador seja importável mesmo quando o script é executado de outro diretório
+# (colado numa célula de notebook não há __file__: vale o diretório atual)
+if '__file__' in globals():
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# PASSOS 1 e 2 (dataclasses e motor de simulação) ficam no núcleo compartilhado
+from simulador_cultivo import SetupInvestimento, ParametrosCiclo, CustosMercado, SimuladorCultivoCompleto, ROTULOS_RESULTADO
 
 # --- PASSO 3: CRIAÇÃO DOS WIDGETS ORGANIZADOS POR ABAS ---
 
@@ -152,81 +69,246 @@ tab_interface.set_title(0, '1. Setup e Investimento')
 tab_interface.set_title(1, '2. Parâmetros do Ciclo')
 tab_interface.set_title(2, '3. Custos e Mercado')
 
-output_area = widgets.Output()
+# --- PASSO 5: PAINEL PERSISTENTE E REDESENHO SOB DEMANDA ---
+# A figura é criada uma vez; cada mudança só troca textos, barras e limites dos artistas
+# existentes e redesenha, sobre um fundo em cache, apenas o que é dinâmico (blitting).
+# A figura inteira (e o tight_layout) só é refeita quando a estrutura muda: limites dos eixos
+# ou largura dos rótulos de escala.
 
-# --- PASSO 5: A NOVA FUNÇÃO DE ATUALIZAÇÃO E PLOTAGEM ---
+# Espera entre quadros enquanto um slider é arrastado; eventos nesse intervalo viram um só redesenho
+INTERVALO_QUADRO = 0.03
+# Sem eventos por este tempo, o quadro é reenviado em PNG (durante o arraste vai em JPEG, mais rápido)
+ESPERA_FINAL = 0.3
+
+def _limite_redondo(valor: float, passo_minimo: float = 1.0) -> float:
+    """Limite de eixo "redondo" acima de `valor` (com folga), que só muda de tempos em tempos durante um arraste."""
+    if not math.isfinite(valor) or valor <= 0:
+        return passo_minimo
+    passo = max(10 ** math.floor(math.log10(valor)) / 4, passo_minimo)
+    return math.ceil(valor * 1.1 / passo) * passo
+
+def _estado(artista):
+    """O que define o desenho de um artista dinâmico: posição e tamanho da barra, ou texto e posição."""
+    if isinstance(artista, Rectangle):
+        return artista.get_bbox().bounds
+    return artista.get_text(), artista.get_position(), getattr(artista, 'xy', None)
+
+def _extensao(artista, renderer):
+    # Margem de 2 px para a suavização das bordas
+    return artista.get_window_extent(renderer).padded(2)
+
+class PainelViabilidade:
+    """Figura 2x2 de viabilidade com os artistas criados uma vez e atualizados no lugar."""
+
+    def __init__(self, figsize=(16, 12), dpi=100):
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.fig)
+        ax = self.fig.subplots(2, 2)
+        self.fig.suptitle('Análise Completa de Viabilidade do Cultivo Indoor', fontsize=18, weight='bold')
 
-def atualizar_dashboard_completo(**kwargs):
-    output_area.clear_output(wait=True)
-    
-    # Coleta e organiza os parâmetros dos widgets nas dataclasses
-    setup_params = SetupInvestimento(**{k: v for k, v in kwargs.items() if k in w_setup})
-    ciclo_params = ParametrosCiclo(**{k: v for k, v in kwargs.items() if k in w_ciclo})
-    mercado_params = CustosMercado(**{k: v for k, v in kwargs.items() if k in w_mercado})
-    
-    simulador = SimuladorCultivoCompleto(setup_params, ciclo_params, mercado_params)
-    resultados = simulador.simular()
-    
-    with output_area:
-        # Layout de plots 2x2
-        fig, ax = plt.subplots(2, 2, figsize=(16, 12))
-        fig.suptitle('Análise Completa de Viabilidade do Cultivo Indoor', fontsize=18, weight='bold')
-        
         # --- Gráfico 1: KPIs de Negócio ---
-        ax[0, 0].text(0.5, 0.85, f"R$ {resultados['Lucro Líquido p/ Ciclo (R$)']:.2f}", fontsize=22, weight='bold', ha='center', color='green')
+        self.lucro = ax[0, 0].text(0.5, 0.85, '', fontsize=22, weight='bold', ha='center', color='green')
         ax[0, 0].text(0.5, 0.78, "Lucro Líquido por Ciclo", fontsize=12, ha='center')
-        ax[0, 0].text(0.5, 0.55, f"{resultados['Período de Payback (ciclos)']:.1f} ciclos", fontsize=16, ha='center')
+        self.payback = ax[0, 0].text(0.5, 0.55, '', fontsize=16, ha='center')
         ax[0, 0].text(0.5, 0.48, "Payback do Investimento", fontsize=12, ha='center')
-        ax[0, 0].text(0.5, 0.25, f"{resultados['ROI sobre Investimento (1º Ano %)']:.1f} %", fontsize=16, ha='center', color='blue')
+        self.roi = ax[0, 0].text(0.5, 0.25, '', fontsize=16, ha='center', color='blue')
         ax[0, 0].text(0.5, 0.18, "ROI Estimado (1º Ano)", fontsize=12, ha='center')
         ax[0, 0].set_title('Principais Métricas de Negócio', fontsize=14)
         ax[0, 0].axis('off')
-        
+
         # --- Gráfico 2: KPIs de Eficiência ---
-        ax[0, 1].text(0.5, 0.85, f"{resultados['Gramas por Watt (g/W)']:.2f} g/W", fontsize=18, weight='bold', ha='center')
+        self.gramas_watt = ax[0, 1].text(0.5, 0.85, '', fontsize=18, weight='bold', ha='center')
         ax[0, 1].text(0.5, 0.78, "Eficiência da Iluminação", fontsize=12, ha='center')
-        ax[0, 1].text(0.5, 0.55, f"R$ {resultados['Custo por Grama (R$/g)']:.2f} /g", fontsize=18, weight='bold', ha='center', color='red')
+        self.custo_grama = ax[0, 1].text(0.5, 0.55, '', fontsize=18, weight='bold', ha='center', color='red')
         ax[0, 1].text(0.5, 0.48, "Custo de Produção por Grama", fontsize=12, ha='center')
-        ax[0, 1].text(0.5, 0.25, f"{resultados['Gramas por m² (g/m²)']:.0f} g/m²", fontsize=18, weight='bold', ha='center')
+        self.gramas_m2 = ax[0, 1].text(0.5, 0.25, '', fontsize=18, weight='bold', ha='center')
         ax[0, 1].text(0.5, 0.18, "Produtividade por Área", fontsize=12, ha='center')
         ax[0, 1].set_title('Métricas de Eficiência Operacional', fontsize=14)
         ax[0, 1].axis('off')
-        
+
         # --- Gráfico 3: Linha do Tempo do Ciclo ---
-        duracao_total = simulador.get_duracao_total_ciclo()
-        fases = {
-            'Vegetativo': (0, ciclo_params.dias_vegetativo),
-            'Floração': (ciclo_params.dias_vegetativo, ciclo_params.dias_floracao),
-            'Secagem/Cura': (ciclo_params.dias_vegetativo + ciclo_params.dias_floracao, ciclo_params.dias_secagem_cura),
-        }
-        cores_fases = ['#4CAF50', '#FFC107', '#795548']
-        ax[1, 0].barh(list(fases.keys()), [d[1] for d in fases.values()], left=[d[0] for d in fases.values()], color=cores_fases)
-        ax[1, 0].set_title(f'Linha do Tempo do Ciclo ({duracao_total} dias)', fontsize=14)
-        ax[1, 0].set_xlabel('Dias')
-        ax[1, 0].grid(axis='x', linestyle=':')
-        ax[1, 0].invert_yaxis()
-        
+        self.ax_tempo = ax[1, 0]
+        self.fases = self.ax_tempo.barh(['Vegetativo', 'Floração', 'Secagem/Cura'], [1, 1, 1], color=['#4CAF50', '#FFC107', '#795548'])
+        self.ax_tempo.set_xlabel('Dias')
+        # Grade atrás das barras, igual no desenho completo e no redesenho só das barras
+        self.ax_tempo.set_axisbelow(True)
+        self.ax_tempo.grid(axis='x', linestyle=':')
+        self.ax_tempo.invert_yaxis()
+
         # --- Gráfico 4: Custos (Investimento vs. Operacional) ---
-        labels = ['Investimento Inicial', 'Custo por 1 Ciclo']
-        valores = [resultados['Custo Total Investimento (R$)'], resultados['Custo Operacional p/ Ciclo (R$)']]
-        barras = ax[1, 1].bar(labels, valores, color=['#03A9F4', '#F44336'])
-        ax[1, 1].set_title('Estrutura de Custos', fontsize=14)
-        ax[1, 1].set_ylabel('Valor (R$)')
-        ax[1, 1].bar_label(barras, fmt='R$ %.2f')
-        
-        plt.tight_layout(rect=[0, 0, 1, 0.96])
-        plt.show()
+        self.ax_custos = ax[1, 1]
+        self.custos = self.ax_custos.bar(['Investimento Inicial', 'Custo por 1 Ciclo'], [1, 1], color=['#03A9F4', '#F44336'])
+        self.ax_custos.set_title('Estrutura de Custos', fontsize=14)
+        self.ax_custos.set_ylabel('Valor (R$)')
+        self.rotulos_custos = self.ax_custos.bar_label(self.custos, fmt='R$ %.2f')
+
+        self.dinamicos = [self.lucro, self.payback, self.roi, self.gramas_watt, self.custo_grama, self.gramas_m2,
+                          self.ax_tempo.title, *self.fases, *self.custos, *self.rotulos_custos]
+        for artista in self.dinamicos:
+            artista.set_animated(True)
+        self._estrutura = None
+        self._largura_rotulos = None
+        self._fundo = None
+        self._extensoes = {}
+        self._estados = {}
+
+    def atualizar(self, resultados: dict, ciclo: ParametrosCiclo) -> None:
+        """Troca os valores dos artistas e os limites dos eixos; não desenha."""
+        self.lucro.set_text(f"R$ {resultados[ROTULOS_RESULTADO['lucro_liquido_ciclo']]:.2f}")
+        self.payback.set_text(f"{resultados[ROTULOS_RESULTADO['periodo_payback_ciclos']]:.1f} ciclos")
+        self.roi.set_text(f"{resultados[ROTULOS_RESULTADO['roi_investimento_1_ano']]:.1f} %")
+        self.gramas_watt.set_text(f"{resultados[ROTULOS_RESULTADO['gramas_por_watt']]:.2f} g/W")
+        self.custo_grama.set_text(f"R$ {resultados[ROTULOS_RESULTADO['custo_por_grama']]:.2f} /g")
+        self.gramas_m2.set_text(f"{resultados[ROTULOS_RESULTADO['gramas_por_m2']]:.0f} g/m²")
+
+        inicio = 0
+        for barra, dias in zip(self.fases, (ciclo.dias_vegetativo, ciclo.dias_floracao, ciclo.dias_secagem_cura)):
+            barra.set_x(inicio)
+            barra.set_width(dias)
+            inicio += dias
+        self.ax_tempo.set_title(f'Linha do Tempo do Ciclo ({inicio} dias)', fontsize=14)
+
+        valores = (resultados[ROTULOS_RESULTADO['custo_total_investimento']],
+                   resultados[ROTULOS_RESULTADO['custo_operacional_total_ciclo']])
+        for barra, rotulo, valor in zip(self.custos, self.rotulos_custos, valores):
+            barra.set_height(valor)
+            rotulo.xy = (barra.get_x() + barra.get_width() / 2, valor)
+            rotulo.set_text(f'R$ {valor:.2f}')
+
+        limite_tempo = _limite_redondo(inicio, 10)
+        limite_custos = _limite_redondo(max(valores))
+        if (limite_tempo, limite_custos) != self._estrutura:
+            self._estrutura = (limite_tempo, limite_custos)
+            self.ax_tempo.set_xlim(0, limite_tempo)
+            self.ax_custos.set_ylim(0, limite_custos)
+            self._fundo = None
+            self._extensoes = {}
+
+    def desenhar(self) -> None:
+        """Redesenha só os artistas dinâmicos que mudaram (e os que os sobrepõem) sobre o fundo em cache.
+
+        O fundo é refeito quando a estrutura mudou.
+        """
+        canvas = self.fig.canvas
+        if self._fundo is None:
+            # O tight_layout só depende da largura dos rótulos do eixo de custos
+            largura_rotulos = len(f"{self._estrutura[1]:.0f}")
+            if largura_rotulos != self._largura_rotulos:
+                self._largura_rotulos = largura_rotulos
+                self.fig.tight_layout(rect=[0, 0, 1, 0.96])
+            canvas.draw()
+            self._fundo = np.asarray(canvas.buffer_rgba()).copy()
+            sujos = set(self.dinamicos)
+        else:
+            sujos = {artista for artista in self.dinamicos if _estado(artista) != self._estados[artista]}
+        renderer = canvas.get_renderer()
+        extensoes = {artista: _extensao(artista, renderer) for artista in self.dinamicos}
+
+        if self._extensoes:
+            # Cada região apagada precisa redesenhar todo artista que a toca, mesmo sem mudança
+            regioes = []
+            pendentes = list(sujos)
+            while pendentes:
+                artista = pendentes.pop()
+                novas = [self._extensoes[artista], extensoes[artista]]
+                regioes += novas
+                for outro in self.dinamicos:
+                    if outro not in sujos and any(extensoes[outro].overlaps(r) for r in novas):
+                        sujos.add(outro)
+                        pendentes.append(outro)
+            quadro = np.asarray(canvas.buffer_rgba())
+            altura = quadro.shape[0]
+            for r in regioes:
+                # Extensões em coordenadas de tela (y para cima); o buffer tem y para baixo
+                y0, y1 = max(altura - int(r.y1), 0), min(altura - int(r.y0), altura)
+                x0, x1 = max(int(r.x0), 0), min(int(r.x1), quadro.shape[1])
+                quadro[y0:y1, x0:x1] = self._fundo[y0:y1, x0:x1]
+        for artista in self.dinamicos:
+            if artista in sujos:
+                self.fig.draw_artist(artista)
+        self._extensoes = extensoes
+        self._estados = {artista: _estado(artista) for artista in self.dinamicos}
+
+    def imagem(self, formato: str = 'png') -> bytes:
+        """Codifica o último quadro desenhado (PNG sem perdas ou JPEG, bem mais rápido de codificar)."""
+        quadro = Image.frombuffer('RGBA', self.fig.canvas.get_width_height(), self.fig.canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1)
+        buffer = io.BytesIO()
+        if formato == 'jpeg':
+            quadro.convert('RGB').save(buffer, format='jpeg', quality=90)
+        else:
+            quadro.save(buffer, format='png')
+        return buffer.getvalue()
+
+class Redesenho:
+    """Agrupa eventos seguidos dos widgets: no máximo um quadro rápido a cada `intervalo` e um final após `espera`.
+
+    Usa o loop asyncio do kernel; fora dele (script comum) chama os dois na hora.
+    """
+
+    def __init__(self, rapido, final, intervalo: float = INTERVALO_QUADRO, espera: float = ESPERA_FINAL):
+        self.rapido, self.final = rapido, final
+        self.intervalo, self.espera = intervalo, espera
+        self._quadro = None
+        self._final = None
+
+    def solicitar(self, *_):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.rapido()
+            self.final()
+            return
+        if self._quadro is None:
+            self._quadro = loop.call_later(self.intervalo, self._executar_rapido)
+        if self._final is not None:
+            self._final.cancel()
+        self._final = loop.call_later(self.espera, self._executar_final)
+
+    def _executar_rapido(self):
+        self._quadro = None
+        self.rapido()
+
+    def _executar_final(self):
+        self._final = None
+        self.final()
+
+painel = PainelViabilidade()
+imagem_painel = widgets.Image(format='png', layout=widgets.Layout(width='100%'))
+
+def atualizar_dashboard_completo(formato='png', **kwargs):
+    # Coleta e organiza os parâmetros dos widgets nas dataclasses
+    setup_params = SetupInvestimento(**{k: v for k, v in kwargs.items() if k in w_setup})
+    ciclo_params = ParametrosCiclo(**{k: v for k, v in kwargs.items() if k in w_ciclo})
+    mercado_params = CustosMercado(**{k: v for k, v in kwargs.items() if k in w_mercado})
+    
+    resultados = SimuladorCultivoCompleto(setup_params, ciclo_params, mercado_params).simular()
+    
+    painel.atualizar(resultados, ciclo_params)
+    painel.desenhar()
+    imagem_painel.format = formato
+    imagem_painel.value = painel.imagem(formato)
 
 # --- PASSO 6: CONECTAR TUDO E EXIBIR ---
 
 # Junta todos os dicionários de widgets em um só para a conexão
 todos_widgets = {**w_setup, **w_ciclo, **w_mercado}
 
-# Conecta a função de atualização aos widgets
-out = widgets.interactive_output(atualizar_dashboard_completo, todos_widgets)
+def valores_widgets():
+    return {k: v.value for k, v in todos_widgets.items()}
+
+def _quadro_final():
+    # O quadro já está desenhado com os valores atuais; basta reenviá-lo sem perdas
+    imagem_painel.format = 'png'
+    imagem_painel.value = painel.imagem('png')
+
+redesenho = Redesenho(lambda: atualizar_dashboard_completo('jpeg', **valores_widgets()), _quadro_final)
+
+# Conecta os widgets ao redesenho agrupado
+for widget in todos_widgets.values():
+    widget.observe(redesenho.solicitar, names='value')
 
 # Exibe a interface
-display(tab_interface, output_area)
+display(tab_interface, imagem_painel)
 
-# Chama a função uma vez para carregar o dashboard inicial
-atualizar_dashboard_completo(**{k: v.value for k, v in todos_widgets.items()})
+# Desenha o dashboard inicial
+atualizar_dashboard_completo(**valores_widgets())
@@ -0,0 +1,188 @@
+"""Linha do tempo de caixa diária, com payback em dias, VPL e TIR vetorizados.
+
+`simular()` calcula o ROI escalando o lucro de um ciclo por 365 / duração, sem
+considerar quando o dinheiro entra e sai. Aqui cada cenário vira um array
+indexado por dia, com ciclos consecutivos a partir do dia 0:
+
+- dia 0: investimento inicial (capex);
+- primeiro dia de cada ciclo: sementes/clones, substrato e outros custos;
+- dias de vegetativo e de floração: energia do fotoperíodo da fase e a parcela
+  diária dos nutrientes;
+- último dia do ciclo (fim da secagem/cura): receita da colheita.
+
+Um ciclo completo soma exatamente o custo operacional e a receita de
+`simular()`. Ciclos que não terminam dentro do horizonte geram custos, mas não
+receita. Os dias de cada fase são arredondados para inteiros.
+
+Com `dias_inicio` (um dia por cenário) a linha do tempo de cada cenário começa
+nesse dia em vez do dia 0, capex incluído; antes dele o fluxo é zero. É assim
+que salas escalonadas de uma mesma instalação são comparadas no mesmo eixo.
+"""
+
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from simulador_cultivo import SimuladorLote
+
+# Cenários processados por vez, para limitar a memória das matrizes cenário x dia
+TAMANHO_BLOCO = 2048
+# Células cenário x dia por bloco: horizontes longos processam menos cenários por vez
+MAX_CELULAS_BLOCO = TAMANHO_BLOCO * 3 * 365
+# Horizonte máximo aceito, em anos
+MAX_ANOS = 30
+
+def componentes_diarios(lote: SimuladorLote, dias: int, dias_inicio: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """Fluxos diários (cenários x dias) por componente; saídas de caixa são negativas."""
+    s, c, m = lote.setup, lote.ciclo, lote.mercado
+    resultados = lote.simular()
+    dv = np.rint(c['dias_vegetativo']).astype(np.int64)
+    df = np.rint(c['dias_floracao']).astype(np.int64)
+    duracao = dv + df + np.rint(c['dias_secagem_cura']).astype(np.int64)
+    if np.any(duracao <= 0):
+        raise ValueError("A duração do ciclo deve ser positiva em todos os cenários.")
+
+    inicio = np.zeros(lote.tamanho, dtype=np.int64) if dias_inicio is None else np.broadcast_to(np.rint(dias_inicio).astype(np.int64), (lote.tamanho,))
+    if np.any(inicio < 0):
+        raise ValueError("O dia de início não pode ser negativo.")
+
+    dia_relativo = np.arange(dias)[None, :] - inicio[:, None]
+    ativo = dia_relativo >= 0
+    # Antes do início o dia do ciclo fica -1, fora de todas as fases
+    dia_ciclo = np.where(ativo, dia_relativo % duracao[:, None], -1)
+    veg = ativo & (dia_ciclo < dv[:, None])
+    flor = (dia_ciclo >= dv[:, None]) & (dia_ciclo < (dv + df)[:, None])
+    inicio_ciclo = dia_ciclo == 0
+    colheita = dia_ciclo == duracao[:, None] - 1
+
+    kw_preco = (c['potencia_watts'] / 1000 * m['preco_kwh'])[:, None]
+    dias_cultivo = (dv + df)[:, None]
+    nutrientes_dia = np.divide(m['custo_nutrientes'][:, None], dias_cultivo, out=np.zeros_like(kw_preco), where=dias_cultivo > 0)
+
+    capex = np.zeros((lote.tamanho, dias))
+    dentro = inicio < dias
+    capex[np.flatnonzero(dentro), inicio[dentro]] = -resultados['custo_total_investimento'][dentro]
+
+    return {
+        'capex': capex,
+        'energia_veg': -np.where(veg, kw_preco * c['horas_luz_veg'][:, None], 0.0),
+        'energia_flor': -np.where(flor, kw_preco * c['horas_luz_flor'][:, None], 0.0),
+        'insumos': -(np.where(inicio_ciclo, (m['custo_sementes_clones'] + m['custo_substrato'] + m['custos_operacionais_misc'])[:, None], 0.0)
+                     + np.where(veg | flor, nutrientes_dia, 0.0)),
+        'receita': np.where(colheita, resultados['receita_bruta_ciclo'][:, None], 0.0),
+    }
+
+def fatores_desconto(taxa_anual: float, dias: int) -> np.ndarray:
+    """Fatores de desconto diários equivalentes a uma taxa efetiva anual."""
+    if not taxa_anual > -1:
+        raise ValueError("A taxa de desconto anual deve ser maior que -100%.")
+    return np.exp(-np.log1p(taxa_anual) * np.arange(dias) / 365)
+
+def payback_dias(fluxo: np.ndarray) -> np.ndarray:
+    """Primeiro dia em que o caixa acumulado volta a ser >= 0 após ficar negativo (inf se nunca)."""
+    acumulado = np.cumsum(fluxo, axis=1)
+    negativo = acumulado < 0
+    # Último dia negativo; o payback é o dia seguinte
+    ultimo_negativo = fluxo.shape[1] - 1 - np.argmax(negativo[:, ::-1], axis=1)
+    resultado = (ultimo_negativo + 1).astype(np.float64)
+    resultado[~negativo.any(axis=1)] = 0.0
+    resultado[negativo[:, -1]] = np.inf
+    return resultado
+
+def tir_vetorizada(fluxo: np.ndarray, tolerancia: float = 1e-10, max_iteracoes: int = 100) -> np.ndarray:
+    """TIR anual efetiva de cada linha, por Newton protegido por bissecção.
+
+    Todas as linhas iteram juntas; cada uma mantém seu próprio intervalo
+    [baixo, alto] com VPL(baixo) > 0 > VPL(alto). Linhas sem troca de sinal
+    (ex.: nunca recuperam o investimento) ficam com `nan`.
+    """
+    n, dias = fluxo.shape
+    anos = np.arange(dias) / 365
+    fluxo_anos = fluxo * anos
+
+    def vpl_e_derivada(taxa: np.ndarray, linhas: np.ndarray):
+        # Só as linhas ainda ativas são avaliadas
+        desconto = np.exp(-np.log1p(taxa)[:, None] * anos)
+        vpl = np.einsum('ij,ij->i', fluxo[linhas], desconto)
+        derivada = -np.einsum('ij,ij->i', fluxo_anos[linhas], desconto) / (1 + taxa)
+        return vpl, derivada
+
+    todas = np.arange(n)
+    baixo = np.full(n, -0.99)
+    alto = np.full(n, 1.0)
+    vpl_baixo, _ = vpl_e_derivada(baixo, todas)
+    vpl_alto, _ = vpl_e_derivada(alto, todas)
+    # Expande o limite superior até o VPL ficar negativo (TIRs muito altas)
+    for _ in range(60):
+        expandir = np.flatnonzero((vpl_alto > 0) & (vpl_baixo > 0))
+        if expandir.size == 0:
+            break
+        alto[expandir] *= 4
+        vpl_alto[expandir] = vpl_e_derivada(alto[expandir], expandir)[0]
+    valido = (vpl_baixo > 0) & (vpl_alto < 0)
+
+    taxa = np.full(n, np.nan)
+    taxa[valido] = np.clip(0.1, baixo[valido], alto[valido])
+    escala = np.maximum(np.abs(fluxo).sum(axis=1), 1.0)
+    ativas = np.flatnonzero(valido)
+    for _ in range(max_iteracoes):
+        if ativas.size == 0:
+            break
+        t = taxa[ativas]
+        vpl, derivada = vpl_e_derivada(t, ativas)
+        positivo = vpl > 0
+        b = np.where(positivo, t, baixo[ativas])
+        a = np.where(positivo, alto[ativas], t)
+        baixo[ativas], alto[ativas] = b, a
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = t - vpl / derivada
+        fora = ~np.isfinite(newton) | (newton <= b) | (newton >= a)
+        convergiu = (np.abs(vpl) <= tolerancia * escala[ativas]) | (a - b <= tolerancia)
+        taxa[ativas] = np.where(convergiu, t, np.where(fora, (b + a) / 2, newton))
+        ativas = ativas[~convergiu]
+    return taxa
+
+def analisar_fluxo_caixa(lote: SimuladorLote, anos: float = 3.0, taxa_desconto_anual: float = 0.10,
+                         detalhar: bool = False, progresso: Optional[Callable[[float], None]] = None,
+                         dias_inicio: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """Payback em dias, VPL, TIR e caixa final de cada cenário do lote.
+
+    Com `detalhar=True` devolve também os componentes diários e o caixa
+    acumulado (use só com lotes pequenos). Payback, VPL e TIR são contados a
+    partir do dia 0, mesmo para cenários com `dias_inicio` posterior.
+    """
+    if not anos <= MAX_ANOS:
+        raise ValueError(f"O horizonte deve ter no máximo {MAX_ANOS} anos.")
+    dias = int(round(anos * 365))
+    if dias <= 0:
+        raise ValueError("O horizonte deve ter ao menos um dia.")
+    tamanho_bloco = max(1, min(TAMANHO_BLOCO, MAX_CELULAS_BLOCO // dias))
+    fatores = fatores_desconto(taxa_desconto_anual, dias)
+    if dias_inicio is not None:
+        dias_inicio = np.broadcast_to(np.asarray(dias_inicio, dtype=np.float64), (lote.tamanho,))
+
+    partes = []
+    for inicio in range(0, lote.tamanho, tamanho_bloco):
+        fatia = slice(inicio, inicio + tamanho_bloco)
+        sublote = SimuladorLote({k: v[fatia] for k, v in lote.setup.items()},
+                                {k: v[fatia] for k, v in lote.ciclo.items()},
+                                {k: v[fatia] for k, v in lote.mercado.items()})
+        componentes = componentes_diarios(sublote, dias, None if dias_inicio is None else dias_inicio[fatia])
+        fluxo = sum(componentes.values())
+        parte = {
+            'payback_dias': payback_dias(fluxo),
+            'vpl': fluxo @ fatores,
+            'tir_anual': tir_vetorizada(fluxo),
+            'caixa_final': fluxo.sum(axis=1),
+        }
+        if detalhar:
+            parte.update(componentes)
+            parte['fluxo'] = fluxo
+            parte['acumulado'] = np.cumsum(fluxo, axis=1)
+        partes.append(parte)
+        if progresso is not None:
+            progresso(min(inicio + tamanho_bloco, lote.tamanho) / lote.tamanho)
+
+    resultado = {chave: np.concatenate([p[chave] for p in partes]) for chave in partes[0]}
+    resultado['dias'] = dias
+    return resultado
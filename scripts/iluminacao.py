@@ -0,0 +1,318 @@
+"""Motor da calculadora de iluminação (PPFD), sem interface.
+
+Extraído do callback de `ppfd-calculator.py` para que a API e outros scripts
+possam usá-lo. Trabalha com arrays: cada posição é uma tenda com largura,
+profundidade, fase, tipo de luminária e fotoperíodo próprios (escalares são
+replicados). A altura recomendada vem da tabela por potência com busca
+binária (`np.searchsorted`) em vez da varredura linear, e opcionalmente é
+interpolada entre as linhas da tabela.
+"""
+
+import bisect
+import math
+from typing import Any, Dict, Optional, Sequence, Union
+
+import numpy as np
+
+# --- BASE DE DADOS ---
+
+# Faixa de PPFD (µmol/m²/s) e fotoperíodo sugerido por fase
+FASES = {
+    "Mudas / Clones": {"ppfd_min": 200, "ppfd_max": 400, "fotoperiodo_sugerido": 18},
+    "Vegetativo": {"ppfd_min": 400, "ppfd_max": 600, "fotoperiodo_sugerido": 18},
+    "Floração": {"ppfd_min": 600, "ppfd_max": 1000, "fotoperiodo_sugerido": 12},
+}
+
+# Eficácia de fótons fotossintéticos (µmol/J) por tipo de iluminação
+EFICIENCIAS = {
+    "LED de Alta Eficiência (Quantum Board/Bar)": 2.7,
+    "LED Padrão / COB / Painel Comum": 1.9,
+    "Lâmpada HPS (Sódio de Alta Pressão)": 1.7,
+}
+
+# Potência (W) -> {Fase: (Altura Min, Altura Max)} em cm
+ALTURA_POR_POTENCIA = {
+    100: {"Mudas / Clones": (40, 60), "Vegetativo": (20, 40), "Floração": (20, 30)},
+    200: {"Mudas / Clones": (50, 70), "Vegetativo": (30, 50), "Floração": (25, 40)},
+    400: {"Mudas / Clones": (70, 90), "Vegetativo": (50, 70), "Floração": (35, 55)},
+    600: {"Mudas / Clones": (95, 105), "Vegetativo": (75, 95), "Floração": (45, 75)},
+    800: {"Mudas / Clones": (105, 120), "Vegetativo": (80, 105), "Floração": (50, 85)},
+    1000: {"Mudas / Clones": (115, 130), "Vegetativo": (90, 115), "Floração": (55, 90)},
+}
+
+# Chaves curtas aceitas pela API além dos nomes de exibição
+CHAVES_FASE = {'mudas': "Mudas / Clones", 'vegetativo': "Vegetativo", 'floracao': "Floração"}
+CHAVES_LUZ = {
+    'led_alta_eficiencia': "LED de Alta Eficiência (Quantum Board/Bar)",
+    'led_padrao': "LED Padrão / COB / Painel Comum",
+    'hps': "Lâmpada HPS (Sódio de Alta Pressão)",
+}
+
+# Tabelas em arrays, na ordem dos dicionários acima
+_NOMES_FASE = list(FASES)
+_NOMES_LUZ = list(EFICIENCIAS)
+_PPFD_MIN = np.array([FASES[f]['ppfd_min'] for f in _NOMES_FASE], dtype=np.float64)
+_PPFD_MAX = np.array([FASES[f]['ppfd_max'] for f in _NOMES_FASE], dtype=np.float64)
+_FOTOPERIODO = np.array([FASES[f]['fotoperiodo_sugerido'] for f in _NOMES_FASE], dtype=np.float64)
+_EFICIENCIA = np.array([EFICIENCIAS[t] for t in _NOMES_LUZ], dtype=np.float64)
+_POTENCIAS_LISTA = sorted(ALTURA_POR_POTENCIA)
+_POTENCIAS = np.array(_POTENCIAS_LISTA, dtype=np.float64)
+# [fase, linha de potência, (min, max)]
+_ALTURAS = np.array([[ALTURA_POR_POTENCIA[int(p)][f] for p in _POTENCIAS] for f in _NOMES_FASE], dtype=np.float64)
+
+Categoria = Union[str, Sequence[str], np.ndarray]
+
+def _codigos(nomes: Sequence[str], chaves: Dict[str, str]) -> Dict[str, int]:
+    return {**{nome: i for i, nome in enumerate(nomes)}, **{chave: nomes.index(nome) for chave, nome in chaves.items()}}
+
+_CODIGOS_FASE = _codigos(_NOMES_FASE, CHAVES_FASE)
+_CODIGOS_LUZ = _codigos(_NOMES_LUZ, CHAVES_LUZ)
+
+def _indices(valores: Categoria, codigos: Dict[str, int], campo: str) -> np.ndarray:
+    """Converte nomes (ou chaves curtas) em índices das tabelas com um dicionário, sem ordenar."""
+    if isinstance(valores, str) or not hasattr(valores, '__len__'):
+        valores = [valores]
+    try:
+        return np.fromiter((codigos[v] for v in valores), dtype=np.intp, count=len(valores))
+    except KeyError as e:
+        raise ValueError(f"{campo} desconhecido(a): {e}. Use um de {', '.join(codigos)}.") from None
+
+def _codigo(valor: str, codigos: Dict[str, int], campo: str) -> int:
+    """Índice de um único nome, sem passar por arrays (caminho escalar)."""
+    try:
+        return codigos[valor]
+    except (KeyError, TypeError):
+        raise ValueError(f"{campo} desconhecido(a): {valor!r}. Use um de {', '.join(codigos)}.") from None
+
+def calcular_iluminacao_lote(largura, profundidade, fase: Categoria, tipo_luz: Categoria,
+                             fotoperiodo=None, interpolar: bool = False) -> Dict[str, np.ndarray]:
+    """PPF, potência, DLI e faixa de altura para cada tenda.
+
+    `fotoperiodo=None` usa o sugerido da fase. Sem interpolação a altura é a
+    da primeira linha da tabela com potência >= a estimada (como no
+    calculador interativo); com `interpolar=True` é interpolada linearmente
+    entre as linhas vizinhas. Acima da maior potência da tabela as alturas
+    ficam `nan` e `potencia_tabela` fica 0.
+    """
+    i_fase = _indices(fase, _CODIGOS_FASE, 'Fase')
+    i_luz = _indices(tipo_luz, _CODIGOS_LUZ, 'Tipo de iluminação')
+    foto = _FOTOPERIODO[i_fase] if fotoperiodo is None else np.asarray(fotoperiodo, dtype=np.float64)
+    largura, profundidade, i_fase, i_luz, foto = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(largura, dtype=np.float64)), np.asarray(profundidade, dtype=np.float64),
+        i_fase, i_luz, foto)
+    if largura.ndim != 1:
+        raise ValueError("As entradas devem ser unidimensionais.")
+    invalidos = np.flatnonzero(~((largura > 0) & (profundidade > 0)))
+    if invalidos.size:
+        raise ValueError(f"A largura e a profundidade devem ser maiores que zero (posição {int(invalidos[0])}).")
+
+    # --- CÁLCULOS PRINCIPAIS ---
+    area_m2 = largura * profundidade
+    ppfd_min = _PPFD_MIN[i_fase]
+    ppfd_max = _PPFD_MAX[i_fase]
+    ppfd_medio_alvo = (ppfd_min + ppfd_max) / 2
+    eficiencia = _EFICIENCIA[i_luz]
+    # PPF (µmol/s) = PPFD médio × área; potência (W) = PPF / eficiência (µmol/J)
+    ppf_total_necessario = ppfd_medio_alvo * area_m2
+    potencia_watts = ppf_total_necessario / eficiencia
+    # DLI (mol/m²/dia) = PPFD × horas × 3600 s / 1e6
+    dli = (ppfd_medio_alvo * foto * 3600) / 1_000_000
+
+    # --- ALTURA RECOMENDADA ---
+    linha = np.searchsorted(_POTENCIAS, potencia_watts, side='left')
+    na_tabela = linha < len(_POTENCIAS)
+    linha_valida = np.minimum(linha, len(_POTENCIAS) - 1)
+    potencia_tabela = np.where(na_tabela, _POTENCIAS[linha_valida], 0.0)
+    if interpolar:
+        # Fração entre a linha anterior e a escolhida; abaixo da primeira linha vale a primeira
+        anterior = np.maximum(linha_valida - 1, 0)
+        intervalo = _POTENCIAS[linha_valida] - _POTENCIAS[anterior]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fracao = np.clip(np.where(intervalo > 0, (potencia_watts - _POTENCIAS[anterior]) / intervalo, 1.0), 0.0, 1.0)
+        alturas = (_ALTURAS[i_fase, anterior] * (1 - fracao)[:, None] + _ALTURAS[i_fase, linha_valida] * fracao[:, None])
+    else:
+        alturas = _ALTURAS[i_fase, linha_valida]
+    alturas = np.where(na_tabela[:, None], alturas, np.nan)
+
+    return {
+        'area_m2': area_m2,
+        'ppfd_min': ppfd_min,
+        'ppfd_max': ppfd_max,
+        'ppfd_medio_alvo': ppfd_medio_alvo,
+        'eficiencia': eficiencia,
+        'fotoperiodo': foto,
+        'ppf_total_necessario': ppf_total_necessario,
+        'potencia_watts': potencia_watts,
+        'dli': dli,
+        'potencia_tabela': potencia_tabela,
+        'altura_min_cm': alturas[:, 0],
+        'altura_max_cm': alturas[:, 1],
+    }
+
+def calcular_iluminacao(largura: float, profundidade: float, fase: str, tipo_luz: str,
+                        fotoperiodo: Optional[float] = None, interpolar: bool = False) -> Dict[str, Any]:
+    """Versão de uma tenda só, com os valores como escalares Python.
+
+    Mesmas fórmulas do lote, em Python puro: para uma tenda o custo fixo das
+    operações do numpy superaria o cálculo em si.
+    """
+    nome_fase = _NOMES_FASE[_codigo(fase, _CODIGOS_FASE, 'Fase')]
+    nome_luz = _NOMES_LUZ[_codigo(tipo_luz, _CODIGOS_LUZ, 'Tipo de iluminação')]
+    largura, profundidade = float(largura), float(profundidade)
+    if not (largura > 0 and profundidade > 0):
+        raise ValueError("A largura e a profundidade devem ser maiores que zero (posição 0).")
+    dados_fase = FASES[nome_fase]
+    foto = float(dados_fase['fotoperiodo_sugerido'] if fotoperiodo is None else fotoperiodo)
+
+    area_m2 = largura * profundidade
+    ppfd_min = float(dados_fase['ppfd_min'])
+    ppfd_max = float(dados_fase['ppfd_max'])
+    ppfd_medio_alvo = (ppfd_min + ppfd_max) / 2
+    eficiencia = float(EFICIENCIAS[nome_luz])
+    ppf_total_necessario = ppfd_medio_alvo * area_m2
+    potencia_watts = ppf_total_necessario / eficiencia
+    dli = (ppfd_medio_alvo * foto * 3600) / 1_000_000
+
+    linha = bisect.bisect_left(_POTENCIAS_LISTA, potencia_watts)
+    if linha < len(_POTENCIAS_LISTA):
+        potencia_tabela = float(_POTENCIAS_LISTA[linha])
+        altura_min, altura_max = (float(a) for a in ALTURA_POR_POTENCIA[_POTENCIAS_LISTA[linha]][nome_fase])
+        if interpolar and linha > 0:
+            anterior = _POTENCIAS_LISTA[linha - 1]
+            fracao = min(max((potencia_watts - anterior) / (_POTENCIAS_LISTA[linha] - anterior), 0.0), 1.0)
+            min_ant, max_ant = ALTURA_POR_POTENCIA[anterior][nome_fase]
+            altura_min = min_ant * (1 - fracao) + altura_min * fracao
+            altura_max = max_ant * (1 - fracao) + altura_max * fracao
+    else:
+        potencia_tabela, altura_min, altura_max = 0.0, math.nan, math.nan
+
+    return {
+        'area_m2': area_m2,
+        'ppfd_min': ppfd_min,
+        'ppfd_max': ppfd_max,
+        'ppfd_medio_alvo': ppfd_medio_alvo,
+        'eficiencia': eficiencia,
+        'fotoperiodo': foto,
+        'ppf_total_necessario': ppf_total_necessario,
+        'potencia_watts': potencia_watts,
+        'dli': dli,
+        'potencia_tabela': potencia_tabela,
+        'altura_min_cm': altura_min,
+        'altura_max_cm': altura_max,
+    }
+
+# --- MAPA DE PPFD ---
+
+# Teto de células por mapa (≈ 10 m × 10 m a 1 cm), para limitar memória e tempo
+MAX_CELULAS_MAPA = 1_000_000
+# Limites de luminárias e de avaliações luminária-imagem × célula (~1 s de CPU) por mapa
+MAX_LUMINARIAS = 1_000
+MAX_AVALIACOES_MAPA = 100_000_000
+
+def posicoes_grade(largura: float, profundidade: float, quantidade: int) -> np.ndarray:
+    """Distribui `quantidade` luminárias em linhas e colunas proporcionais à tenda, no centro de cada célula."""
+    if quantidade < 1:
+        raise ValueError("É preciso pelo menos uma luminária.")
+    colunas = min(quantidade, max(1, round(math.sqrt(quantidade * largura / profundidade))))
+    linhas = math.ceil(quantidade / colunas)
+    posicoes = []
+    for linha in range(linhas):
+        # A última linha pode ficar incompleta: suas luminárias são centralizadas nela
+        nesta_linha = min(colunas, quantidade - linha * colunas)
+        y = (linha + 0.5) * profundidade / linhas
+        posicoes.extend(((coluna + 0.5) * largura / nesta_linha, y) for coluna in range(nesta_linha))
+    return np.array(posicoes, dtype=np.float64)
+
+def mapa_ppfd(largura: float, profundidade: float, fase: str, tipo_luz: str, altura_cm: float,
+              luminarias: Union[int, Sequence[Sequence[float]]] = 1, potencia_watts: Optional[float] = None,
+              exponente: float = 1.0, refletancia: float = 0.0, resolucao_m: float = 0.01) -> Dict[str, Any]:
+    """PPFD célula a célula no plano do dossel e métricas de uniformidade.
+
+    Cada luminária é uma fonte pontual com intensidade I(θ) = I0·cosᵐ(θ)
+    (`exponente` m; 1 = lambertiana, valores maiores = facho mais fechado),
+    a `altura_cm` do dossel. Com I0 = PPF·(m+1)/2π, a PPFD num ponto a
+    distância d é I0·hᵐ⁺¹/dᵐ⁺³. As paredes refletem a fração `refletancia`
+    por meio de luminárias-imagem (reflexões de 1ª e 2ª ordem). `luminarias`
+    é a quantidade (distribuída em grade) ou a lista de posições (x, y) em
+    metros; `potencia_watts` é a potência de cada uma, por padrão a potência
+    estimada pela calculadora dividida entre elas.
+
+    A uniformidade é PPFD mínima / média; `area_atende_m2` é a área com PPFD
+    de pelo menos o mínimo da fase.
+    """
+    largura, profundidade = float(largura), float(profundidade)
+    if not (largura > 0 and profundidade > 0):
+        raise ValueError("A largura e a profundidade devem ser maiores que zero.")
+    if not altura_cm > 0:
+        raise ValueError("A altura das luminárias deve ser maior que zero.")
+    if not resolucao_m > 0:
+        raise ValueError("A resolução deve ser maior que zero.")
+    if not 0 <= refletancia < 1:
+        raise ValueError("A refletância deve estar entre 0 e 1.")
+    colunas = max(1, round(largura / resolucao_m))
+    linhas = max(1, round(profundidade / resolucao_m))
+    if colunas * linhas > MAX_CELULAS_MAPA:
+        raise ValueError(f"Grade de {colunas}×{linhas} células excede o limite de {MAX_CELULAS_MAPA}; aumente a resolução.")
+
+    base = calcular_iluminacao(largura, profundidade, fase, tipo_luz)
+    if isinstance(luminarias, (int, np.integer)):
+        if luminarias > MAX_LUMINARIAS:
+            raise ValueError(f"O mapa aceita no máximo {MAX_LUMINARIAS} luminárias.")
+        posicoes = posicoes_grade(largura, profundidade, int(luminarias))
+    else:
+        posicoes = np.asarray(luminarias, dtype=np.float64).reshape(-1, 2)
+        if not len(posicoes):
+            raise ValueError("É preciso pelo menos uma luminária.")
+        if len(posicoes) > MAX_LUMINARIAS:
+            raise ValueError(f"O mapa aceita no máximo {MAX_LUMINARIAS} luminárias.")
+    # Cada luminária conta 9 vezes com reflexões (ela e suas 8 imagens nas paredes)
+    avaliacoes = len(posicoes) * (9 if refletancia else 1) * colunas * linhas
+    if avaliacoes > MAX_AVALIACOES_MAPA:
+        raise ValueError(f"{len(posicoes)} luminárias sobre {colunas}×{linhas} células excedem o limite de "
+                         f"{MAX_AVALIACOES_MAPA} avaliações; reduza as luminárias ou aumente a resolução.")
+    if potencia_watts is None:
+        potencia_watts = base['potencia_watts'] / len(posicoes)
+    h = altura_cm / 100
+    intensidade = potencia_watts * base['eficiencia'] * (exponente + 1) / (2 * math.pi)
+
+    # Centros das células; dx² e dy² são calculados por eixo e combinados por broadcast
+    x = (np.arange(colunas) + 0.5) * (largura / colunas)
+    y = (np.arange(linhas) + 0.5) * (profundidade / linhas)
+    # Soma das contribuições por ordem de reflexão (0, 1 ou 2), reaproveitando um único buffer
+    somas = np.zeros((3, linhas, colunas))
+    d2 = np.empty((linhas, colunas))
+    expoente_distancia = -(exponente + 3) / 2
+    for lx, ly in posicoes:
+        # Imagem -1/0/+1 em cada eixo: reflexo na parede em 0, a própria luminária, reflexo na parede oposta
+        for ordem_x, px in enumerate((-lx, lx, 2 * largura - lx)):
+            dx2 = (x - px) ** 2
+            for ordem_y, py in enumerate((-ly, ly, 2 * profundidade - ly)):
+                ordem = abs(ordem_x - 1) + abs(ordem_y - 1)
+                if ordem and refletancia == 0:
+                    continue
+                np.add(((y - py) ** 2 + h * h)[:, None], dx2[None, :], out=d2)
+                np.power(d2, expoente_distancia, out=d2)
+                somas[ordem] += d2
+    pesos = intensidade * h ** (exponente + 1) * refletancia ** np.arange(3)
+    mapa = np.tensordot(pesos, somas, axes=1)
+
+    ppfd_min_fase = base['ppfd_min']
+    area_celula = (largura / colunas) * (profundidade / linhas)
+    minimo, medio, maximo = float(mapa.min()), float(mapa.mean()), float(mapa.max())
+    atende = int(np.count_nonzero(mapa >= ppfd_min_fase))
+    return {
+        'mapa': mapa,
+        'x': x,
+        'y': y,
+        'luminarias': posicoes,
+        'potencia_por_luminaria': float(potencia_watts),
+        'ppfd_minimo': minimo,
+        'ppfd_medio': medio,
+        'ppfd_maximo': maximo,
+        'uniformidade': minimo / medio if medio > 0 else 0.0,
+        'razao_max_min': maximo / minimo if minimo > 0 else math.inf,
+        'ppfd_min_fase': ppfd_min_fase,
+        'area_atende_m2': atende * area_celula,
+        'fracao_atende': atende / mapa.size,
+        'dli_medio': medio * base['fotoperiodo'] * 3600 / 1_000_000,
+    }
@@ -0,0 +1,260 @@
+"""Simulador de instalação com várias salas em colheita perpétua.
+
+`SimuladorCultivoCompleto` modela uma tenda com um ciclo por vez. Aqui N salas
+(cada uma com seu `SetupInvestimento` e `ParametrosCiclo`, todas no mesmo
+`CustosMercado`) repetem ciclos a partir de dias de início escalonados, e
+equipamentos compartilhados (climatização, desumidificação, sala de secagem)
+somam capex e uma carga elétrica fixa.
+
+Nada é calculado por sala × dia. Os ciclos de todas as salas viram uma lista
+de eventos (início, fim do vegetativo, fim da floração, colheita) e cada série
+diária sai de `np.bincount` sobre esses eventos: valores pontuais (insumos,
+receita, capex) entram direto e taxas diárias (energia, nutrientes) entram
+como diferenças (+taxa no início do intervalo, -taxa no fim) seguidas de
+`cumsum`. O custo é linear no número de ciclos e no horizonte, não no produto
+dos dois.
+
+A carga horária (só com `pico=True`) usa o mesmo truque por janela de luz: as salas são agrupadas
+pelas janelas distintas (hora de acender, horas de luz) e a carga de cada dia
+é a potência acesa por janela vezes a cobertura da janela em cada hora. Janelas
+que passam da meia-noite invadem as primeiras horas do dia seguinte.
+
+As convenções de caixa são as de `fluxo_caixa` (fases arredondadas para dias
+inteiros, energia e nutrientes nos dias de vegetativo e floração, receita no
+último dia do ciclo), e cada sala equivale a `componentes_diarios` com o
+`dias_inicio` dela. A energia diária é atribuída ao dia em que as luzes acendem.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from fluxo_caixa import fatores_desconto, payback_dias, tir_vetorizada, MAX_ANOS
+from simulador_cultivo import SetupInvestimento, ParametrosCiclo, CustosMercado, SimuladorLote
+
+HORAS_DIA = 24
+# Limite de ciclos (eventos) de todas as salas no horizonte
+MAX_CICLOS = 10_000_000
+# Limite de células dia × janela de luz da carga horária (cada janela distinta ocupa uma coluna por dia)
+MAX_CELULAS_CARGA = 4_000_000
+
+@dataclass
+class EquipamentoCompartilhado:
+    """Equipamento da instalação inteira: capex no dia 0 e carga fixa todos os dias."""
+    nome: str = 'Equipamento'
+    custo_investimento: float = 0.0
+    potencia_kw: float = 0.0
+    horas_por_dia: float = 24.0
+    hora_inicio: float = 0.0
+
+def escalonar(duracao_ciclo: Sequence[float], intervalo_dias: Optional[float] = None) -> np.ndarray:
+    """Dias de início das salas para colheitas regulares.
+
+    Sem `intervalo_dias`, distribui as salas ao longo de um ciclo (a sala i
+    começa em i × duração / N); com ele, a sala i começa em i × intervalo.
+    """
+    duracao = np.asarray(duracao_ciclo, dtype=np.float64)
+    n = duracao.size
+    if intervalo_dias is None:
+        return np.floor(np.arange(n) * duracao / max(n, 1)).astype(np.int64)
+    if intervalo_dias < 0:
+        raise ValueError("O intervalo entre salas não pode ser negativo.")
+    return np.rint(np.arange(n) * intervalo_dias).astype(np.int64)
+
+def _cobertura(hora_inicio: np.ndarray, horas: np.ndarray) -> np.ndarray:
+    """Fração de cada hora de dois dias seguidos (janelas × 48) coberta pela janela [início, início + horas)."""
+    hora = np.arange(2 * HORAS_DIA)[None, :]
+    inicio = hora_inicio[:, None]
+    return np.clip(np.minimum(hora + 1, inicio + horas[:, None]) - np.maximum(hora, inicio), 0.0, 1.0)
+
+def _serie(dias: int, posicoes: np.ndarray, pesos: np.ndarray) -> np.ndarray:
+    """Soma dos pesos por dia; eventos fora do horizonte são ignorados."""
+    dentro = (posicoes >= 0) & (posicoes < dias)
+    return np.bincount(posicoes[dentro], weights=pesos[dentro], minlength=dias)[:dias]
+
+def _taxa(dias: int, inicio: np.ndarray, fim: np.ndarray, taxa: np.ndarray) -> np.ndarray:
+    """Soma, em cada dia, das taxas dos intervalos [início, fim) que o contêm."""
+    inicio = np.minimum(inicio, dias)
+    fim = np.minimum(fim, dias)
+    diferencas = (np.bincount(inicio, weights=taxa, minlength=dias + 1)
+                  - np.bincount(fim, weights=taxa, minlength=dias + 1))
+    return np.cumsum(diferencas[:dias])
+
+class SimuladorInstalacao:
+    """Várias salas com ciclos repetidos a partir de dias de início escalonados."""
+
+    def __init__(self, salas: SimuladorLote, inicio_dias: Any = 0, hora_inicio_luz: Any = 0.0,
+                 compartilhados: Sequence[EquipamentoCompartilhado] = (), preco_kwh_compartilhado: Optional[float] = None):
+        self.salas = salas
+        n = salas.tamanho
+        self.inicio = np.broadcast_to(np.rint(np.asarray(inicio_dias, dtype=np.float64)).astype(np.int64), (n,)).copy()
+        self.hora_inicio_luz = np.broadcast_to(np.asarray(hora_inicio_luz, dtype=np.float64), (n,)).copy()
+        if np.any(self.inicio < 0):
+            raise ValueError("O dia de início das salas não pode ser negativo.")
+        if np.any((self.hora_inicio_luz < 0) | (self.hora_inicio_luz >= HORAS_DIA)):
+            raise ValueError("A hora de acender as luzes deve estar entre 0 e 24.")
+        c = salas.ciclo
+        for horas in (c['horas_luz_veg'], c['horas_luz_flor']):
+            if np.any((horas < 0) | (horas > HORAS_DIA)):
+                raise ValueError("As horas de luz devem estar entre 0 e 24.")
+        self.dv = np.rint(c['dias_vegetativo']).astype(np.int64)
+        self.df = np.rint(c['dias_floracao']).astype(np.int64)
+        self.duracao = self.dv + self.df + np.rint(c['dias_secagem_cura']).astype(np.int64)
+        if np.any(self.duracao <= 0):
+            raise ValueError("A duração do ciclo deve ser positiva em todas as salas.")
+        self.compartilhados = list(compartilhados)
+        for equipamento in self.compartilhados:
+            if not 0 <= equipamento.horas_por_dia <= HORAS_DIA or not 0 <= equipamento.hora_inicio < HORAS_DIA:
+                raise ValueError(f"Horário inválido para o equipamento '{equipamento.nome}'.")
+        precos = salas.mercado['preco_kwh']
+        self.preco_kwh_compartilhado = float(precos.mean()) if preco_kwh_compartilhado is None else float(preco_kwh_compartilhado)
+
+    @classmethod
+    def de_salas(cls, salas: Iterable[Tuple[SetupInvestimento, ParametrosCiclo]], mercado: CustosMercado,
+                 **opcoes) -> 'SimuladorInstalacao':
+        """Monta a instalação a partir de pares (setup, ciclo) que compartilham o mesmo mercado."""
+        return cls(SimuladorLote.de_cenarios((setup, ciclo, mercado) for setup, ciclo in salas), **opcoes)
+
+    def ciclos(self, dias: int) -> Dict[str, np.ndarray]:
+        """Todos os ciclos que começam dentro do horizonte: sala, número do ciclo e dia de início."""
+        restantes = np.maximum(dias - self.inicio, 0)
+        quantidade = -(-restantes // self.duracao)
+        if quantidade.sum() > MAX_CICLOS:
+            raise ValueError(f"A instalação teria mais de {MAX_CICLOS} ciclos no horizonte; reduza salas ou anos.")
+        sala = np.repeat(np.arange(self.salas.tamanho), quantidade)
+        numero = np.arange(sala.size) - np.repeat(np.cumsum(quantidade) - quantidade, quantidade)
+        return {'sala': sala, 'ciclo': numero, 'inicio': self.inicio[sala] + numero * self.duracao[sala]}
+
+    def _carga_compartilhada(self) -> Tuple[np.ndarray, float]:
+        """Carga (kW) de cada hora do dia e kWh por dia dos equipamentos compartilhados."""
+        if not self.compartilhados:
+            return np.zeros(HORAS_DIA), 0.0
+        potencia = np.array([e.potencia_kw for e in self.compartilhados], dtype=np.float64)
+        horas = np.array([e.horas_por_dia for e in self.compartilhados], dtype=np.float64)
+        cobertura = _cobertura(np.array([e.hora_inicio for e in self.compartilhados], dtype=np.float64), horas)
+        # Carga permanente: a parte após a meia-noite volta para o início do mesmo dia
+        por_hora = potencia @ (cobertura[:, :HORAS_DIA] + cobertura[:, HORAS_DIA:])
+        return por_hora, float(potencia @ horas)
+
+    def _carga_horaria(self, dias: int, sala: np.ndarray, inicio: np.ndarray, fim_veg: np.ndarray,
+                       fim_flor: np.ndarray) -> np.ndarray:
+        """Carga (kW) de cada hora de cada dia (dias × 24), salas e equipamentos compartilhados."""
+        c = self.salas.ciclo
+        # Uma janela de luz por combinação distinta (hora de acender, horas de luz)
+        horas = np.concatenate([c['horas_luz_veg'][sala], c['horas_luz_flor'][sala]])
+        hora_inicio = np.tile(self.hora_inicio_luz[sala], 2)
+        janelas, qual = np.unique(np.stack([hora_inicio, horas], axis=1), axis=0, return_inverse=True)
+        if (dias + 1) * len(janelas) > MAX_CELULAS_CARGA:
+            raise ValueError(f"Janelas de luz distintas demais ({len(janelas)}) para a carga horária em {dias} dias; "
+                             "agrupe as horas de acender ou reduza os anos.")
+        qual = qual.ravel()
+        inicios = np.concatenate([inicio, fim_veg])
+        fins = np.concatenate([fim_veg, fim_flor])
+        kw_fases = np.tile(c['potencia_watts'][sala] / 1000, 2)
+        tamanho = (dias + 1) * len(janelas)
+        acesas = (np.bincount(np.minimum(inicios, dias) * len(janelas) + qual, weights=kw_fases, minlength=tamanho)
+                  - np.bincount(np.minimum(fins, dias) * len(janelas) + qual, weights=kw_fases, minlength=tamanho))
+        acesas = acesas.reshape(dias + 1, len(janelas))
+        # kW acesos por janela em cada dia; a carga hora a hora soma a sobra da janela do dia anterior
+        acesas = np.cumsum(acesas[:dias], axis=0)
+        cobertura = _cobertura(janelas[:, 0], janelas[:, 1])
+        carga = acesas @ cobertura[:, :HORAS_DIA]
+        carga[1:] += acesas[:-1] @ cobertura[:, HORAS_DIA:]
+        carga += self._carga_compartilhada()[0]
+        return carga
+
+    def simular(self, anos: float = 3.0, taxa_desconto_anual: float = 0.10, detalhar: bool = False,
+                pico: bool = False) -> Dict[str, Any]:
+        """Séries diárias da instalação (energia, colheitas e caixa) e o resumo.
+
+        Com `pico=True` monta a carga hora a hora (dias × 24) e inclui o pico
+        diário e o do horizonte; sem ele os campos de pico do resumo ficam None.
+        Com `detalhar=True` inclui o calendário de colheitas (dia, sala e gramas
+        de cada colheita) e, com `pico`, a própria carga hora a hora.
+        """
+        if not anos <= MAX_ANOS:
+            raise ValueError(f"O horizonte deve ter no máximo {MAX_ANOS} anos.")
+        dias = int(round(anos * 365))
+        if dias <= 0:
+            raise ValueError("O horizonte deve ter ao menos um dia.")
+        s, c, m = self.salas.setup, self.salas.ciclo, self.salas.mercado
+        resultados = self.salas.simular()
+        ciclos = self.ciclos(dias)
+        sala, inicio = ciclos['sala'], ciclos['inicio']
+        fim_veg = inicio + self.dv[sala]
+        fim_flor = fim_veg + self.df[sala]
+        colheita = inicio + self.duracao[sala] - 1
+
+        kw = c['potencia_watts'][sala] / 1000
+        horas_veg, horas_flor = c['horas_luz_veg'][sala], c['horas_luz_flor'][sala]
+        preco = m['preco_kwh'][sala]
+        dias_cultivo = (self.dv + self.df)[sala]
+        nutrientes_dia = np.divide(m['custo_nutrientes'][sala], dias_cultivo, out=np.zeros(sala.size), where=dias_cultivo > 0)
+
+        # --- Energia ---
+        kwh_compartilhado = self._carga_compartilhada()[1]
+        kwh_salas = _taxa(dias, inicio, fim_veg, kw * horas_veg) + _taxa(dias, fim_veg, fim_flor, kw * horas_flor)
+
+        custo_energia = (_taxa(dias, inicio, fim_veg, kw * horas_veg * preco)
+                         + _taxa(dias, fim_veg, fim_flor, kw * horas_flor * preco)
+                         + kwh_compartilhado * self.preco_kwh_compartilhado)
+
+        # --- Caixa ---
+        capex = _serie(dias, self.inicio, resultados['custo_total_investimento'])
+        capex[0] += sum(e.custo_investimento for e in self.compartilhados)
+        insumos = (_serie(dias, inicio, (m['custo_sementes_clones'] + m['custo_substrato'] + m['custos_operacionais_misc'])[sala])
+                   + _taxa(dias, inicio, fim_flor, nutrientes_dia))
+        receita = _serie(dias, colheita, resultados['receita_bruta_ciclo'][sala])
+        fluxo = receita - capex - custo_energia - insumos
+
+        colhida = colheita < dias
+        dias_colheita = np.unique(colheita[colhida])
+        intervalos = np.diff(dias_colheita)
+        saida: Dict[str, Any] = {
+            'dias': dias,
+            'kwh_dia': kwh_salas + kwh_compartilhado,
+            'salas_em_cultivo': _taxa(dias, inicio, fim_flor, np.ones(sala.size)),
+            'colheitas_dia': _serie(dias, colheita, np.ones(sala.size)),
+            'gramas_colhidas_dia': _serie(dias, colheita, resultados['producao_total_g'][sala]),
+            'capex': -capex,
+            'energia': -custo_energia,
+            'insumos': -insumos,
+            'receita': receita,
+            'fluxo': fluxo,
+            'acumulado': np.cumsum(fluxo),
+            'resumo': {
+                'salas': self.salas.tamanho,
+                'ciclos_iniciados': int(sala.size),
+                'colheitas': int(np.count_nonzero(colhida)),
+                'primeira_colheita': int(dias_colheita[0]) if dias_colheita.size else None,
+                'intervalo_medio_colheitas': float(intervalos.mean()) if intervalos.size else None,
+                'maior_intervalo_colheitas': int(intervalos.max()) if intervalos.size else None,
+                'pico_kw': None,
+                'dia_pico': None,
+                'hora_pico': None,
+                'kwh_total': float(kwh_salas.sum() + kwh_compartilhado * dias),
+                'investimento_total': float(capex.sum()),
+                'receita_total': float(receita.sum()),
+                'payback_dias': float(payback_dias(fluxo[None, :])[0]),
+                'vpl': float(fluxo @ fatores_desconto(taxa_desconto_anual, dias)),
+                'tir_anual': float(tir_vetorizada(fluxo[None, :])[0]),
+                'caixa_final': float(fluxo.sum()),
+            },
+        }
+        if pico:
+            carga = self._carga_horaria(dias, sala, inicio, fim_veg, fim_flor)
+            pico_dia = carga.max(axis=1)
+            dia_pico = int(pico_dia.argmax())
+            saida['pico_kw_dia'] = pico_dia
+            saida['resumo'].update(pico_kw=float(pico_dia[dia_pico]), dia_pico=dia_pico, hora_pico=int(carga[dia_pico].argmax()))
+            if detalhar:
+                saida['carga_horaria_kw'] = carga
+        if detalhar:
+            ordem = np.lexsort((sala[colhida], colheita[colhida]))
+            saida['calendario_colheitas'] = {
+                'dia': colheita[colhida][ordem],
+                'sala': sala[colhida][ordem],
+                'gramas': resultados['producao_total_g'][sala[colhida]][ordem],
+            }
+        return saida
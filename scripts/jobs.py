@@ -0,0 +1,247 @@
+"""Subsistema de jobs assíncronos para simulações demoradas.
+
+Varreduras, Monte Carlo e lotes grandes são enfileirados e executados por um
+pool local de threads, liberando os workers web para as chamadas baratas de
+`/api/calculate` (o trabalho pesado roda no NumPy, que libera o GIL, ou no
+pool de processos do próprio Monte Carlo). A fila é plugável: `FilaJobs`
+define a interface e `FilaEmProcesso` é a implementação padrão.
+
+Cada tipo de job é uma função `executar(parametros, progresso)`; chamar
+`progresso(fracao)` publica o andamento e levanta `Cancelado` se o job tiver
+sido cancelado, o que interrompe o trabalho no próximo ponto de controle.
+
+Jobs ainda não finalizados são limitados por `max_pendentes`; acima disso
+`submeter` levanta `FilaCheia`. Jobs finalizados ficam disponíveis por
+`retencao` segundos, e no máximo `max_retidos` deles: os mais antigos saem
+primeiro.
+"""
+
+import os
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+PENDENTE = 'pendente'
+EXECUTANDO = 'executando'
+CONCLUIDO = 'concluido'
+FALHOU = 'falhou'
+CANCELADO = 'cancelado'
+ESTADOS_FINAIS = (CONCLUIDO, FALHOU, CANCELADO)
+
+Progresso = Callable[[float], None]
+
+class Cancelado(Exception):
+    """Levantada dentro do job quando o cancelamento é solicitado."""
+
+class FilaCheia(Exception):
+    """Limite de jobs pendentes atingido; o cliente deve tentar mais tarde."""
+
+@dataclass
+class Job:
+    id: str
+    tipo: str
+    parametros: Any
+    estado: str = PENDENTE
+    progresso: float = 0.0
+    resultado: Any = None
+    erro: Optional[str] = None
+    criado: float = field(default_factory=time.time)
+    iniciado: Optional[float] = None
+    finalizado: Optional[float] = None
+    # Id do perfil gravado pela execução, se o job foi perfilado
+    perfil: Optional[str] = None
+    # Incrementada a cada mudança, para quem acompanha o progresso
+    versao: int = 0
+    cancelar: threading.Event = field(default_factory=threading.Event, repr=False)
+    # Recebe a função do tipo e devolve a que será executada (ex.: versão perfilada)
+    envolver: Optional[Callable[[Callable], Callable]] = field(default=None, repr=False)
+
+    def resumo(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'type': self.tipo,
+            'status': self.estado,
+            'progress': self.progresso,
+            'error': self.erro,
+            'created': self.criado,
+            'started': self.iniciado,
+            'finished': self.finalizado,
+            'profile': self.perfil,
+        }
+
+# --- FILAS ---
+
+class FilaJobs:
+    """Interface da fila de jobs; implementações devem ser seguras entre threads."""
+
+    def colocar(self, job_id: str) -> None:
+        raise NotImplementedError
+
+    def retirar(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Devolve o próximo id ou None se nada chegou dentro do timeout."""
+        raise NotImplementedError
+
+class FilaEmProcesso(FilaJobs):
+    def __init__(self, max_itens: int = 0):
+        # max_itens <= 0: sem limite próprio (o gerenciador já limita os pendentes)
+        self._fila: 'queue.Queue[str]' = queue.Queue(maxsize=max_itens)
+
+    def colocar(self, job_id: str) -> None:
+        try:
+            self._fila.put_nowait(job_id)
+        except queue.Full:
+            raise FilaCheia() from None
+
+    def retirar(self, timeout: Optional[float] = None) -> Optional[str]:
+        try:
+            return self._fila.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+# --- GERENCIADOR ---
+
+class GerenciadorJobs:
+    def __init__(self, fila: Optional[FilaJobs] = None, num_workers: int = 2, retencao: float = 3600.0,
+                 max_pendentes: int = 256, max_retidos: int = 1024):
+        self.fila = fila or FilaEmProcesso()
+        self.num_workers = num_workers
+        self.retencao = retencao
+        self.max_pendentes = max_pendentes
+        self.max_retidos = max_retidos
+        self._tipos: Dict[str, Callable[[Any, Progresso], Any]] = {}
+        self._jobs: Dict[str, Job] = {}
+        # Jobs ainda não finalizados (pendentes ou executando)
+        self._ativos = 0
+        self._mudanca = threading.Condition()
+        self._workers = []
+
+    def registrar_tipo(self, nome: str, executar: Callable[[Any, Progresso], Any]) -> None:
+        self._tipos[nome] = executar
+
+    @property
+    def tipos(self):
+        return list(self._tipos)
+
+    def _iniciar_workers(self) -> None:
+        # Workers criados sob demanda, para não gerar threads em processos que nunca usam jobs
+        if self._workers:
+            return
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._laco_worker, name=f'job-worker-{i}', daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submeter(self, tipo: str, parametros: Any, envolver: Optional[Callable[[Callable], Callable]] = None,
+                 perfil: Optional[str] = None) -> Job:
+        if tipo not in self._tipos:
+            raise ValueError(f"Tipo de job desconhecido: '{tipo}'. Use um de {', '.join(self._tipos)}.")
+        self._limpar_antigos()
+        job = Job(id=uuid.uuid4().hex, tipo=tipo, parametros=parametros, perfil=perfil, envolver=envolver)
+        with self._mudanca:
+            if self._ativos >= self.max_pendentes:
+                raise FilaCheia()
+            self._descartar_excedentes()
+            self._jobs[job.id] = job
+            self._ativos += 1
+            self._iniciar_workers()
+        try:
+            self.fila.colocar(job.id)
+        except FilaCheia:
+            with self._mudanca:
+                del self._jobs[job.id]
+                self._ativos -= 1
+            raise
+        return job
+
+    def obter(self, job_id: str) -> Optional[Job]:
+        with self._mudanca:
+            return self._jobs.get(job_id)
+
+    def cancelar(self, job_id: str) -> Optional[Job]:
+        with self._mudanca:
+            job = self._jobs.get(job_id)
+            if job is None or job.estado in ESTADOS_FINAIS:
+                return job
+            job.cancelar.set()
+            if job.estado == PENDENTE:
+                self._finalizar(job, CANCELADO)
+            return job
+
+    def aguardar_mudanca(self, job: Job, versao: int, timeout: float) -> int:
+        """Bloqueia até a versão do job mudar (ou o timeout) e devolve a versão atual."""
+        with self._mudanca:
+            self._mudanca.wait_for(lambda: job.versao != versao, timeout=timeout)
+            return job.versao
+
+    def _atualizar(self, job: Job, **campos) -> None:
+        with self._mudanca:
+            for nome, valor in campos.items():
+                setattr(job, nome, valor)
+            job.versao += 1
+            self._mudanca.notify_all()
+
+    def _finalizar(self, job: Job, estado: str, **campos) -> None:
+        with self._mudanca:
+            self._ativos -= 1
+            self._atualizar(job, estado=estado, finalizado=time.time(), parametros=None, **campos)
+
+    def _limpar_antigos(self) -> None:
+        limite = time.time() - self.retencao
+        with self._mudanca:
+            for job_id in [j.id for j in self._jobs.values() if j.finalizado is not None and j.finalizado < limite]:
+                del self._jobs[job_id]
+
+    def _descartar_excedentes(self) -> None:
+        """Abre espaço para um job novo descartando os finalizados mais antigos (chamar com o lock)."""
+        excesso = len(self._jobs) + 1 - self.max_retidos
+        if excesso <= 0:
+            return
+        finalizados = sorted((j for j in self._jobs.values() if j.finalizado is not None), key=lambda j: j.finalizado)
+        for job in finalizados[:excesso]:
+            del self._jobs[job.id]
+
+    def _laco_worker(self) -> None:
+        while True:
+            job_id = self.fila.retirar(timeout=1.0)
+            if job_id is None:
+                continue
+            job = self.obter(job_id)
+            if job is not None:
+                self._executar(job)
+
+    def _executar(self, job: Job) -> None:
+        with self._mudanca:
+            # Um job cancelado enquanto estava na fila não chega a rodar
+            if job.estado != PENDENTE:
+                return
+            self._atualizar(job, estado=EXECUTANDO, iniciado=time.time())
+
+        def progresso(fracao: float) -> None:
+            if job.cancelar.is_set():
+                raise Cancelado()
+            self._atualizar(job, progresso=min(max(float(fracao), 0.0), 1.0))
+
+        try:
+            executar = self._tipos[job.tipo]
+            if job.envolver is not None:
+                executar = job.envolver(executar)
+            resultado = executar(job.parametros, progresso)
+        except Cancelado:
+            self._finalizar(job, CANCELADO)
+        except Exception as e:
+            self._finalizar(job, FALHOU, erro=str(e) or type(e).__name__)
+        else:
+            self._finalizar(job, CONCLUIDO, progresso=1.0, resultado=resultado)
+
+def gerenciador_do_ambiente() -> GerenciadorJobs:
+    """Cria o gerenciador a partir de SIMULADOR_JOBS_WORKERS, SIMULADOR_JOBS_RETENCAO,
+    SIMULADOR_JOBS_FILA (máximo de pendentes) e SIMULADOR_JOBS_RETIDOS (máximo de jobs guardados)."""
+    return GerenciadorJobs(
+        num_workers=int(os.environ.get('SIMULADOR_JOBS_WORKERS', 2)),
+        retencao=float(os.environ.get('SIMULADOR_JOBS_RETENCAO', 3600)),
+        max_pendentes=int(os.environ.get('SIMULADOR_JOBS_FILA', 256)),
+        max_retidos=int(os.environ.get('SIMULADOR_JOBS_RETIDOS', 1024)),
+    )
@@ -0,0 +1,65 @@
+"""Mede o tempo de inicialização e a memória do worker da API.
+
+Compara a cadeia de imports antiga de `api.py` (que carregava
+`cultivation-dashboard-streamlit.py` e, com ele, streamlit, matplotlib,
+pandas e numpy) com a atual, que importa apenas o núcleo `simulador_cultivo`.
+Cada medição roda em um processo Python novo.
+
+Uso: python scripts/medir_inicializacao.py [--repeticoes 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+CENARIOS = {
+    # O que `import api` executava antes da extração do núcleo
+    'antes (dashboard streamlit)': 'import flask, streamlit, matplotlib.pyplot, numpy, pandas; import simulador_cultivo',
+    'depois (núcleo leve)': 'import api',
+}
+
+_SONDA = """
+import json, resource, sys, time
+inicio = time.perf_counter()
+{codigo}
+duracao = time.perf_counter() - inicio
+maxrss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    maxrss_kb //= 1024
+print(json.dumps({{'segundos': duracao, 'maxrss_mb': maxrss_kb / 1024, 'numpy': 'numpy' in sys.modules, 'modulos': len(sys.modules)}}))
+"""
+
+def medir(codigo: str, repeticoes: int) -> dict:
+    """Executa o trecho em processos novos e devolve as medianas de tempo e memória."""
+    amostras = []
+    for _ in range(repeticoes):
+        saida = subprocess.run([sys.executable, '-c', _SONDA.format(codigo=codigo)], cwd=DIRETORIO,
+                               capture_output=True, text=True, check=True)
+        amostras.append(json.loads(saida.stdout.strip().splitlines()[-1]))
+    return {
+        'segundos': statistics.median(a['segundos'] for a in amostras),
+        'maxrss_mb': statistics.median(a['maxrss_mb'] for a in amostras),
+        'numpy': amostras[0]['numpy'],
+        'modulos': amostras[0]['modulos'],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    resultados = {nome: medir(codigo, args.repeticoes) for nome, codigo in CENARIOS.items()}
+    print(f"{'Cenário':<30}{'Tempo (ms)':>12}{'Memória (MB)':>15}{'Módulos':>10}{'NumPy':>8}")
+    for nome, r in resultados.items():
+        print(f"{nome:<30}{r['segundos'] * 1000:>12.1f}{r['maxrss_mb']:>15.1f}{r['modulos']:>10}{'sim' if r['numpy'] else 'não':>8}")
+    antes, depois = resultados.values()
+    print(f"\nInicialização {antes['segundos'] / depois['segundos']:.1f}x mais rápida, "
+          f"{antes['maxrss_mb'] - depois['maxrss_mb']:.1f} MB a menos de memória residente.")
+
+if __name__ == '__main__':
+    main()
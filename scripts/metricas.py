@@ -0,0 +1,228 @@
+"""Métricas da API no formato de texto do Prometheus.
+
+Implementação mínima e sem dependências: contadores, medidores e histogramas
+com rótulos, guardados em dicionários e exportados em `/metrics`. Cada
+observação custa uma busca binária nos limites e um incremento sob lock, de
+modo que o custo por requisição fica na casa de microssegundos.
+
+Com `SIMULADOR_METRICAS=0` nada é registrado: os ganchos do Flask não são
+instalados, `etapa()` devolve um contexto vazio e `/metrics` responde 404.
+"""
+
+import bisect
+import contextlib
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Limites padrão (segundos) para latências de requisição e de etapas internas
+LIMITES_LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Limites padrão (bytes) para tamanhos de corpo
+LIMITES_BYTES = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+def _rotulos(nomes: Sequence[str], valores: Sequence[str], extra: str = '') -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+def _escapar(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _numero(valor: float) -> str:
+    if valor == float('inf'):
+        return '+Inf'
+    if valor == float('-inf'):
+        return '-Inf'
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+class _Familia:
+    tipo = ''
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.nomes_rotulos = tuple(rotulos)
+        self._valores: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def cabecalho(self) -> List[str]:
+        return [f'# HELP {self.nome} {self.ajuda}', f'# TYPE {self.nome} {self.tipo}']
+
+class Contador(_Familia):
+    tipo = 'counter'
+
+    def inc(self, *rotulos: str, valor: float = 1.0) -> None:
+        with self._lock:
+            self._valores[rotulos] = self._valores.get(rotulos, 0.0) + valor
+
+    def exportar(self) -> List[str]:
+        with self._lock:
+            itens = list(self._valores.items())
+        return self.cabecalho() + [f'{self.nome}{_rotulos(self.nomes_rotulos, r)} {_numero(v)}' for r, v in itens]
+
+class Medidor(Contador):
+    tipo = 'gauge'
+
+    def dec(self, *rotulos: str, valor: float = 1.0) -> None:
+        self.inc(*rotulos, valor=-valor)
+
+    def definir(self, *rotulos: str, valor: float) -> None:
+        with self._lock:
+            self._valores[rotulos] = valor
+
+class Histograma(_Familia):
+    tipo = 'histogram'
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = (), limites: Sequence[float] = LIMITES_LATENCIA):
+        super().__init__(nome, ajuda, rotulos)
+        self.limites = tuple(sorted(limites))
+
+    def observar(self, valor: float, *rotulos: str) -> None:
+        indice = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            estado = self._valores.get(rotulos)
+            if estado is None:
+                # [contagens por classe (+Inf no fim), soma]
+                estado = self._valores[rotulos] = [[0] * (len(self.limites) + 1), 0.0]
+            estado[0][indice] += 1
+            estado[1] += valor
+
+    def exportar(self) -> List[str]:
+        with self._lock:
+            itens = [(r, list(e[0]), e[1]) for r, e in self._valores.items()]
+        linhas = self.cabecalho()
+        for rotulos, contagens, soma in itens:
+            acumulado = 0
+            for limite, contagem in zip(self.limites + (float('inf'),), contagens):
+                acumulado += contagem
+                le = f'le="{_numero(limite)}"'
+                linhas.append(f'{self.nome}_bucket{_rotulos(self.nomes_rotulos, rotulos, le)} {acumulado}')
+            linhas.append(f'{self.nome}_sum{_rotulos(self.nomes_rotulos, rotulos)} {_numero(soma)}')
+            linhas.append(f'{self.nome}_count{_rotulos(self.nomes_rotulos, rotulos)} {acumulado}')
+        return linhas
+
+class Metricas:
+    """Registro de métricas; com `ativo=False` os métodos de coleta viram no-ops."""
+
+    def __init__(self, ativo: bool = True):
+        self.ativo = ativo
+        self._familias: List[_Familia] = []
+        self._coletores: List[Callable[[], Iterable[str]]] = []
+        self.requisicoes = self._registrar(Contador(
+            'simulador_requisicoes_total', 'Requisições atendidas por rota, método e status.', ('rota', 'metodo', 'status')))
+        self.latencia = self._registrar(Histograma(
+            'simulador_requisicao_segundos', 'Latência das requisições por rota (até o fim do corpo).', ('rota',)))
+        self.bytes_requisicao = self._registrar(Histograma(
+            'simulador_requisicao_bytes', 'Tamanho do corpo das requisições por rota.', ('rota',), LIMITES_BYTES))
+        self.bytes_resposta = self._registrar(Histograma(
+            'simulador_resposta_bytes', 'Tamanho do corpo das respostas com tamanho conhecido, por rota.', ('rota',), LIMITES_BYTES))
+        self.em_andamento = self._registrar(Medidor(
+            'simulador_requisicoes_em_andamento', 'Requisições em processamento por rota.', ('rota',)))
+        self.etapas = self._registrar(Histograma(
+            'simulador_etapa_segundos', 'Tempo por etapa: motor de simulação, serialização e desserialização JSON.', ('etapa',)))
+        self._vazio = contextlib.nullcontext()
+
+    def _registrar(self, familia: _Familia):
+        self._familias.append(familia)
+        return familia
+
+    def coletor(self, funcao: Callable[[], Iterable[str]]) -> None:
+        """Registra uma função chamada a cada exportação, que devolve linhas prontas."""
+        self._coletores.append(funcao)
+
+    def etapa(self, nome: str):
+        """Contexto que soma a duração do bloco à etapa `nome`."""
+        if not self.ativo:
+            return self._vazio
+        return _Cronometro(self.etapas, nome)
+
+    def exportar(self) -> str:
+        linhas = []
+        for familia in self._familias:
+            linhas.extend(familia.exportar())
+        for coletor in self._coletores:
+            linhas.extend(coletor())
+        return '\n'.join(linhas) + '\n'
+
+class _Cronometro:
+    __slots__ = ('histograma', 'nome', 'inicio')
+
+    def __init__(self, histograma: Histograma, nome: str):
+        self.histograma = histograma
+        self.nome = nome
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+
+    def __exit__(self, *_):
+        self.histograma.observar(time.perf_counter() - self.inicio, self.nome)
+
+# --- INTEGRAÇÃO COM O FLASK ---
+
+def instrumentar(app, metricas: Metricas) -> None:
+    """Registra os ganchos de contagem e latência e a rota `/metrics`."""
+    from flask import Response, g, request
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        if not metricas.ativo:
+            return Response('Métricas desativadas.\n', status=404, mimetype='text/plain')
+        return Response(metricas.exportar(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+    if not metricas.ativo:
+        return
+
+    @app.before_request
+    def _inicio():
+        # Rota do padrão registrado (ex.: /api/jobs/<job_id>), para não explodir a cardinalidade
+        rota = request.url_rule.rule if request.url_rule is not None else 'desconhecida'
+        g.metricas_rota = rota
+        g.metricas_inicio = time.perf_counter()
+        metricas.em_andamento.inc(rota)
+        if request.content_length:
+            metricas.bytes_requisicao.observar(request.content_length, rota)
+
+    @app.after_request
+    def _fim(resposta):
+        rota = g.pop('metricas_rota', None)
+        if rota is None:
+            return resposta
+        inicio = g.pop('metricas_inicio')
+        metricas.requisicoes.inc(rota, request.method, str(resposta.status_code))
+
+        def encerrar():
+            metricas.latencia.observar(time.perf_counter() - inicio, rota)
+            metricas.em_andamento.dec(rota)
+
+        if resposta.content_length is None:
+            # Corpo em streaming, ainda por gerar: encerra quando o servidor fechar a resposta
+            resposta.call_on_close(encerrar)
+        else:
+            metricas.bytes_resposta.observar(resposta.content_length, rota)
+            encerrar()
+        return resposta
+
+def coletor_cache(cache) -> Callable[[], List[str]]:
+    """Exporta os contadores do `CacheResultados` no momento da coleta."""
+    def coletar() -> List[str]:
+        e = cache.estatisticas()
+        return [
+            '# HELP simulador_cache_consultas_total Consultas ao cache de resultados por desfecho.',
+            '# TYPE simulador_cache_consultas_total counter',
+            f'simulador_cache_consultas_total{{resultado="acerto_memoria"}} {e["acertos_memoria"]}',
+            f'simulador_cache_consultas_total{{resultado="acerto_disco"}} {e["acertos_disco"]}',
+            f'simulador_cache_consultas_total{{resultado="falha"}} {e["falhas"]}',
+            '# HELP simulador_cache_taxa_acerto Fração das consultas atendidas pelo cache.',
+            '# TYPE simulador_cache_taxa_acerto gauge',
+            f'simulador_cache_taxa_acerto {_numero(e["taxa_acerto"])}',
+            '# HELP simulador_cache_itens Itens no cache em memória.',
+            '# TYPE simulador_cache_itens gauge',
+            f'simulador_cache_itens {e["tamanho"]}',
+        ]
+    return coletar
+
+def metricas_do_ambiente() -> Metricas:
+    """Cria o registro a partir da variável SIMULADOR_METRICAS (padrão: ativo)."""
+    return Metricas(ativo=os.environ.get('SIMULADOR_METRICAS', '1').lower() not in ('0', 'false', 'nao', 'não', 'off'))
@@ -0,0 +1,296 @@
+"""Simulação de Monte Carlo de risco para o simulador de cultivo.
+
+Qualquer campo de `ParametrosCiclo`/`CustosMercado` pode receber uma
+distribuição; os sorteios são avaliados com o `SimuladorLote` em blocos de
+tamanho fixo e cada bloco é reduzido a histogramas e contadores antes de ser
+descartado, de modo que a memória não cresce com o número de sorteios. Os
+blocos são distribuídos em um pool de processos e cada um recebe sua própria
+semente derivada (`SeedSequence.spawn`), então o resultado é reprodutível
+para uma mesma semente independentemente do número de workers. O pool é único
+por processo e limitado a `MAX_WORKERS`; cada simulação mantém no máximo
+`BLOCOS_POR_WORKER` blocos por worker em andamento, e as sementes são geradas
+conforme os blocos são enviados.
+
+Os percentis são interpolados a partir dos histogramas (2048 classes sobre a
+faixa observada em um bloco piloto, mais contagens abaixo/acima da faixa).
+"""
+
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, fields
+from typing import Any, Callable, Dict, Mapping, Optional, Sequence
+
+import numpy as np
+
+from simulador_cultivo import SetupInvestimento, ParametrosCiclo, CustosMercado, SimuladorLote
+
+METRICAS = ('lucro_liquido_ciclo', 'periodo_payback_ciclos', 'roi_investimento_1_ano')
+PERCENTIS_PADRAO = (5, 10, 25, 50, 75, 90, 95)
+TAMANHO_BLOCO = 100_000
+# Blocos muito pequenos multiplicam sementes e tarefas; muito grandes, a memória por bloco
+MIN_TAMANHO_BLOCO = 1_000
+MAX_TAMANHO_BLOCO = 1_000_000
+NUM_CLASSES = 2048
+# Teto de processos do servidor; o pedido pode usar menos, nunca mais
+MAX_WORKERS = int(os.environ.get('SIMULADOR_MONTE_CARLO_WORKERS', 0)) or os.cpu_count() or 1
+# Blocos em andamento por worker: mantém o pool ocupado sem enfileirar a simulação inteira
+BLOCOS_POR_WORKER = 2
+
+_pool: Optional[ProcessPoolExecutor] = None
+_trava_pool = threading.Lock()
+
+def _pool_compartilhado() -> ProcessPoolExecutor:
+    """Pool de processos único do módulo, criado na primeira simulação paralela."""
+    global _pool
+    with _trava_pool:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+        return _pool
+
+def _descartar_pool(pool: ProcessPoolExecutor) -> None:
+    """Esquece um pool quebrado (worker morto) para que a próxima simulação crie outro."""
+    global _pool
+    with _trava_pool:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+CAMPOS_ALEATORIOS = {**{f.name: 'cycle' for f in fields(ParametrosCiclo)}, **{f.name: 'market' for f in fields(CustosMercado)}}
+
+# tipo -> parâmetros obrigatórios
+DISTRIBUICOES = {
+    'normal': ('mean', 'std'),
+    'lognormal': ('mean', 'std'),
+    'uniform': ('low', 'high'),
+    'triangular': ('low', 'mode', 'high'),
+    'constant': ('value',),
+}
+
+def validar_distribuicoes(distribuicoes: Mapping[str, Mapping[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Confere campos, tipos e parâmetros; levanta ValueError com uma mensagem legível."""
+    validadas = {}
+    for campo, spec in distribuicoes.items():
+        if campo not in CAMPOS_ALEATORIOS:
+            raise ValueError(f"'{campo}' não é um campo de ParametrosCiclo/CustosMercado.")
+        if not isinstance(spec, Mapping) or spec.get('type') not in DISTRIBUICOES:
+            raise ValueError(f"'{campo}': 'type' deve ser um de {', '.join(DISTRIBUICOES)}.")
+        spec = dict(spec)
+        for parametro in DISTRIBUICOES[spec['type']] + ('min', 'max'):
+            if parametro in spec:
+                valor = spec[parametro]
+                if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+                    raise ValueError(f"'{campo}.{parametro}' deve ser numérico.")
+            elif parametro not in ('min', 'max'):
+                raise ValueError(f"'{campo}': parâmetro '{parametro}' é obrigatório para '{spec['type']}'.")
+        if spec['type'] in ('normal', 'lognormal') and spec['std'] < 0:
+            raise ValueError(f"'{campo}.std' não pode ser negativo.")
+        if spec['type'] == 'lognormal' and spec['mean'] <= 0:
+            raise ValueError(f"'{campo}.mean' deve ser positivo para a lognormal.")
+        if spec['type'] == 'uniform' and spec['low'] > spec['high']:
+            raise ValueError(f"'{campo}': 'low' maior que 'high'.")
+        if spec['type'] == 'triangular' and not spec['low'] <= spec['mode'] <= spec['high']:
+            raise ValueError(f"'{campo}': é preciso low <= mode <= high.")
+        validadas[campo] = spec
+    return validadas
+
+def _sortear(gerador: np.random.Generator, spec: Dict[str, Any], n: int) -> np.ndarray:
+    tipo = spec['type']
+    if tipo == 'normal':
+        valores = gerador.normal(spec['mean'], spec['std'], n)
+    elif tipo == 'lognormal':
+        # Parametrizada pela média e desvio da própria variável
+        sigma2 = np.log1p((spec['std'] / spec['mean']) ** 2)
+        valores = gerador.lognormal(np.log(spec['mean']) - sigma2 / 2, np.sqrt(sigma2), n)
+    elif tipo == 'uniform':
+        valores = gerador.uniform(spec['low'], spec['high'], n)
+    elif tipo == 'triangular':
+        valores = gerador.triangular(spec['low'], spec['mode'], spec['high'], n) if spec['low'] < spec['high'] else np.full(n, float(spec['low']))
+    else:
+        valores = np.full(n, float(spec['value']))
+    if 'min' in spec or 'max' in spec:
+        valores = np.clip(valores, spec.get('min', -np.inf), spec.get('max', np.inf))
+    return valores
+
+def _amostrar_bloco(base: Dict[str, Dict[str, float]], distribuicoes: Dict[str, Dict[str, Any]],
+                    semente: np.random.SeedSequence, n: int) -> Dict[str, np.ndarray]:
+    gerador = np.random.default_rng(semente)
+    grupos = {grupo: dict(valores) for grupo, valores in base.items()}
+    # Ordem fixa dos campos para que o fluxo de números aleatórios seja reprodutível
+    for campo in sorted(distribuicoes):
+        grupos[CAMPOS_ALEATORIOS[campo]][campo] = _sortear(gerador, distribuicoes[campo], n)
+    resultados = SimuladorLote(grupos['setup'], grupos['cycle'], grupos['market']).simular()
+    return {m: np.broadcast_to(resultados[m], (n,)) for m in METRICAS}
+
+def _agregar(metricas: Dict[str, np.ndarray], bordas: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """Reduz um bloco a estatísticas de tamanho fixo."""
+    agregado = {
+        'prejuizo': int(np.count_nonzero(metricas['lucro_liquido_ciclo'] < 0)),
+        'roi_negativo': int(np.count_nonzero(metricas['roi_investimento_1_ano'] < 0)),
+    }
+    for m, valores in metricas.items():
+        finitos = valores[np.isfinite(valores)]
+        e = bordas[m]
+        agregado[m] = {
+            'n': int(finitos.size),
+            'inf_pos': int(np.count_nonzero(valores == np.inf)),
+            'inf_neg': int(np.count_nonzero(valores == -np.inf)),
+            'nan': int(np.count_nonzero(np.isnan(valores))),
+            'soma': float(finitos.sum()),
+            'soma_quadrados': float(np.square(finitos).sum()),
+            'minimo': float(finitos.min()) if finitos.size else np.inf,
+            'maximo': float(finitos.max()) if finitos.size else -np.inf,
+            'abaixo': int(np.count_nonzero(finitos < e[0])),
+            'acima': int(np.count_nonzero(finitos > e[-1])),
+            'histograma': np.histogram(finitos, bins=e)[0],
+        }
+    return agregado
+
+def _processar_bloco(argumentos) -> Dict[str, Any]:
+    base, distribuicoes, semente, n, bordas = argumentos
+    return _agregar(_amostrar_bloco(base, distribuicoes, semente, n), bordas)
+
+def _bordas(valores: np.ndarray) -> np.ndarray:
+    """Faixa do histograma: a observada no bloco piloto, alargada em 50% para cada lado."""
+    finitos = valores[np.isfinite(valores)]
+    if finitos.size == 0:
+        return np.linspace(-1.0, 1.0, NUM_CLASSES + 1)
+    minimo, maximo = float(finitos.min()), float(finitos.max())
+    folga = max(maximo - minimo, abs(maximo), 1.0) * 0.5
+    return np.linspace(minimo - folga, maximo + folga, NUM_CLASSES + 1)
+
+def _mesclar(total: Optional[Dict[str, Any]], parcial: Dict[str, Any]) -> Dict[str, Any]:
+    if total is None:
+        return parcial
+    total['prejuizo'] += parcial['prejuizo']
+    total['roi_negativo'] += parcial['roi_negativo']
+    for m in METRICAS:
+        t, p = total[m], parcial[m]
+        for chave in ('n', 'inf_pos', 'inf_neg', 'nan', 'soma', 'soma_quadrados', 'abaixo', 'acima', 'histograma'):
+            t[chave] = t[chave] + p[chave]
+        t['minimo'] = min(t['minimo'], p['minimo'])
+        t['maximo'] = max(t['maximo'], p['maximo'])
+    return total
+
+def _percentis(estatisticas: Dict[str, Any], bordas: np.ndarray, percentis: Sequence[float]) -> Dict[str, float]:
+    """Interpola percentis no histograma acumulado, incluindo os infinitos nas pontas."""
+    contagens = np.concatenate(([estatisticas['inf_neg'], estatisticas['abaixo']], estatisticas['histograma'],
+                                [estatisticas['acima'], estatisticas['inf_pos']]))
+    inicio = np.concatenate(([-np.inf, estatisticas['minimo']], bordas[:-1], [bordas[-1], np.inf]))
+    fim = np.concatenate(([-np.inf, bordas[0]], bordas[1:], [estatisticas['maximo'], np.inf]))
+    acumulado = np.cumsum(contagens)
+    total = acumulado[-1]
+    resultado = {}
+    for q in percentis:
+        if total == 0:
+            resultado[f'p{q:g}'] = float('nan')
+            continue
+        alvo = q / 100 * total
+        i = int(np.searchsorted(acumulado, alvo, side='left'))
+        i = min(i, len(contagens) - 1)
+        if i == 0 or i == len(contagens) - 1:
+            # O percentil cai entre os resultados infinitos (ex.: payback sem lucro)
+            resultado[f'p{q:g}'] = float(-np.inf if i == 0 else np.inf)
+            continue
+        anterior = acumulado[i - 1] if i > 0 else 0
+        fracao = (alvo - anterior) / contagens[i] if contagens[i] else 0.0
+        resultado[f'p{q:g}'] = float(inicio[i] + fracao * (fim[i] - inicio[i]))
+    return resultado
+
+def simular_monte_carlo(setup: SetupInvestimento, ciclo: ParametrosCiclo, mercado: CustosMercado,
+                        distribuicoes: Mapping[str, Mapping[str, Any]], num_amostras: int = 1_000_000,
+                        semente: Optional[int] = None, tamanho_bloco: int = TAMANHO_BLOCO,
+                        workers: Optional[int] = None, percentis: Sequence[float] = PERCENTIS_PADRAO,
+                        progresso: Optional[Callable[[float], None]] = None) -> Dict[str, Any]:
+    """Roda `num_amostras` sorteios e devolve percentis, médias e probabilidades de prejuízo.
+
+    `progresso(fracao)` é chamado após cada bloco agregado; uma exceção levantada
+    por ele interrompe a simulação e descarta os blocos ainda não iniciados.
+    """
+    if num_amostras <= 0:
+        raise ValueError("num_amostras deve ser positivo.")
+    if not MIN_TAMANHO_BLOCO <= tamanho_bloco <= MAX_TAMANHO_BLOCO:
+        raise ValueError(f"tamanho_bloco deve estar entre {MIN_TAMANHO_BLOCO} e {MAX_TAMANHO_BLOCO}.")
+    if workers is not None and workers < 1:
+        raise ValueError("workers deve ser positivo.")
+    workers = min(workers or MAX_WORKERS, MAX_WORKERS)
+    distribuicoes = validar_distribuicoes(distribuicoes)
+    if semente is None:
+        semente = int(np.random.SeedSequence().entropy % 2 ** 63)
+    base = {'setup': asdict(setup), 'cycle': asdict(ciclo), 'market': asdict(mercado)}
+
+    num_blocos = -(-num_amostras // tamanho_bloco)
+    raiz = np.random.SeedSequence(semente)
+
+    def tarefas():
+        # spawn(1) sucessivos dão as mesmas sementes de spawn(num_blocos), sem materializá-las todas
+        for i in range(num_blocos):
+            n = min(tamanho_bloco, num_amostras - i * tamanho_bloco)
+            yield raiz.spawn(1)[0], n
+
+    blocos = tarefas()
+    # O primeiro bloco define a faixa dos histogramas e é agregado no próprio processo
+    semente_piloto, n_piloto = next(blocos)
+    piloto = _amostrar_bloco(base, distribuicoes, semente_piloto, n_piloto)
+    bordas = {m: _bordas(valores) for m, valores in piloto.items()}
+    total = _agregar(piloto, bordas)
+    del piloto
+
+    def avancar(concluidos: int) -> None:
+        if progresso is not None:
+            progresso(concluidos / num_blocos)
+
+    avancar(1)
+    if num_blocos > 1 and workers > 1:
+        pool = _pool_compartilhado()
+        pendentes = deque()
+        concluidos = 1
+        try:
+            for s, n in blocos:
+                pendentes.append(pool.submit(_processar_bloco, (base, distribuicoes, s, n, bordas)))
+                if len(pendentes) < workers * BLOCOS_POR_WORKER:
+                    continue
+                # Mescla na ordem dos blocos, então as somas em ponto flutuante são determinísticas
+                total = _mesclar(total, pendentes.popleft().result())
+                concluidos += 1
+                avancar(concluidos)
+            while pendentes:
+                total = _mesclar(total, pendentes.popleft().result())
+                concluidos += 1
+                avancar(concluidos)
+        except BrokenProcessPool:
+            _descartar_pool(pool)
+            raise
+        finally:
+            for futuro in pendentes:
+                futuro.cancel()
+    else:
+        for concluidos, (s, n) in enumerate(blocos, start=2):
+            total = _mesclar(total, _processar_bloco((base, distribuicoes, s, n, bordas)))
+            avancar(concluidos)
+
+    resumo = {}
+    for m in METRICAS:
+        t = total[m]
+        media = t['soma'] / t['n'] if t['n'] else float('nan')
+        variancia = max(t['soma_quadrados'] / t['n'] - media ** 2, 0.0) if t['n'] else float('nan')
+        resumo[m] = {
+            'media_finitos': media,
+            'desvio_finitos': float(np.sqrt(variancia)),
+            'minimo': t['minimo'] if t['n'] else float('nan'),
+            'maximo': t['maximo'] if t['n'] else float('nan'),
+            'percentis': _percentis(t, bordas[m], percentis),
+            'prob_infinito': t['inf_pos'] / num_amostras,
+            'prob_indefinido': t['nan'] / num_amostras,
+        }
+    return {
+        'num_amostras': num_amostras,
+        'semente': semente,
+        'tamanho_bloco': tamanho_bloco,
+        'prob_prejuizo': total['prejuizo'] / num_amostras,
+        'prob_sem_payback': total['periodo_payback_ciclos']['inf_pos'] / num_amostras,
+        'prob_roi_negativo': total['roi_negativo'] / num_amostras,
+        'metricas': resumo,
+    }
@@ -0,0 +1,226 @@
+"""Otimizador do espaço de parâmetros do simulador de cultivo.
+
+Busca grossa-para-fina: uma grade grossa sobre as faixas da barra lateral
+(`FAIXAS_BARRA_LATERAL`) é avaliada de uma vez com o `SimuladorLote`; só os
+melhores candidatos viáveis sobrevivem (poda) e cada nível seguinte refina a
+vizinhança deles com metade do espaçamento, até chegar ao passo do controle
+(ou à tolerância, para campos contínuos). Os pontos por eixo diminuem com o
+número de variáveis para que a grade caiba em `MAX_LINHAS_GRADE` e cada nível
+de refino em `MAX_LINHAS_REFINO`. Lotes grandes são divididos entre
+threads — as operações do NumPy liberam o GIL.
+
+No modelo de `simular()` a potência não altera a produção nem o investimento,
+então sem acoplamentos o ótimo é trivial (potência mínima, plantas máximas).
+`Acoplamentos` permite ligar o custo da iluminação à potência e limitar a
+produção pela eficiência (g/W) da luminária, que é o que torna a pergunta
+"qual potência e quantas plantas?" significativa.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from simulador_cultivo import (SetupInvestimento, ParametrosCiclo, CustosMercado, SimuladorLote,
+                               FAIXAS_BARRA_LATERAL)
+
+# métrica -> True para maximizar, False para minimizar
+OBJETIVOS = {
+    'roi_investimento_1_ano': True,
+    'lucro_liquido_ciclo': True,
+    'gramas_por_watt': True,
+    'periodo_payback_ciclos': False,
+    'custo_por_grama': False,
+}
+MAX_LINHAS_GRADE = 1_000_000
+# Cada nível de refino é somado aos anteriores (ranking e Pareto usam todos os pontos avaliados)
+MAX_LINHAS_REFINO = 100_000
+# Com 12 variáveis a grade grossa ainda tem 3 pontos por eixo e o refino, 2
+MAX_VARIAVEIS = 12
+LINHAS_POR_THREAD = 50_000
+
+@dataclass
+class Restricoes:
+    """Restrições do usuário; None desativa a restrição."""
+    orcamento_max: Optional[float] = None
+    kwh_max_ciclo: Optional[float] = None
+    plantas_max: Optional[float] = None
+    plantas_por_m2_max: Optional[float] = None
+
+@dataclass
+class Acoplamentos:
+    """Relações opcionais entre variáveis que o modelo base não captura."""
+    custo_iluminacao_por_watt: Optional[float] = None
+    gramas_por_watt_max: Optional[float] = None
+
+def _grade(minimo: float, maximo: float, passo: Optional[float], pontos: int, origem: float) -> np.ndarray:
+    """Pontos igualmente espaçados em [minimo, maximo], alinhados ao passo do controle."""
+    valores = np.linspace(minimo, maximo, max(pontos, 2))
+    if passo:
+        valores = origem + np.round((valores - origem) / passo) * passo
+    return np.unique(valores)
+
+class Otimizador:
+    def __init__(self, setup: SetupInvestimento, ciclo: ParametrosCiclo, mercado: CustosMercado,
+                 variaveis: Sequence[str] = ('potencia_watts', 'num_plantas'),
+                 objetivo: str = 'roi_investimento_1_ano',
+                 restricoes: Optional[Restricoes] = None, acoplamentos: Optional[Acoplamentos] = None,
+                 faixas: Optional[Mapping[str, Tuple[float, float, Optional[float]]]] = None,
+                 workers: Optional[int] = None):
+        if objetivo not in OBJETIVOS:
+            raise ValueError(f"Objetivo inválido: '{objetivo}'. Use um de {', '.join(OBJETIVOS)}.")
+        faixas = {**FAIXAS_BARRA_LATERAL, **(faixas or {})}
+        if not variaveis:
+            raise ValueError("Informe ao menos uma variável de decisão.")
+        if len(variaveis) > MAX_VARIAVEIS:
+            raise ValueError(f"No máximo {MAX_VARIAVEIS} variáveis de decisão.")
+        if len(set(variaveis)) != len(variaveis):
+            raise ValueError("Variáveis de decisão repetidas.")
+        campos = {f for classe in (SetupInvestimento, ParametrosCiclo, CustosMercado) for f in asdict(classe())}
+        for nome in variaveis:
+            if nome not in campos:
+                raise ValueError(f"Variável desconhecida: '{nome}'.")
+            if nome not in faixas:
+                raise ValueError(f"Variável sem faixa definida: '{nome}'.")
+            minimo, maximo, _ = faixas[nome]
+            if minimo > maximo:
+                raise ValueError(f"Faixa inválida para '{nome}'.")
+        self.base = {'setup': asdict(setup), 'cycle': asdict(ciclo), 'market': asdict(mercado)}
+        self.grupo = {nome: grupo for grupo, valores in self.base.items() for nome in valores}
+        self.variaveis = list(variaveis)
+        self.faixas = {nome: faixas[nome] for nome in self.variaveis}
+        self.objetivo = objetivo
+        self.maximizar = OBJETIVOS[objetivo]
+        self.restricoes = restricoes or Restricoes()
+        self.acoplamentos = acoplamentos or Acoplamentos()
+        self.workers = workers or os.cpu_count() or 1
+        self.avaliacoes = 0
+
+    # --- Avaliação vetorizada ---
+
+    def _avaliar_bloco(self, candidatos: np.ndarray) -> Dict[str, np.ndarray]:
+        grupos = {grupo: dict(valores) for grupo, valores in self.base.items()}
+        for j, nome in enumerate(self.variaveis):
+            grupos[self.grupo[nome]][nome] = candidatos[:, j]
+        s, c = grupos['setup'], grupos['cycle']
+        potencia = np.broadcast_to(c['potencia_watts'], (len(candidatos),))
+        plantas = np.broadcast_to(c['num_plantas'], (len(candidatos),))
+
+        if self.acoplamentos.custo_iluminacao_por_watt is not None:
+            s['custo_equip_iluminacao'] = potencia * self.acoplamentos.custo_iluminacao_por_watt
+        if self.acoplamentos.gramas_por_watt_max is not None:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                teto = np.where(plantas > 0, self.acoplamentos.gramas_por_watt_max * potencia / plantas, 0.0)
+            c['producao_por_planta_g'] = np.minimum(c['producao_por_planta_g'], teto)
+
+        resultados = SimuladorLote(s, c, grupos['market']).simular()
+        kwh = (potencia / 1000) * (c['horas_luz_veg'] * c['dias_vegetativo'] + c['horas_luz_flor'] * c['dias_floracao'])
+
+        r = self.restricoes
+        viavel = ~np.isnan(resultados[self.objetivo])
+        if r.orcamento_max is not None:
+            viavel &= resultados['custo_total_investimento'] <= r.orcamento_max
+        if r.kwh_max_ciclo is not None:
+            viavel &= kwh <= r.kwh_max_ciclo
+        if r.plantas_max is not None:
+            viavel &= plantas <= r.plantas_max
+        if r.plantas_por_m2_max is not None:
+            viavel &= plantas <= r.plantas_por_m2_max * np.broadcast_to(s['area_m2'], (len(candidatos),))
+
+        valor = resultados[self.objetivo] if self.maximizar else -resultados[self.objetivo]
+        resultados['pontuacao'] = np.where(viavel, valor, -np.inf)
+        resultados['viavel'] = viavel
+        resultados['kwh_ciclo'] = kwh
+        return {chave: np.broadcast_to(v, (len(candidatos),)) for chave, v in resultados.items()}
+
+    def _avaliar(self, candidatos: np.ndarray) -> Dict[str, np.ndarray]:
+        self.avaliacoes += len(candidatos)
+        if len(candidatos) <= LINHAS_POR_THREAD or self.workers == 1:
+            return self._avaliar_bloco(candidatos)
+        partes = np.array_split(candidatos, -(-len(candidatos) // LINHAS_POR_THREAD))
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            blocos = list(executor.map(self._avaliar_bloco, partes))
+        return {chave: np.concatenate([b[chave] for b in blocos]) for chave in blocos[0]}
+
+    # --- Busca grossa-para-fina ---
+
+    def _produto(self, eixos: Sequence[np.ndarray]) -> np.ndarray:
+        malha = np.meshgrid(*eixos, indexing='ij')
+        return np.stack([m.ravel() for m in malha], axis=1)
+
+    def otimizar(self, pontos_grade: int = 9, manter: int = 8, pontos_refino: int = 5,
+                 tamanho_ranking: int = 10, progresso: Optional[Callable[[float], None]] = None) -> Dict[str, Any]:
+        d = len(self.variaveis)
+        pontos_grade = max(2, min(pontos_grade, int(MAX_LINHAS_GRADE ** (1 / d))))
+        pontos_refino = max(2, min(pontos_refino, int((MAX_LINHAS_REFINO / max(manter, 1)) ** (1 / d))))
+        manter = max(1, min(manter, MAX_LINHAS_REFINO // pontos_refino ** d))
+        minimos = np.array([self.faixas[v][0] for v in self.variaveis], dtype=np.float64)
+        maximos = np.array([self.faixas[v][1] for v in self.variaveis], dtype=np.float64)
+        passos = np.array([self.faixas[v][2] or 0.0 for v in self.variaveis], dtype=np.float64)
+        # Campos contínuos param de refinar em 1/1000 da faixa
+        resolucao = np.where(passos > 0, passos, (maximos - minimos) / 1000)
+
+        candidatos = self._produto([_grade(minimos[j], maximos[j], passos[j], pontos_grade, minimos[j]) for j in range(d)])
+        espacamento = (maximos - minimos) / (pontos_grade - 1)
+        # Cada nível divide o espaçamento por 2 até a resolução; usado só para reportar o progresso
+        with np.errstate(divide='ignore', invalid='ignore'):
+            razao = np.where(resolucao > 0, espacamento / resolucao, 1.0)
+        num_niveis = 1 + int(np.ceil(np.log2(np.maximum(razao, 1.0))).max())
+        avaliados, resultados = [candidatos], [self._avaliar(candidatos)]
+        if progresso is not None:
+            progresso(1 / num_niveis)
+
+        while True:
+            # Poda: só os melhores candidatos viáveis avaliados até aqui são refinados
+            todos = np.concatenate(avaliados)
+            pontuacao = np.concatenate([r['pontuacao'] for r in resultados])
+            ordem = np.argsort(-pontuacao, kind='stable')
+            melhores = todos[ordem[np.isfinite(pontuacao[ordem])][:manter]]
+            if len(melhores) == 0 or np.all(espacamento <= resolucao):
+                break
+            espacamento = np.maximum(espacamento / 2, resolucao)
+            vizinhancas = []
+            for centro in melhores:
+                eixos = [_grade(max(minimos[j], centro[j] - espacamento[j] * (pontos_refino // 2)),
+                                min(maximos[j], centro[j] + espacamento[j] * (pontos_refino // 2)),
+                                passos[j], pontos_refino, minimos[j]) for j in range(d)]
+                vizinhancas.append(self._produto(eixos))
+            candidatos = np.unique(np.concatenate(vizinhancas), axis=0)
+            avaliados.append(candidatos)
+            resultados.append(self._avaliar(candidatos))
+            if progresso is not None:
+                progresso(min(len(avaliados) / num_niveis, 1.0))
+
+        todos = np.concatenate(avaliados)
+        metricas = {chave: np.concatenate([r[chave] for r in resultados]) for chave in resultados[0]}
+        todos, unicos = np.unique(todos, axis=0, return_index=True)
+        metricas = {chave: v[unicos] for chave, v in metricas.items()}
+
+        viaveis = np.flatnonzero(metricas['viavel'])
+        if viaveis.size == 0:
+            return {'objetivo': self.objetivo, 'melhor': None, 'ranking': [], 'pareto': [], 'avaliacoes': self.avaliacoes}
+        ordem = viaveis[np.argsort(-metricas['pontuacao'][viaveis], kind='stable')]
+
+        # Fronteira de Pareto (lucro x investimento) sobre todos os pontos viáveis avaliados
+        investimento = metricas['custo_total_investimento'][viaveis]
+        lucro = metricas['lucro_liquido_ciclo'][viaveis]
+        por_investimento = viaveis[np.lexsort((-lucro, investimento))]
+        lucros_ordenados = metricas['lucro_liquido_ciclo'][por_investimento]
+        melhor_anterior = np.concatenate(([-np.inf], np.maximum.accumulate(lucros_ordenados)[:-1]))
+        pareto = por_investimento[lucros_ordenados > melhor_anterior]
+
+        def ponto(i: int) -> Dict[str, Any]:
+            return {
+                'parametros': {nome: float(todos[i, j]) for j, nome in enumerate(self.variaveis)},
+                'metricas': {chave: float(metricas[chave][i]) for chave in metricas if chave not in ('pontuacao', 'viavel')},
+            }
+
+        return {
+            'objetivo': self.objetivo,
+            'melhor': ponto(ordem[0]),
+            'ranking': [ponto(i) for i in ordem[:tamanho_ranking]],
+            'pareto': [ponto(i) for i in pareto],
+            'avaliacoes': self.avaliacoes,
+        }
@@ -0,0 +1,252 @@
+"""Perfilamento sob demanda das requisições e jobs da API.
+
+Uma requisição é perfilada quando traz o cabeçalho `X-Profile: 1` ou o
+parâmetro `?profile=1`, ou, com `SIMULADOR_PERFIL=sempre`, por amostragem de
+uma fração (`SIMULADOR_PERFIL_TAXA`) de todas as requisições. Em qualquer
+caso vale um teto de perfis por minuto (`SIMULADOR_PERFIL_MAX_POR_MINUTO`),
+para que o modo possa ficar ligado em produção; `SIMULADOR_PERFIL=desligado`
+ignora os pedidos.
+
+Cada perfil gera dois artefatos em `SIMULADOR_PERFIL_DIR`: o `.pstats` do
+cProfile e um `.folded` com pilhas colapsadas (formato do flamegraph.pl e do
+speedscope), obtido por uma thread que amostra a pilha da thread perfilada.
+Só os `SIMULADOR_PERFIL_MAX_ARQUIVOS` perfis mais recentes são mantidos.
+Os workers de processo do Monte Carlo não entram no perfil.
+"""
+
+import cProfile
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+MODOS = ('desligado', 'sob_demanda', 'sempre')
+EXTENSOES = ('pstats', 'folded')
+_ID_VALIDO = re.compile(r'^[0-9a-f]{32}$')
+
+class LimitadorTaxa:
+    """Balde de fichas: no máximo `por_minuto` perfis, recarregados continuamente."""
+
+    def __init__(self, por_minuto: float):
+        self.capacidade = float(por_minuto)
+        self._fichas = self.capacidade
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def permitir(self) -> bool:
+        with self._lock:
+            agora = time.monotonic()
+            self._fichas = min(self.capacidade, self._fichas + (agora - self._ultimo) * self.capacidade / 60)
+            self._ultimo = agora
+            if self._fichas >= 1:
+                self._fichas -= 1
+                return True
+            return False
+
+class _Amostrador(threading.Thread):
+    """Amostra periodicamente a pilha de uma thread e conta as pilhas colapsadas."""
+
+    def __init__(self, id_thread: int, intervalo: float):
+        super().__init__(name='perfil-amostrador', daemon=True)
+        self.id_thread = id_thread
+        self.intervalo = intervalo
+        self.pilhas: Counter = Counter()
+        self._parar = threading.Event()
+
+    def run(self) -> None:
+        while not self._parar.wait(self.intervalo):
+            quadro = sys._current_frames().get(self.id_thread)
+            if quadro is None:
+                continue
+            pilha = []
+            while quadro is not None:
+                codigo = quadro.f_code
+                pilha.append(f'{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})')
+                quadro = quadro.f_back
+            self.pilhas[';'.join(reversed(pilha))] += 1
+
+    def parar(self) -> Counter:
+        self._parar.set()
+        self.join()
+        return self.pilhas
+
+class Perfil:
+    """Um perfil em andamento na thread atual; `encerrar()` grava os artefatos."""
+
+    def __init__(self, perfilador: 'Perfilador', descricao: str):
+        self.perfilador = perfilador
+        self.id = uuid.uuid4().hex
+        self.descricao = descricao
+        self._cprofile = cProfile.Profile()
+        self._amostrador = _Amostrador(threading.get_ident(), perfilador.intervalo_amostragem)
+        self._inicio = time.time()
+        self._encerrado = False
+
+    def iniciar(self) -> 'Perfil':
+        self._cprofile.enable()
+        self._amostrador.start()
+        return self
+
+    def encerrar(self) -> None:
+        if self._encerrado:
+            return
+        self._encerrado = True
+        self._cprofile.disable()
+        pilhas = self._amostrador.parar()
+        self.perfilador.gravar(self, pilhas)
+
+class Perfilador:
+    def __init__(self, modo: str = 'sob_demanda', taxa: float = 0.01, max_por_minuto: float = 10,
+                 diretorio: Optional[str] = None, max_arquivos: int = 50, intervalo_amostragem: float = 0.005):
+        if modo not in MODOS:
+            raise ValueError(f"Modo de perfilamento inválido: '{modo}'. Use um de {', '.join(MODOS)}.")
+        self.modo = modo
+        self.taxa = taxa
+        self.limitador = LimitadorTaxa(max_por_minuto)
+        self.diretorio = diretorio or os.path.join(tempfile.gettempdir(), 'simulador-perfis')
+        self.max_arquivos = max_arquivos
+        self.intervalo_amostragem = intervalo_amostragem
+        self._lock = threading.Lock()
+
+    def deve_perfilar(self, solicitado: bool) -> bool:
+        if self.modo == 'desligado':
+            return False
+        if not solicitado and not (self.modo == 'sempre' and random.random() < self.taxa):
+            return False
+        return self.limitador.permitir()
+
+    def iniciar(self, descricao: str) -> Optional[Perfil]:
+        """Começa um perfil na thread atual; None se outro perfilador já estiver ativo nela."""
+        try:
+            return Perfil(self, descricao).iniciar()
+        except ValueError:
+            return None
+
+    def envolver(self, funcao: Callable, descricao: str, perfil_id: Optional[str] = None) -> Callable:
+        """Versão de `funcao` que roda perfilada na thread em que for chamada (ex.: um worker de jobs)."""
+        def perfilada(*args, **kwargs):
+            perfil = Perfil(self, descricao)
+            if perfil_id is not None:
+                perfil.id = perfil_id
+            try:
+                perfil.iniciar()
+            except ValueError:
+                return funcao(*args, **kwargs)
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                perfil.encerrar()
+        return perfilada
+
+    # --- Artefatos ---
+
+    def caminho(self, perfil_id: str, extensao: str) -> Optional[str]:
+        if not _ID_VALIDO.match(perfil_id) or extensao not in EXTENSOES + ('json',):
+            return None
+        caminho = os.path.join(self.diretorio, f'{perfil_id}.{extensao}')
+        return caminho if os.path.exists(caminho) else None
+
+    def gravar(self, perfil: Perfil, pilhas: Counter) -> None:
+        os.makedirs(self.diretorio, exist_ok=True)
+        base = os.path.join(self.diretorio, perfil.id)
+        perfil._cprofile.dump_stats(base + '.pstats')
+        with open(base + '.folded', 'w', encoding='utf-8') as arquivo:
+            arquivo.writelines(f'{pilha} {contagem}\n' for pilha, contagem in pilhas.most_common())
+        metadados = {
+            'id': perfil.id,
+            'descricao': perfil.descricao,
+            'inicio': perfil._inicio,
+            'duracao': time.time() - perfil._inicio,
+            'amostras': sum(pilhas.values()),
+        }
+        with open(base + '.json', 'w', encoding='utf-8') as arquivo:
+            json.dump(metadados, arquivo, ensure_ascii=False)
+        self._podar()
+
+    def _podar(self) -> None:
+        with self._lock:
+            perfis = sorted((os.path.getmtime(os.path.join(self.diretorio, nome)), nome[:-5])
+                            for nome in os.listdir(self.diretorio) if nome.endswith('.json'))
+            for _, perfil_id in perfis[:max(len(perfis) - self.max_arquivos, 0)]:
+                for extensao in EXTENSOES + ('json',):
+                    try:
+                        os.remove(os.path.join(self.diretorio, f'{perfil_id}.{extensao}'))
+                    except FileNotFoundError:
+                        pass
+
+    def listar(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.diretorio):
+            return []
+        perfis = []
+        for nome in os.listdir(self.diretorio):
+            if nome.endswith('.json'):
+                try:
+                    with open(os.path.join(self.diretorio, nome), encoding='utf-8') as arquivo:
+                        perfis.append(json.load(arquivo))
+                except (OSError, ValueError):
+                    continue
+        return sorted(perfis, key=lambda p: p['inicio'], reverse=True)
+
+# --- INTEGRAÇÃO COM O FLASK ---
+
+def solicitado(request) -> bool:
+    """Cabeçalho `X-Profile` ou parâmetro `profile` com valor verdadeiro."""
+    valor = request.headers.get('X-Profile') or request.args.get('profile') or ''
+    return valor.lower() in ('1', 'true', 'sim', 'yes')
+
+def instrumentar(app, perfilador: Perfilador) -> None:
+    """Perfila as requisições escolhidas e expõe `/api/profiles` para listar e baixar os artefatos."""
+    from flask import g, jsonify, request, send_file
+
+    @app.route('/api/profiles', methods=['GET'])
+    def list_profiles():
+        return jsonify(perfilador.listar())
+
+    @app.route('/api/profiles/<perfil_id>.<extensao>', methods=['GET'])
+    def download_profile(perfil_id, extensao):
+        caminho = perfilador.caminho(perfil_id, extensao)
+        if caminho is None:
+            return jsonify({'error': 'Perfil não encontrado.'}), 404
+        return send_file(caminho, as_attachment=True, download_name=f'{perfil_id}.{extensao}',
+                         mimetype='application/octet-stream' if extensao == 'pstats' else 'text/plain')
+
+    if perfilador.modo == 'desligado':
+        return
+
+    @app.before_request
+    def _iniciar_perfil():
+        # Os próprios perfis e os jobs (perfilados no worker) ficam de fora
+        if request.path.startswith('/api/profiles') or request.path == '/api/jobs':
+            return
+        if perfilador.deve_perfilar(solicitado(request)):
+            g.perfil = perfilador.iniciar(f'{request.method} {request.path}')
+
+    @app.after_request
+    def _encerrar_perfil(resposta):
+        perfil = g.pop('perfil', None)
+        if perfil is None:
+            return resposta
+        resposta.headers['X-Profile-Id'] = perfil.id
+        if resposta.content_length is None:
+            # Em streaming o trabalho acontece enquanto o corpo é gerado
+            resposta.call_on_close(perfil.encerrar)
+        else:
+            perfil.encerrar()
+        return resposta
+
+def perfilador_do_ambiente() -> Perfilador:
+    """Cria o perfilador a partir das variáveis SIMULADOR_PERFIL*."""
+    return Perfilador(
+        modo=os.environ.get('SIMULADOR_PERFIL', 'sob_demanda'),
+        taxa=float(os.environ.get('SIMULADOR_PERFIL_TAXA', 0.01)),
+        max_por_minuto=float(os.environ.get('SIMULADOR_PERFIL_MAX_POR_MINUTO', 10)),
+        diretorio=os.environ.get('SIMULADOR_PERFIL_DIR') or None,
+        max_arquivos=int(os.environ.get('SIMULADOR_PERFIL_MAX_ARQUIVOS', 50)),
+    )
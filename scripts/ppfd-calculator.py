@@ -1,48 +1,18 @@
 import ipywidgets as widgets
 from IPython.display import display, clear_output
 import math
+import os
+import sys
 
-# --- BASE DE DADOS EXTRAÍDA DAS SUAS FONTES ---
-
-# Dicionário com dados de cada fase de cultivo
-# Usando a média do PPFD para os cálculos, mas exibindo a faixa para o usuário.
-fases_data = {
-    "Mudas / Clones": {
-        "ppfd_min": 200,
-        "ppfd_max": 400,
-        "fotoperiodo_sugerido": 18
-    },
-    "Vegetativo": {
-        "ppfd_min": 400,
-        "ppfd_max": 600,
-        "fotoperiodo_sugerido": 18
-    },
-    "Floração": {
-        "ppfd_min": 600,
-        "ppfd_max": 1000,
-        "fotoperiodo_sugerido": 12
-    }
-}
-
-# Dicionário com a eficiência (Eficácia de Fótons Fotossintéticos) em µmol/J
-# Baseado nos valores: HPS (~1.7), LEDs modernos (~2.8)
-eficiencia_data = {
-    "LED de Alta Eficiência (Quantum Board/Bar)": 2.7,
-    "LED Padrão / COB / Painel Comum": 1.9,
-    "Lâmpada HPS (Sódio de Alta Pressão)": 1.7
-}
-
-# Tabela de altura recomendada (cm) baseada na potência (W) e na fase
-# Estruturada para que possamos encontrar a potência e depois a altura
-altura_por_potencia_data = {
-    # Potência (W): {Fase: (Altura Min, Altura Max)}
-    100: {"Mudas / Clones": (40, 60), "Vegetativo": (20, 40), "Floração": (20, 30)},
-    200: {"Mudas / Clones": (50, 70), "Vegetativo": (30, 50), "Floração": (25, 40)},
-    400: {"Mudas / Clones": (70, 90), "Vegetativo": (50, 70), "Floração": (35, 55)},
-    600: {"Mudas / Clones": (95, 105), "Vegetativo": (75, 95), "Floração": (45, 75)},
-    800: {"Mudas / Clones": (105, 120), "Vegetativo": (80, 105), "Floração": (50, 85)},
-    1000: {"Mudas / Clones": (115, 130), "Vegetativo": (90, 115), "Floração": (55, 90)}
-}
+# Garante que o núcleo do simulador seja importável mesmo quando o script é executado de outro diretório
+# (colado numa célula de notebook não há __file__: vale o diretório atual)
+if '__file__' in globals():
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# --- BASE DE DADOS E CÁLCULOS ---
+# As tabelas (fases, eficiências, alturas por potência) e as fórmulas ficam no motor sem interface
+from iluminacao import FASES as fases_data, EFICIENCIAS as eficiencia_data, ALTURA_POR_POTENCIA as altura_por_potencia_data
+from iluminacao import calcular_iluminacao as calcular_iluminacao_motor, mapa_ppfd, MAX_CELULAS_MAPA, MAX_AVALIACOES_MAPA
 
 
 # --- INTERFACE DA CALCULADORA ---
@@ -57,6 +27,12 @@ fase_widget = widgets.Dropdown(options=list(fases_data.keys()), value='Vegetativ
 tipo_luz_widget = widgets.Dropdown(options=list(eficiencia_data.keys()), value='LED de Alta Eficiência (Quantum Board/Bar)', description='Tipo de Iluminação:', style=style)
 fotoperiodo_widget = widgets.IntSlider(value=18, min=1, max=24, step=1, description='Horas de Luz por Dia:', style=style, continuous_update=False)
 
+# Modo mapa: distribuição espacial da PPFD no dossel
+mapa_widget = widgets.Checkbox(value=False, description='Calcular mapa de distribuição da luz', style=style)
+altura_widget = widgets.IntSlider(value=45, min=10, max=150, step=5, description='Altura da Luminária (cm):', style=style, continuous_update=False)
+luminarias_widget = widgets.BoundedIntText(value=1, min=1, max=36, description='Número de Luminárias:', style=style)
+refletancia_widget = widgets.FloatSlider(value=0.9, min=0.0, max=0.95, step=0.05, description='Refletância das Paredes:', style=style, continuous_update=False)
+
 # Botão e Output
 botao_calcular = widgets.Button(description="Calcular Iluminação Ideal", button_style='success')
 out = widgets.Output()
@@ -90,42 +66,22 @@ def calcular_iluminacao(b):
             return
 
         # --- CÁLCULOS PRINCIPAIS ---
-        area_m2 = largura * profundidade
-
-        # Pega os dados da fase selecionada
-        dados_fase = fases_data[fase]
-        ppfd_min = dados_fase['ppfd_min']
-        ppfd_max = dados_fase['ppfd_max']
-        ppfd_medio_alvo = (ppfd_min + ppfd_max) / 2
-
-        # Pega a eficiência do tipo de luz
-        eficiencia = eficiencia_data[tipo_luz]
-
-        # 1. PPF (Fluxo de Fótons Fotossintéticos) Total Necessário
-        # PPF (µmol/s) = PPFD Médio (µmol/s/m²) * Área (m²)
-        ppf_total_necessario = ppfd_medio_alvo * area_m2
-
-        # 2. Potência Elétrica Estimada (Watts Reais)
-        # Potência (W) = PPF Total (µmol/s) / Eficiência (µmol/J)
-        # 1 Joule (J) = 1 Watt-segundo (W*s), então µmol/J é a métrica correta.
-        potencia_watts = ppf_total_necessario / eficiencia
-
-        # 3. DLI (Integral de Luz Diária)
-        # DLI (mol/m²/dia) = (PPFD * horas_de_luz * 3600 segundos/hora) / 1,000,000 µmol/mol
-        dli = (ppfd_medio_alvo * fotoperiodo * 3600) / 1_000_000
-
-        # 4. Determinar a Altura Recomendada
+        r = calcular_iluminacao_motor(largura, profundidade, fase, tipo_luz, fotoperiodo)
+        area_m2 = r['area_m2']
+        ppfd_min = fases_data[fase]['ppfd_min']
+        ppfd_max = fases_data[fase]['ppfd_max']
+        ppfd_medio_alvo = r['ppfd_medio_alvo']
+        eficiencia = r['eficiencia']
+        ppf_total_necessario = r['ppf_total_necessario']
+        potencia_watts = r['potencia_watts']
+        dli = r['dli']
+
+        # Altura Recomendada (primeira linha da tabela com potência >= a estimada)
         potencias_disponiveis = sorted(altura_por_potencia_data.keys())
-        potencia_adequada = 0
-        for p in potencias_disponiveis:
-            if p >= potencia_watts:
-                potencia_adequada = p
-                break
-
+        potencia_adequada = int(r['potencia_tabela'])
         altura_str = "Não encontrado na tabela (potência muito alta ou baixa)."
         if potencia_adequada > 0:
-            alturas = altura_por_potencia_data[potencia_adequada][fase]
-            altura_str = f"{alturas[0]} a {alturas[1]} cm do topo das plantas"
+            altura_str = f"{r['altura_min_cm']:.0f} a {r['altura_max_cm']:.0f} cm do topo das plantas"
         elif potencia_watts > max(potencias_disponiveis):
              altura_str = f"Acima de {max(potencias_disponiveis)}W. Considere usar múltiplas luminárias."
 
@@ -149,6 +105,20 @@ def calcular_iluminacao(b):
         print(f"  - Para uma luminária de ~{potencia_adequada if potencia_adequada > 0 else int(math.ceil(potencia_watts/100.0))*100}W, a altura ideal é:")
         print(f"  - 👉 {altura_str}")
 
+        if mapa_widget.value:
+            # Grade de 1 cm, engrossada em tendas muito grandes (ou com muitas luminárias refletidas)
+            # para respeitar os limites de células e de avaliações do mapa
+            imagens = luminarias_widget.value * (9 if refletancia_widget.value else 1)
+            celulas = min(MAX_CELULAS_MAPA, MAX_AVALIACOES_MAPA // imagens)
+            resolucao = max(0.01, math.sqrt(largura * profundidade / celulas) * 1.01)
+            m = mapa_ppfd(largura, profundidade, fase, tipo_luz, altura_widget.value,
+                          luminarias=luminarias_widget.value, refletancia=refletancia_widget.value, resolucao_m=resolucao)
+            print(f"\n🗺️ MAPA DE DISTRIBUIÇÃO (grade de {resolucao * 100:.1f} cm):")
+            print(f"  - {luminarias_widget.value} luminária(s) de ~{m['potencia_por_luminaria']:.0f}W a {altura_widget.value} cm, paredes com {refletancia_widget.value:.0%} de refletância")
+            print(f"  - PPFD mínima / média / máxima: {m['ppfd_minimo']:.0f} / {m['ppfd_medio']:.0f} / {m['ppfd_maximo']:.0f} µmol/m²/s")
+            print(f"  - Uniformidade (mín/média): {m['uniformidade']:.2f}")
+            print(f"  - Área com PPFD ≥ {m['ppfd_min_fase']:.0f}: {m['area_atende_m2']:.2f} m² ({m['fracao_atende']:.0%} da tenda)")
+
         print("\n" + "="*50)
         print("⚠️ AVISO IMPORTANTE:")
         print("  - Este é um cálculo de referência. A qualidade da luminária, a refletividade da tenda e a genética da planta influenciam no resultado real.")
@@ -158,7 +128,8 @@ def calcular_iluminacao(b):
 botao_calcular.on_click(calcular_iluminacao)
 
 # Organiza os widgets na tela
-inputs = widgets.VBox([largura_widget, profundidade_widget, fase_widget, tipo_luz_widget, fotoperiodo_widget])
+inputs = widgets.VBox([largura_widget, profundidade_widget, fase_widget, tipo_luz_widget, fotoperiodo_widget,
+                       mapa_widget, altura_widget, luminarias_widget, refletancia_widget])
 app = widgets.VBox([inputs, botao_calcular, out])
 
 # Exibe a aplicação
@@ -0,0 +1,197 @@
+"""Recomendação de strains parecidas ("strains como esta") por vizinhos mais próximos.
+
+Cada strain vira um vetor de características em float32:
+
+- tags de tipo, efeitos e sabores (as matrizes do `IndiceStrains`), com peso
+  por faceta e IDF, para que um sabor raro pese mais que "Earthy";
+- opcionalmente, TF-IDF da descrição, limitado aos `max_termos` termos mais
+  frequentes (entre os que aparecem em ao menos 2 e em no máximo metade das
+  descrições) e reduzido a `dimensoes_descricao` dimensões por SVD
+  aleatorizada (análise semântica latente), para que a matriz do catálogo
+  fique com poucas centenas de colunas.
+
+Cada bloco é normalizado e o vetor final também, de modo que a similaridade
+é o cosseno e um produto de matrizes compara uma consulta (ou um lote delas)
+com o catálogo inteiro. As listas de vizinhos de todas as strains são
+calculadas uma vez, em blocos de linhas, e ficam guardadas junto do índice:
+"parecidas com X" é uma consulta a essa tabela.
+"""
+
+import math
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from catalogo_strains import CatalogoStrains, IndiceStrains, tokenizar
+
+# Peso de cada bloco de características no vetor final
+PESOS_PADRAO = {'type': 0.5, 'effects': 1.0, 'flavors': 1.0, 'description': 0.75}
+# Vizinhos guardados por strain e linhas por bloco no cálculo de todos os pares
+VIZINHOS_GUARDADOS = 50
+TAMANHO_BLOCO = 512
+
+def _normalizar_linhas(matriz: np.ndarray) -> np.ndarray:
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    return np.divide(matriz, normas, out=np.zeros_like(matriz), where=normas > 0)
+
+def _idf(matriz: np.ndarray) -> np.ndarray:
+    """IDF suavizado de cada coluna de uma matriz documento × termo (presença)."""
+    documentos = np.count_nonzero(matriz, axis=0)
+    return (np.log((1 + matriz.shape[0]) / (1 + documentos)) + 1).astype(np.float32)
+
+def reduzir_svd(matriz: np.ndarray, dimensoes: int, semente: int = 0, iteracoes: int = 2) -> np.ndarray:
+    """Projeção das linhas nas `dimensoes` primeiras componentes singulares (SVD aleatorizada de Halko et al.).
+
+    A semente fixa torna o resultado reprodutível entre workers.
+    """
+    if dimensoes >= min(matriz.shape):
+        return matriz
+    rng = np.random.default_rng(semente)
+    base = matriz @ rng.standard_normal((matriz.shape[1], dimensoes + 10)).astype(matriz.dtype)
+    base, _ = np.linalg.qr(base)
+    for _ in range(iteracoes):
+        # Iterações de potência separam melhor as componentes quando o espectro decai devagar
+        base, _ = np.linalg.qr(matriz @ (matriz.T @ base))
+    u, valores, _ = np.linalg.svd(base.T @ matriz, full_matrices=False)
+    return (base @ u[:, :dimensoes]) * valores[:dimensoes]
+
+def tfidf_descricoes(descricoes: Sequence[str], max_termos: int = 2048) -> Tuple[np.ndarray, List[str]]:
+    """Matriz TF-IDF (documentos × termos, float32) e o vocabulário usado."""
+    tokens = [tokenizar(texto) for texto in descricoes]
+    frequencia = Counter(termo for lista in tokens for termo in set(lista))
+    limite = len(descricoes) / 2
+    candidatos = [(f, t) for t, f in frequencia.items() if 2 <= f <= limite]
+    vocabulario = [t for _, t in sorted(candidatos, key=lambda par: (-par[0], par[1]))[:max_termos]]
+    colunas = {termo: j for j, termo in enumerate(vocabulario)}
+    matriz = np.zeros((len(descricoes), len(vocabulario)), dtype=np.float32)
+    for i, lista in enumerate(tokens):
+        for termo, contagem in Counter(t for t in lista if t in colunas).items():
+            # TF sublinear: repetir um termo muitas vezes conta cada vez menos
+            matriz[i, colunas[termo]] = 1 + math.log(contagem)
+    return matriz * _idf(matriz), vocabulario
+
+class RecomendadorStrains:
+    """Vetores de características e vizinhos pré-calculados de um `IndiceStrains`."""
+
+    def __init__(self, indice: IndiceStrains, usar_descricao: bool = True, pesos: Optional[Dict[str, float]] = None,
+                 max_termos: int = 2048, dimensoes_descricao: int = 128, vizinhos: int = VIZINHOS_GUARDADOS):
+        self.indice = indice
+        self.pesos = {**PESOS_PADRAO, **(pesos or {})}
+        self._idf_tags = {}
+        blocos = []
+        for faceta in ('type', 'effects', 'flavors'):
+            presenca = indice.matrizes[faceta].T.astype(np.float32)
+            self._idf_tags[faceta] = _idf(presenca)
+            blocos.append(self.pesos[faceta] * _normalizar_linhas(presenca * self._idf_tags[faceta]))
+        self.vocabulario: List[str] = []
+        if usar_descricao and self.pesos['description'] > 0:
+            tfidf, self.vocabulario = tfidf_descricoes([r['description'] for r in indice.registros], max_termos)
+            reduzida = reduzir_svd(_normalizar_linhas(tfidf), dimensoes_descricao)
+            blocos.append(self.pesos['description'] * _normalizar_linhas(reduzida))
+        self.caracteristicas = np.ascontiguousarray(_normalizar_linhas(np.hstack(blocos)))
+        self.vizinhos, self.similaridades = self._todos_os_pares(min(vizinhos, max(indice.tamanho - 1, 0)))
+
+    def _todos_os_pares(self, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        n = self.indice.tamanho
+        vizinhos = np.empty((n, k), dtype=np.int32)
+        similaridades = np.empty((n, k), dtype=np.float32)
+        for inicio in range(0, n, TAMANHO_BLOCO):
+            linhas = np.arange(inicio, min(inicio + TAMANHO_BLOCO, n))
+            pontos = self.caracteristicas[linhas] @ self.caracteristicas.T
+            # A própria strain nunca é vizinha dela mesma
+            pontos[np.arange(len(linhas)), linhas] = -np.inf
+            vizinhos[linhas], similaridades[linhas] = self._melhores(pontos, k)
+        return vizinhos, similaridades
+
+    @staticmethod
+    def _melhores(pontos: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Os k maiores de cada linha, em ordem decrescente (empates pela ordem do catálogo)."""
+        if k <= 0:
+            return np.empty((len(pontos), 0), dtype=np.int32), np.empty((len(pontos), 0), dtype=np.float32)
+        candidatos = np.argpartition(-pontos, k - 1, axis=1)[:, :k] if k < pontos.shape[1] else np.tile(np.arange(pontos.shape[1]), (len(pontos), 1))
+        valores = np.take_along_axis(pontos, candidatos, axis=1)
+        ordem = np.lexsort((candidatos, -valores), axis=1)
+        return np.take_along_axis(candidatos, ordem, axis=1), np.take_along_axis(valores, ordem, axis=1)
+
+    def _posicao(self, nome: str) -> int:
+        posicao = self.indice.por_nome.get(nome.strip().lower())
+        if posicao is None:
+            raise KeyError(nome)
+        return posicao
+
+    def vetor_tags(self, tipo: Optional[str] = None, efeitos: Sequence[str] = (), sabores: Sequence[str] = ()) -> np.ndarray:
+        """Vetor de consulta a partir de tags soltas (sem descrição); tags desconhecidas são ignoradas."""
+        blocos = []
+        for faceta, tags in (('type', [tipo] if tipo else []), ('effects', efeitos), ('flavors', sabores)):
+            bloco = np.zeros(len(self.indice.tags[faceta]), dtype=np.float32)
+            for tag in tags:
+                linha = self.indice.linhas[faceta].get(tag.strip().lower())
+                if linha is not None:
+                    bloco[linha] = self._idf_tags[faceta][linha]
+            norma = np.linalg.norm(bloco)
+            blocos.append(self.pesos[faceta] * (bloco / norma if norma > 0 else bloco))
+        blocos.append(np.zeros(self.caracteristicas.shape[1] - sum(len(b) for b in blocos), dtype=np.float32))
+        vetor = np.concatenate(blocos)
+        norma = np.linalg.norm(vetor)
+        return vetor / norma if norma > 0 else vetor
+
+    def consultar_lote(self, consultas: np.ndarray, k: int = 10, mascara: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k do catálogo para cada linha de `consultas` (vetores normalizados), com um produto de matrizes.
+
+        `mascara` restringe os candidatos (ex.: o resultado de `IndiceStrains.filtrar`).
+        """
+        pontos = np.atleast_2d(consultas).astype(np.float32, copy=False) @ self.caracteristicas.T
+        if mascara is not None:
+            pontos[:, ~mascara] = -np.inf
+        k = min(k, pontos.shape[1] if mascara is None else int(np.count_nonzero(mascara)))
+        return self._melhores(pontos, k)
+
+    def semelhantes(self, nome: str, k: int = 10, mascara: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """As k strains mais parecidas com `nome`; sem filtro vêm da tabela pré-calculada."""
+        posicao = self._posicao(nome)
+        if mascara is None and k <= self.vizinhos.shape[1]:
+            ids, valores = self.vizinhos[posicao, :k], self.similaridades[posicao, :k]
+        else:
+            restricao = np.ones(self.indice.tamanho, dtype=bool) if mascara is None else mascara.copy()
+            restricao[posicao] = False
+            ids, valores = (linha[0] for linha in self.consultar_lote(self.caracteristicas[posicao], k, restricao))
+        return self._itens(ids, valores)
+
+    def semelhantes_lote(self, nomes: Sequence[str], k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Vizinhos (posições no índice) e similaridades de várias strains de uma vez."""
+        posicoes = np.array([self._posicao(nome) for nome in nomes], dtype=np.intp)
+        if k <= self.vizinhos.shape[1]:
+            return self.vizinhos[posicoes, :k], self.similaridades[posicoes, :k]
+        pontos = self.caracteristicas[posicoes] @ self.caracteristicas.T
+        pontos[np.arange(len(posicoes)), posicoes] = -np.inf
+        return self._melhores(pontos, min(k, self.indice.tamanho - 1))
+
+    def _itens(self, ids, valores) -> List[Dict[str, Any]]:
+        registros = self.indice.registros
+        return [{**registros[i], 'similarity': round(float(v), 6)} for i, v in zip(np.asarray(ids).tolist(), np.asarray(valores).tolist())]
+
+    def por_tags(self, tipo: Optional[str] = None, efeitos: Sequence[str] = (), sabores: Sequence[str] = (),
+                 k: int = 10, mascara: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        ids, valores = self.consultar_lote(self.vetor_tags(tipo, efeitos, sabores), k, mascara)
+        return self._itens(ids[0], valores[0])
+
+class RecomendadorCatalogo:
+    """Mantém um `RecomendadorStrains` do índice atual do catálogo, recriado quando o CSV muda."""
+
+    def __init__(self, catalogo: CatalogoStrains, **opcoes):
+        self.catalogo = catalogo
+        self.opcoes = opcoes
+        self._atual: Optional[RecomendadorStrains] = None
+        self._lock = threading.Lock()
+
+    def recomendador(self) -> RecomendadorStrains:
+        indice = self.catalogo.indice()
+        atual = self._atual
+        if atual is None or atual.indice is not indice:
+            with self._lock:
+                if self._atual is None or self._atual.indice is not indice:
+                    self._atual = RecomendadorStrains(indice, **self.opcoes)
+                atual = self._atual
+        return atual
@@ -0,0 +1,287 @@
+"""Relatório de viabilidade renderizado no servidor (PNG ou SVG).
+
+É o painel dos dashboards e de `exemplo_analise()` — métricas de negócio e de
+eficiência, pizza dos custos operacionais, linha do tempo do ciclo e barras de
+investimento × custo operacional — desenhado com o backend Agg do matplotlib,
+sem pyplot e sem interface.
+
+As imagens são endereçadas pelo conteúdo: a chave é o hash dos parâmetros
+normalizados (`chave_canonica`, que já inclui a impressão do motor), do
+formato, do DPI e da impressão deste módulo. Ela serve de ETag e de nome no
+cache, que fica em memória (LRU limitado em bytes) e, opcionalmente, num
+diretório compartilhado entre workers.
+
+A renderização roda num pool de processos de tamanho fixo, com um limite de
+pedidos pendentes: desenhar um relatório leva centenas de milissegundos de CPU
+e, fora do processo da API, não disputa o GIL com as rotas de cálculo. Pedidos
+iguais em andamento são atendidos por uma única renderização.
+"""
+
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict
+from typing import Any, Dict, Optional, Tuple
+
+from cache_resultados import chave_canonica
+from simulador_cultivo import SetupInvestimento, ParametrosCiclo, CustosMercado, SimuladorCultivoCompleto
+
+FORMATOS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+DPI_PADRAO = 100
+DPI_MINIMO, DPI_MAXIMO = 50, 300
+# Espera máxima (s) por uma renderização antes de desistir da requisição
+TEMPO_LIMITE = 30.0
+
+def _impressao_relatorio() -> str:
+    with open(__file__, 'rb') as arquivo:
+        return hashlib.sha256(arquivo.read()).hexdigest()[:16]
+
+IMPRESSAO_RELATORIO = _impressao_relatorio()
+
+def chave_relatorio(setup: SetupInvestimento, ciclo: ParametrosCiclo, mercado: CustosMercado,
+                    formato: str = 'png', dpi: int = DPI_PADRAO) -> str:
+    """Endereço da imagem: muda com os parâmetros, o motor, o formato, o DPI ou o desenho do relatório."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: '{formato}'. Use um de {', '.join(FORMATOS)}.")
+    if not DPI_MINIMO <= dpi <= DPI_MAXIMO:
+        raise ValueError(f"O DPI deve estar entre {DPI_MINIMO} e {DPI_MAXIMO}.")
+    # SVG é vetorial: o DPI não muda o arquivo
+    texto = f"{chave_canonica(setup, ciclo, mercado)}:{IMPRESSAO_RELATORIO}:{formato}:{dpi if formato == 'png' else 0}"
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+# --- DESENHO ---
+
+def desenhar_relatorio(setup: SetupInvestimento, ciclo: ParametrosCiclo, mercado: CustosMercado):
+    """Figura do relatório (matplotlib.figure.Figure, sem pyplot)."""
+    from matplotlib.figure import Figure
+
+    simulador = SimuladorCultivoCompleto(setup, ciclo, mercado)
+    resultados = simulador.simular()
+    duracao_total = simulador.get_duracao_total_ciclo()
+
+    fig = Figure(figsize=(18, 11))
+    grade = fig.add_gridspec(2, 3)
+    fig.suptitle('Análise Completa de Viabilidade do Cultivo Indoor', fontsize=18, weight='bold')
+
+    # --- KPIs de Negócio ---
+    ax = fig.add_subplot(grade[0, 0])
+    ax.text(0.5, 0.85, f"R$ {resultados['Lucro Líquido p/ Ciclo (R$)']:.2f}", fontsize=22, weight='bold', ha='center', color='green')
+    ax.text(0.5, 0.78, "Lucro Líquido por Ciclo", fontsize=12, ha='center')
+    ax.text(0.5, 0.55, f"{resultados['Período de Payback (ciclos)']:.1f} ciclos", fontsize=16, ha='center')
+    ax.text(0.5, 0.48, "Payback do Investimento", fontsize=12, ha='center')
+    ax.text(0.5, 0.25, f"{resultados['ROI sobre Investimento (1º Ano %)']:.1f} %", fontsize=16, ha='center', color='blue')
+    ax.text(0.5, 0.18, "ROI Estimado (1º Ano)", fontsize=12, ha='center')
+    ax.set_title('Principais Métricas de Negócio', fontsize=14)
+    ax.axis('off')
+
+    # --- KPIs de Eficiência ---
+    ax = fig.add_subplot(grade[0, 1])
+    ax.text(0.5, 0.85, f"{resultados['Gramas por Watt (g/W)']:.2f} g/W", fontsize=18, weight='bold', ha='center')
+    ax.text(0.5, 0.78, "Eficiência da Iluminação", fontsize=12, ha='center')
+    ax.text(0.5, 0.55, f"R$ {resultados['Custo por Grama (R$/g)']:.2f} /g", fontsize=18, weight='bold', ha='center', color='red')
+    ax.text(0.5, 0.48, "Custo de Produção por Grama", fontsize=12, ha='center')
+    ax.text(0.5, 0.25, f"{resultados['Gramas por m² (g/m²)']:.0f} g/m²", fontsize=18, weight='bold', ha='center')
+    ax.text(0.5, 0.18, "Produtividade por Área", fontsize=12, ha='center')
+    ax.set_title('Métricas de Eficiência Operacional', fontsize=14)
+    ax.axis('off')
+
+    # --- Custos Operacionais ---
+    ax = fig.add_subplot(grade[0, 2])
+    custos_op = {k: v for k, v in resultados['detalhe_custos_operacionais'].items() if v > 0}
+    if custos_op:
+        ax.pie(custos_op.values(), labels=custos_op.keys(), autopct='%1.1f%%', startangle=90)
+    ax.set_title('Distribuição dos Custos Operacionais', fontsize=14)
+
+    # --- Linha do Tempo do Ciclo ---
+    ax = fig.add_subplot(grade[1, :2])
+    inicio = [0, ciclo.dias_vegetativo, ciclo.dias_vegetativo + ciclo.dias_floracao]
+    duracao = [ciclo.dias_vegetativo, ciclo.dias_floracao, ciclo.dias_secagem_cura]
+    ax.barh(['Vegetativo', 'Floração', 'Secagem/Cura'], duracao, left=inicio, color=['#4CAF50', '#FFC107', '#795548'])
+    ax.set_title(f'Linha do Tempo do Ciclo ({duracao_total} dias)', fontsize=14)
+    ax.set_xlabel('Dias')
+    ax.grid(axis='x', linestyle=':', alpha=0.7)
+    ax.invert_yaxis()
+
+    # --- Investimento vs. Custo Operacional ---
+    ax = fig.add_subplot(grade[1, 2])
+    barras = ax.bar(['Investimento Inicial', 'Custo por 1 Ciclo'],
+                    [resultados['Custo Total Investimento (R$)'], resultados['Custo Operacional p/ Ciclo (R$)']],
+                    color=['#03A9F4', '#F44336'])
+    ax.set_title('Estrutura de Custos', fontsize=14)
+    ax.set_ylabel('Valor (R$)')
+    ax.bar_label(barras, fmt='R$ %.2f')
+
+    fig.tight_layout(rect=[0, 0, 1, 0.96])
+    return fig
+
+def renderizar_relatorio(setup: Dict[str, float], ciclo: Dict[str, float], mercado: Dict[str, float],
+                         formato: str = 'png', dpi: int = DPI_PADRAO) -> bytes:
+    """Bytes da imagem. Recebe dicts para poder rodar num processo do pool."""
+    from matplotlib import rc_context
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = desenhar_relatorio(SetupInvestimento(**setup), ParametrosCiclo(**ciclo), CustosMercado(**mercado))
+    FigureCanvasAgg(fig)
+    buffer = io.BytesIO()
+    # Sem data nem ids aleatórios: os mesmos parâmetros geram os mesmos bytes em qualquer worker
+    with rc_context({'svg.hashsalt': IMPRESSAO_RELATORIO}):
+        fig.savefig(buffer, format=formato, dpi=dpi, metadata={'Date': None} if formato == 'svg' else {'Software': None})
+    return buffer.getvalue()
+
+def _preparar_worker() -> None:
+    # Carrega o matplotlib uma vez por processo, antes do primeiro pedido
+    import matplotlib.backends.backend_agg  # noqa: F401
+    import matplotlib.figure  # noqa: F401
+
+# --- CACHE E POOL ---
+
+class FilaCheia(Exception):
+    """Todos os workers ocupados e a fila de pedidos pendentes no limite."""
+
+class RenderizadorRelatorios:
+    """Renderiza relatórios num pool limitado e guarda as imagens pela chave de conteúdo.
+
+    Com `workers=0` renderiza na própria thread (útil em testes e benchmarks).
+    """
+
+    def __init__(self, workers: int = 2, max_pendentes: int = 16, capacidade_bytes: int = 64 << 20,
+                 diretorio: Optional[str] = None, capacidade_diretorio: int = 512 << 20):
+        self.workers = workers
+        self.max_pendentes = max_pendentes
+        self.capacidade_bytes = capacidade_bytes
+        self.diretorio = diretorio
+        self.capacidade_diretorio = capacidade_diretorio
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        self._imagens: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._bytes = 0
+        self._em_andamento: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.acertos = 0
+        self.renderizacoes = 0
+        self.recusados = 0
+
+    def _caminho(self, chave: str) -> str:
+        return os.path.join(self.diretorio, chave)
+
+    def obter(self, chave: str) -> Optional[bytes]:
+        """Imagem já renderizada, da memória ou do diretório compartilhado."""
+        with self._lock:
+            imagem = self._imagens.get(chave)
+            if imagem is not None:
+                self._imagens.move_to_end(chave)
+                self.acertos += 1
+                return imagem
+        if self.diretorio:
+            try:
+                with open(self._caminho(chave), 'rb') as arquivo:
+                    imagem = arquivo.read()
+            except FileNotFoundError:
+                return None
+            with self._lock:
+                self._inserir_memoria(chave, imagem)
+                self.acertos += 1
+            return imagem
+        return None
+
+    def _inserir_memoria(self, chave: str, imagem: bytes) -> None:
+        if chave in self._imagens:
+            return
+        self._imagens[chave] = imagem
+        self._bytes += len(imagem)
+        while self._bytes > self.capacidade_bytes and len(self._imagens) > 1:
+            _, antiga = self._imagens.popitem(last=False)
+            self._bytes -= len(antiga)
+
+    def _guardar_disco(self, chave: str, imagem: bytes) -> None:
+        temporario = f"{self._caminho(chave)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporario, 'wb') as arquivo:
+            arquivo.write(imagem)
+        # Troca atômica: outro worker nunca lê um arquivo pela metade
+        os.replace(temporario, self._caminho(chave))
+        # Poda os mais antigos quando o diretório passa da capacidade
+        arquivos = []
+        for entrada in os.scandir(self.diretorio):
+            if entrada.is_file() and not entrada.name.endswith('.tmp'):
+                estado = entrada.stat()
+                arquivos.append((estado.st_mtime, estado.st_size, entrada.path))
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for _, tamanho, caminho in sorted(arquivos):
+            if total <= self.capacidade_diretorio:
+                break
+            try:
+                os.remove(caminho)
+            except FileNotFoundError:
+                pass
+            total -= tamanho
+
+    def _concluir(self, chave: str, futuro: Future) -> None:
+        with self._lock:
+            self._em_andamento.pop(chave, None)
+        if futuro.cancelled() or futuro.exception() is not None:
+            return
+        imagem = futuro.result()
+        with self._lock:
+            self._inserir_memoria(chave, imagem)
+            self.renderizacoes += 1
+        if self.diretorio:
+            self._guardar_disco(chave, imagem)
+
+    def renderizar(self, setup: SetupInvestimento, ciclo: ParametrosCiclo, mercado: CustosMercado,
+                   formato: str = 'png', dpi: int = DPI_PADRAO, tempo_limite: float = TEMPO_LIMITE) -> Tuple[str, bytes]:
+        """(chave, imagem) do relatório; levanta `FilaCheia` se o pool estiver saturado."""
+        chave = chave_relatorio(setup, ciclo, mercado, formato, dpi)
+        imagem = self.obter(chave)
+        if imagem is not None:
+            return chave, imagem
+        argumentos = (asdict(setup), asdict(ciclo), asdict(mercado), formato, dpi)
+        if self.workers <= 0:
+            imagem = renderizar_relatorio(*argumentos)
+            futuro = Future()
+            futuro.set_result(imagem)
+            self._concluir(chave, futuro)
+            return chave, imagem
+        with self._lock:
+            futuro = self._em_andamento.get(chave)
+            novo = futuro is None
+            if novo:
+                if len(self._em_andamento) >= self.max_pendentes:
+                    self.recusados += 1
+                    raise FilaCheia()
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_preparar_worker)
+                futuro = self._pool.submit(renderizar_relatorio, *argumentos)
+                self._em_andamento[chave] = futuro
+        if novo:
+            # Fora do lock: se o futuro já terminou, o callback roda aqui mesmo e `_concluir` pega o lock
+            futuro.add_done_callback(lambda f: self._concluir(chave, f))
+        return chave, futuro.result(timeout=tempo_limite)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'imagens': len(self._imagens),
+                'bytes': self._bytes,
+                'capacidade_bytes': self.capacidade_bytes,
+                'diretorio': self.diretorio,
+                'workers': self.workers,
+                'pendentes': len(self._em_andamento),
+                'max_pendentes': self.max_pendentes,
+                'acertos': self.acertos,
+                'renderizacoes': self.renderizacoes,
+                'recusados': self.recusados,
+            }
+
+def renderizador_do_ambiente() -> RenderizadorRelatorios:
+    """Cria o renderizador a partir de SIMULADOR_RELATORIO_WORKERS, SIMULADOR_RELATORIO_FILA,
+    SIMULADOR_RELATORIO_CACHE_MB e SIMULADOR_RELATORIO_DIR (diretório compartilhado, opcional)."""
+    return RenderizadorRelatorios(
+        workers=int(os.environ.get('SIMULADOR_RELATORIO_WORKERS', 2)),
+        max_pendentes=int(os.environ.get('SIMULADOR_RELATORIO_FILA', 16)),
+        capacidade_bytes=int(float(os.environ.get('SIMULADOR_RELATORIO_CACHE_MB', 64)) * (1 << 20)),
+        diretorio=os.environ.get('SIMULADOR_RELATORIO_DIR') or None,
+    )
@@ -0,0 +1,148 @@
+"""Análise de sensibilidade (derivadas e gráfico tornado) do simulador de cultivo.
+
+As derivadas de lucro, payback e ROI em relação a cada parâmetro são obtidas
+analiticamente a partir das fórmulas de `simular()` — o modelo é afim em cada
+campo isolado — e os balanços de ±X% do tornado saem de uma única avaliação
+vetorizada do `SimuladorLote` com 2N+1 cenários (base, baixos e altos), em vez
+de 2N chamadas a `simular()`.
+"""
+
+from dataclasses import asdict, fields
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from simulador_cultivo import SetupInvestimento, ParametrosCiclo, CustosMercado, SimuladorLote
+
+# Métricas analisadas (chaves do SimuladorLote)
+METRICAS = ('lucro_liquido_ciclo', 'periodo_payback_ciclos', 'roi_investimento_1_ano')
+
+# (grupo, campo) na ordem das dataclasses
+CAMPOS: List[Tuple[str, str]] = (
+    [('setup', f.name) for f in fields(SetupInvestimento)]
+    + [('cycle', f.name) for f in fields(ParametrosCiclo)]
+    + [('market', f.name) for f in fields(CustosMercado)]
+)
+_INDICE = {nome: i for i, (_, nome) in enumerate(CAMPOS)}
+
+def _vetor_base(setup: SetupInvestimento, ciclo: ParametrosCiclo, mercado: CustosMercado) -> np.ndarray:
+    valores = {**asdict(setup), **asdict(ciclo), **asdict(mercado)}
+    return np.array([valores[nome] for _, nome in CAMPOS], dtype=np.float64)
+
+def _lote(matriz: np.ndarray) -> SimuladorLote:
+    """Cria o lote a partir de uma matriz cenários x CAMPOS."""
+    grupos: Dict[str, Dict[str, np.ndarray]] = {'setup': {}, 'cycle': {}, 'market': {}}
+    for j, (grupo, nome) in enumerate(CAMPOS):
+        grupos[grupo][nome] = matriz[:, j]
+    return SimuladorLote(grupos['setup'], grupos['cycle'], grupos['market'])
+
+def derivadas_analiticas(setup: SetupInvestimento, ciclo: ParametrosCiclo, mercado: CustosMercado) -> Dict[str, np.ndarray]:
+    """Gradiente de cada métrica em relação a todos os CAMPOS (arrays alinhados com CAMPOS).
+
+    Onde a métrica não é diferenciável (payback com lucro <= 0, ROI sem
+    investimento) a derivada é `nan`.
+    """
+    x = _vetor_base(setup, ciclo, mercado)
+    v = {nome: x[i] for nome, i in _INDICE.items()}
+    n = len(CAMPOS)
+
+    def gradiente(**parciais) -> np.ndarray:
+        g = np.zeros(n)
+        for nome, valor in parciais.items():
+            g[_INDICE[nome]] = valor
+        return g
+
+    horas_energia = v['horas_luz_veg'] * v['dias_vegetativo'] + v['horas_luz_flor'] * v['dias_floracao']
+    kw = v['potencia_watts'] / 1000
+
+    investimento = v['custo_equip_iluminacao'] + v['custo_tenda_estrutura'] + v['custo_ventilacao_exaustao'] + v['custo_outros_equipamentos']
+    d_investimento = gradiente(custo_equip_iluminacao=1, custo_tenda_estrutura=1, custo_ventilacao_exaustao=1, custo_outros_equipamentos=1)
+
+    custo_energia = kw * horas_energia * v['preco_kwh']
+    d_energia = gradiente(
+        potencia_watts=horas_energia * v['preco_kwh'] / 1000,
+        horas_luz_veg=kw * v['dias_vegetativo'] * v['preco_kwh'],
+        dias_vegetativo=kw * v['horas_luz_veg'] * v['preco_kwh'],
+        horas_luz_flor=kw * v['dias_floracao'] * v['preco_kwh'],
+        dias_floracao=kw * v['horas_luz_flor'] * v['preco_kwh'],
+        preco_kwh=kw * horas_energia,
+    )
+    custo_operacional = custo_energia + v['custo_sementes_clones'] + v['custo_substrato'] + v['custo_nutrientes'] + v['custos_operacionais_misc']
+    d_operacional = d_energia + gradiente(custo_sementes_clones=1, custo_substrato=1, custo_nutrientes=1, custos_operacionais_misc=1)
+
+    producao = v['num_plantas'] * v['producao_por_planta_g']
+    d_receita = gradiente(
+        num_plantas=v['producao_por_planta_g'] * v['preco_venda_por_grama'],
+        producao_por_planta_g=v['num_plantas'] * v['preco_venda_por_grama'],
+        preco_venda_por_grama=producao,
+    )
+    lucro = producao * v['preco_venda_por_grama'] - custo_operacional
+    d_lucro = d_receita - d_operacional
+
+    duracao = v['dias_vegetativo'] + v['dias_floracao'] + v['dias_secagem_cura']
+    d_duracao = gradiente(dias_vegetativo=1, dias_floracao=1, dias_secagem_cura=1)
+
+    # payback = I / L  (definido só com lucro positivo)
+    if lucro > 0:
+        d_payback = (d_investimento * lucro - investimento * d_lucro) / lucro ** 2
+    else:
+        d_payback = np.full(n, np.nan)
+
+    # ROI = 100 * (365 L / (D I) - 1)
+    if investimento > 0 and duracao != 0:
+        d_roi = 100 * 365 * (d_lucro / (duracao * investimento)
+                             - lucro * d_duracao / (duracao ** 2 * investimento)
+                             - lucro * d_investimento / (duracao * investimento ** 2))
+    else:
+        d_roi = np.full(n, np.nan)
+
+    return {'lucro_liquido_ciclo': d_lucro, 'periodo_payback_ciclos': d_payback, 'roi_investimento_1_ano': d_roi}
+
+def tornado(setup: SetupInvestimento, ciclo: ParametrosCiclo, mercado: CustosMercado, variacao: float = 0.10) -> Dict[str, Any]:
+    """Avalia todos os balanços de ±variacao em um único lote de 2N+1 cenários."""
+    x = _vetor_base(setup, ciclo, mercado)
+    n = len(CAMPOS)
+    matriz = np.tile(x, (2 * n + 1, 1))
+    diagonal = np.arange(n)
+    matriz[1 + diagonal, diagonal] *= 1 - variacao
+    matriz[1 + n + diagonal, diagonal] *= 1 + variacao
+
+    resultados = _lote(matriz).simular()
+    return {
+        'base': {m: resultados[m][0] for m in METRICAS},
+        'baixo': {m: resultados[m][1:1 + n] for m in METRICAS},
+        'alto': {m: resultados[m][1 + n:] for m in METRICAS},
+    }
+
+def analisar_sensibilidade(setup: SetupInvestimento, ciclo: ParametrosCiclo, mercado: CustosMercado,
+                           variacao: float = 0.10) -> Dict[str, Any]:
+    """Combina derivadas, elasticidades e tornado, com os campos ordenados por impacto em cada métrica."""
+    x = _vetor_base(setup, ciclo, mercado)
+    derivadas = derivadas_analiticas(setup, ciclo, mercado)
+    balancos = tornado(setup, ciclo, mercado, variacao)
+
+    metricas = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for m in METRICAS:
+            base = balancos['base'][m]
+            elasticidade = derivadas[m] * x / base if np.isfinite(base) and base != 0 else np.full(len(CAMPOS), np.nan)
+            amplitude = np.abs(balancos['alto'][m] - balancos['baixo'][m])
+            # Campos sem efeito (amplitude 0) ou indefinidos (nan/inf) vão para o fim do ranking
+            ordenacao = np.argsort(-np.nan_to_num(amplitude, nan=-1.0, posinf=np.finfo(float).max), kind='stable')
+            metricas[m] = {
+                'base': float(base),
+                'campos': [
+                    {
+                        'grupo': CAMPOS[i][0],
+                        'campo': CAMPOS[i][1],
+                        'valor': float(x[i]),
+                        'derivada': float(derivadas[m][i]),
+                        'elasticidade': float(elasticidade[i]),
+                        'baixo': float(balancos['baixo'][m][i]),
+                        'alto': float(balancos['alto'][m][i]),
+                        'amplitude': float(amplitude[i]),
+                    }
+                    for i in ordenacao
+                ],
+            }
+    return {'variacao': variacao, 'metricas': metricas}
@@ -1,101 +1,11 @@
 import matplotlib.pyplot as plt
-import numpy as np
-from dataclasses import dataclass, asdict
-from typing import Dict, Any
+import os
+import sys
 
-# --- ESTRUTURA DE DADOS MODULAR (COM DATACLASSES) ---
+# Garante que o núcleo do simulador seja importável mesmo quando o script é executado de outro diretório
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-@dataclass
-class SetupInvestimento:
-    """Parâmetros do setup e custos de investimento inicial."""
-    area_m2: float = 1.00
-    custo_equip_iluminacao: float = 2000.0
-    custo_tenda_estrutura: float = 1500.0
-    custo_ventilacao_exaustao: float = 800.0
-    custo_outros_equipamentos: float = 500.0
-
-@dataclass
-class ParametrosCiclo:
-    """Parâmetros que definem um ciclo de cultivo."""
-    potencia_watts: int = 240
-    num_plantas: int = 6
-    producao_por_planta_g: int = 50
-    dias_vegetativo: int = 50
-    horas_luz_veg: int = 16
-    dias_floracao: int = 90
-    horas_luz_flor: int = 12
-    dias_secagem_cura: int = 15
-
-@dataclass
-class CustosMercado:
-    """Custos operacionais por ciclo e condições de mercado."""
-    preco_kwh: float = 0.95
-    custo_sementes_clones: float = 500.0
-    custo_substrato: float = 420.0
-    custo_nutrientes: float = 350.0
-    custos_operacionais_misc: float = 100.0
-    preco_venda_por_grama: float = 45.0
-
-# --- MOTOR DE SIMULAÇÃO ---
-
-class SimuladorCultivoCompleto:
-    def __init__(self, setup: SetupInvestimento, ciclo: ParametrosCiclo, mercado: CustosMercado):
-        self.setup = setup
-        self.ciclo = ciclo
-        self.mercado = mercado
-    
-    def simular(self) -> Dict[str, Any]:
-        # --- Custos de Investimento ---
-        custo_total_investimento = sum(asdict(self.setup).values()) - self.setup.area_m2
-        
-        # --- Custos Operacionais por Ciclo ---
-        consumo_kwh_veg = (self.ciclo.potencia_watts / 1000) * self.ciclo.horas_luz_veg * self.ciclo.dias_vegetativo
-        consumo_kwh_flor = (self.ciclo.potencia_watts / 1000) * self.ciclo.horas_luz_flor * self.ciclo.dias_floracao
-        custo_energia = (consumo_kwh_veg + consumo_kwh_flor) * self.mercado.preco_kwh
-        
-        custos_operacionais_dict = {
-            'Energia Elétrica': custo_energia,
-            'Sementes/Clones': self.mercado.custo_sementes_clones,
-            'Substrato': self.mercado.custo_substrato,
-            'Nutrientes': self.mercado.custo_nutrientes,
-            'Outros Custos (Ciclo)': self.mercado.custos_operacionais_misc
-        }
-        custo_operacional_total_ciclo = sum(custos_operacionais_dict.values())
-        
-        # --- Produção e Receita por Ciclo ---
-        producao_total_g = self.ciclo.num_plantas * self.ciclo.producao_por_planta_g
-        receita_bruta_ciclo = producao_total_g * self.mercado.preco_venda_por_grama
-        lucro_liquido_ciclo = receita_bruta_ciclo - custo_operacional_total_ciclo
-        
-        # --- Métricas de Eficiência e Negócio ---
-        custo_por_grama = custo_operacional_total_ciclo / producao_total_g if producao_total_g > 0 else 0
-        gramas_por_watt = producao_total_g / self.ciclo.potencia_watts if self.ciclo.potencia_watts > 0 else 0
-        gramas_por_m2 = producao_total_g / self.setup.area_m2 if self.setup.area_m2 > 0 else 0
-        
-        # --- Análise de Payback e ROI ---
-        periodo_payback_ciclos = custo_total_investimento / lucro_liquido_ciclo if lucro_liquido_ciclo > 0 else float('inf')
-        roi_investimento_1_ano = ((lucro_liquido_ciclo * (365 / self.get_duracao_total_ciclo())) - custo_total_investimento) / custo_total_investimento * 100 if custo_total_investimento > 0 else float('inf')
-        
-        return {
-            # Resultados Financeiros
-            'Custo Total Investimento (R$)': custo_total_investimento,
-            'Custo Operacional p/ Ciclo (R$)': custo_operacional_total_ciclo,
-            'Receita Bruta p/ Ciclo (R$)': receita_bruta_ciclo,
-            'Lucro Líquido p/ Ciclo (R$)': lucro_liquido_ciclo,
-            # Métricas de Eficiência
-            'Custo por Grama (R$/g)': custo_por_grama,
-            'Gramas por Watt (g/W)': gramas_por_watt,
-            'Gramas por m² (g/m²)': gramas_por_m2,
-            # Métricas de Negócio
-            'Período de Payback (ciclos)': periodo_payback_ciclos,
-            'ROI sobre Investimento (1º Ano %)': roi_investimento_1_ano,
-            # Dicionários para gráficos
-            'detalhe_custos_operacionais': custos_operacionais_dict,
-            'detalhe_custos_investimento': {k.replace('custo_', '').replace('_', ' ').title(): v for k, v in asdict(self.setup).items() if 'custo' in k},
-        }
-    
-    def get_duracao_total_ciclo(self) -> int:
-        return self.ciclo.dias_vegetativo + self.ciclo.dias_floracao + self.ciclo.dias_secagem_cura
+from simulador_cultivo import SetupInvestimento, ParametrosCiclo, CustosMercado, SimuladorCultivoCompleto
 
 # --- EXEMPLO DE USO ---
 
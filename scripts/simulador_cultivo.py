@@ -0,0 +1,291 @@
+"""Núcleo do simulador de cultivo indoor.
+
+Contém apenas as dataclasses de parâmetros e os motores de simulação, sem
+dependências de interface ou de gráficos, para que a API e os dashboards
+importem o mesmo código. O NumPy só é carregado quando o motor em lote é usado.
+"""
+
+from dataclasses import dataclass, fields
+from typing import TYPE_CHECKING, Dict, Any, Iterable, Mapping, NamedTuple, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Incrementar sempre que a semântica dos resultados mudar (o cache também usa o hash deste arquivo)
+VERSAO_MOTOR = '1'
+
+# --- ESTRUTURA DE DADOS MODULAR (COM DATACLASSES) ---
+
+@dataclass
+class SetupInvestimento:
+    """Parâmetros do setup e custos de investimento inicial."""
+    area_m2: float = 1.00
+    custo_equip_iluminacao: float = 2000.0
+    custo_tenda_estrutura: float = 1500.0
+    custo_ventilacao_exaustao: float = 800.0
+    custo_outros_equipamentos: float = 500.0
+
+@dataclass
+class ParametrosCiclo:
+    """Parâmetros que definem um ciclo de cultivo."""
+    potencia_watts: int = 240
+    num_plantas: int = 6
+    producao_por_planta_g: int = 50
+    dias_vegetativo: int = 50
+    horas_luz_veg: int = 16
+    dias_floracao: int = 90
+    horas_luz_flor: int = 12
+    dias_secagem_cura: int = 15
+
+@dataclass
+class CustosMercado:
+    """Custos operacionais por ciclo e condições de mercado."""
+    preco_kwh: float = 0.95
+    custo_sementes_clones: float = 500.0
+    custo_substrato: float = 120.0
+    custo_nutrientes: float = 350.0
+    custos_operacionais_misc: float = 100.0
+    preco_venda_por_grama: float = 45.0
+
+# Limites (mínimo, máximo, passo) dos controles da barra lateral do dashboard Streamlit
+FAIXAS_BARRA_LATERAL = {
+    'area_m2': (0.36, 10.0, 0.1),
+    'custo_equip_iluminacao': (500.0, 10000.0, 100.0),
+    'custo_tenda_estrutura': (500.0, 5000.0, 100.0),
+    'custo_ventilacao_exaustao': (200.0, 2000.0, 50.0),
+    'custo_outros_equipamentos': (100.0, 2000.0, 50.0),
+    'potencia_watts': (50, 2000, 10),
+    'num_plantas': (1, 30, 1),
+    'producao_por_planta_g': (10, 250, 5),
+    'dias_vegetativo': (15, 120, 1),
+    'horas_luz_veg': (12, 24, 1),
+    'dias_floracao': (45, 120, 1),
+    'horas_luz_flor': (8, 16, 1),
+    'dias_secagem_cura': (7, 40, 1),
+    'preco_kwh': (0.1, 2.0, 0.05),
+    'custo_sementes_clones': (100.0, 2000.0, 50.0),
+    'custo_substrato': (50.0, 500.0, 10.0),
+    'custo_nutrientes': (100.0, 1000.0, 25.0),
+    'custos_operacionais_misc': (50.0, 500.0, 25.0),
+    'preco_venda_por_grama': (10.0, 100.0, 1.0),
+}
+
+# --- RESULTADO ---
+
+class ResultadoSimulacao(NamedTuple):
+    """Métricas de um cenário com chaves estáveis, na mesma ordem das colunas do `SimuladorLote`."""
+    custo_total_investimento: float
+    custo_operacional_total_ciclo: float
+    receita_bruta_ciclo: float
+    lucro_liquido_ciclo: float
+    custo_por_grama: float
+    gramas_por_watt: float
+    gramas_por_m2: float
+    periodo_payback_ciclos: float
+    roi_investimento_1_ano: float
+    custo_energia: float
+    producao_total_g: float
+
+CAMPOS_RESULTADO = ResultadoSimulacao._fields
+
+# Rótulos de exibição usados pelos dashboards e pelo dicionário de `simular()`
+ROTULOS_RESULTADO = {
+    'custo_total_investimento': 'Custo Total Investimento (R$)',
+    'custo_operacional_total_ciclo': 'Custo Operacional p/ Ciclo (R$)',
+    'receita_bruta_ciclo': 'Receita Bruta p/ Ciclo (R$)',
+    'lucro_liquido_ciclo': 'Lucro Líquido p/ Ciclo (R$)',
+    'custo_por_grama': 'Custo por Grama (R$/g)',
+    'gramas_por_watt': 'Gramas por Watt (g/W)',
+    'gramas_por_m2': 'Gramas por m² (g/m²)',
+    'periodo_payback_ciclos': 'Período de Payback (ciclos)',
+    'roi_investimento_1_ano': 'ROI sobre Investimento (1º Ano %)',
+}
+_ROTULOS_INVESTIMENTO = {f.name: f.name.replace('custo_', '').replace('_', ' ').title()
+                         for f in fields(SetupInvestimento) if 'custo' in f.name}
+
+# Modelo JSON montado uma única vez; só os números são formatados a cada chamada
+_MODELO_JSON = '{' + ','.join(f'"{campo}":%s' for campo in CAMPOS_RESULTADO) + '}'
+
+def _numero_json(valor) -> str:
+    # Mesma grafia do `json.dumps`/`jsonify`, inclusive para infinito e NaN
+    if valor - valor == 0:
+        return repr(valor)
+    if valor != valor:
+        return 'NaN'
+    return 'Infinity' if valor > 0 else '-Infinity'
+
+def serializar_resultado(valores: Sequence[float]) -> str:
+    """JSON compacto de um `ResultadoSimulacao` (ou de valores na ordem de `CAMPOS_RESULTADO`)."""
+    return _MODELO_JSON % tuple(map(_numero_json, valores))
+
+# --- MOTOR DE SIMULAÇÃO ---
+
+class SimuladorCultivoCompleto:
+    def __init__(self, setup: SetupInvestimento, ciclo: ParametrosCiclo, mercado: CustosMercado):
+        self.setup = setup
+        self.ciclo = ciclo
+        self.mercado = mercado
+
+    def calcular(self) -> ResultadoSimulacao:
+        """Métricas do cenário sem copiar as dataclasses nem montar dicionários."""
+        s, c, m = self.setup, self.ciclo, self.mercado
+
+        # --- Custos de Investimento ---
+        # Mesma ordem de soma de `sum(asdict(setup).values()) - area_m2`
+        custo_total_investimento = (s.area_m2 + s.custo_equip_iluminacao + s.custo_tenda_estrutura
+                                    + s.custo_ventilacao_exaustao + s.custo_outros_equipamentos) - s.area_m2
+
+        # --- Custos Operacionais por Ciclo ---
+        consumo_kwh_veg = (c.potencia_watts / 1000) * c.horas_luz_veg * c.dias_vegetativo
+        consumo_kwh_flor = (c.potencia_watts / 1000) * c.horas_luz_flor * c.dias_floracao
+        custo_energia = (consumo_kwh_veg + consumo_kwh_flor) * m.preco_kwh
+        custo_operacional_total_ciclo = (custo_energia + m.custo_sementes_clones + m.custo_substrato
+                                         + m.custo_nutrientes + m.custos_operacionais_misc)
+
+        # --- Produção e Receita por Ciclo ---
+        producao_total_g = c.num_plantas * c.producao_por_planta_g
+        receita_bruta_ciclo = producao_total_g * m.preco_venda_por_grama
+        lucro_liquido_ciclo = receita_bruta_ciclo - custo_operacional_total_ciclo
+
+        # --- Métricas de Eficiência e Negócio ---
+        custo_por_grama = custo_operacional_total_ciclo / producao_total_g if producao_total_g > 0 else 0
+        gramas_por_watt = producao_total_g / c.potencia_watts if c.potencia_watts > 0 else 0
+        gramas_por_m2 = producao_total_g / s.area_m2 if s.area_m2 > 0 else 0
+
+        # --- Análise de Payback e ROI ---
+        periodo_payback_ciclos = custo_total_investimento / lucro_liquido_ciclo if lucro_liquido_ciclo > 0 else float('inf')
+        roi_investimento_1_ano = ((lucro_liquido_ciclo * (365 / self.get_duracao_total_ciclo())) - custo_total_investimento) / custo_total_investimento * 100 if custo_total_investimento > 0 else float('inf')
+
+        return ResultadoSimulacao(
+            custo_total_investimento, custo_operacional_total_ciclo, receita_bruta_ciclo, lucro_liquido_ciclo,
+            custo_por_grama, gramas_por_watt, gramas_por_m2, periodo_payback_ciclos, roi_investimento_1_ano,
+            custo_energia, producao_total_g,
+        )
+
+    def simular(self) -> Dict[str, Any]:
+        """Resultados com os rótulos de exibição e os detalhes para os gráficos (formato original)."""
+        r = self.calcular()
+        return {
+            # Resultados Financeiros
+            ROTULOS_RESULTADO['custo_total_investimento']: r.custo_total_investimento,
+            ROTULOS_RESULTADO['custo_operacional_total_ciclo']: r.custo_operacional_total_ciclo,
+            ROTULOS_RESULTADO['receita_bruta_ciclo']: r.receita_bruta_ciclo,
+            ROTULOS_RESULTADO['lucro_liquido_ciclo']: r.lucro_liquido_ciclo,
+            # Métricas de Eficiência
+            ROTULOS_RESULTADO['custo_por_grama']: r.custo_por_grama,
+            ROTULOS_RESULTADO['gramas_por_watt']: r.gramas_por_watt,
+            ROTULOS_RESULTADO['gramas_por_m2']: r.gramas_por_m2,
+            # Métricas de Negócio
+            ROTULOS_RESULTADO['periodo_payback_ciclos']: r.periodo_payback_ciclos,
+            ROTULOS_RESULTADO['roi_investimento_1_ano']: r.roi_investimento_1_ano,
+            # Dicionários para gráficos
+            'detalhe_custos_operacionais': {
+                'Energia Elétrica': r.custo_energia,
+                'Sementes/Clones': self.mercado.custo_sementes_clones,
+                'Substrato': self.mercado.custo_substrato,
+                'Nutrientes': self.mercado.custo_nutrientes,
+                'Outros Custos (Ciclo)': self.mercado.custos_operacionais_misc,
+            },
+            'detalhe_custos_investimento': {rotulo: getattr(self.setup, nome) for nome, rotulo in _ROTULOS_INVESTIMENTO.items()},
+        }
+
+    def get_duracao_total_ciclo(self) -> int:
+        return self.ciclo.dias_vegetativo + self.ciclo.dias_floracao + self.ciclo.dias_secagem_cura
+
+# --- MOTOR DE SIMULAÇÃO EM LOTE (VETORIZADO) ---
+
+def _colunas(classe, valores: Mapping[str, Any]) -> Dict[str, 'np.ndarray']:
+    """Converte um mapeamento campo -> valores em colunas float64; campos ausentes usam o padrão da dataclass."""
+    import numpy as np
+
+    nomes = [f.name for f in fields(classe)]
+    desconhecidos = set(valores) - set(nomes)
+    if desconhecidos:
+        raise TypeError(f"{classe.__name__} não possui o(s) campo(s): {', '.join(sorted(desconhecidos))}")
+    padrao = classe()
+    return {nome: np.asarray(valores.get(nome, getattr(padrao, nome)), dtype=np.float64) for nome in nomes}
+
+class SimuladorLote:
+    """Avalia muitos cenários de uma só vez.
+
+    Recebe, para cada dataclass, um mapeamento campo -> array (ou escalar, que é
+    replicado para todos os cenários) e devolve todas as métricas de `simular()`
+    como arrays. As operações seguem exatamente a ordem do simulador escalar, de
+    modo que os resultados são idênticos bit a bit, incluindo o payback `inf`
+    quando não há lucro e os zeros das métricas de eficiência. O único caso sem
+    equivalente é duração de ciclo zero com investimento positivo: o escalar
+    levanta ZeroDivisionError, aqui o ROI do cenário fica `nan`.
+    """
+
+    def __init__(self, setup: Mapping[str, Any], ciclo: Mapping[str, Any], mercado: Mapping[str, Any]):
+        import numpy as np
+
+        colunas = {**_colunas(SetupInvestimento, setup), **_colunas(ParametrosCiclo, ciclo), **_colunas(CustosMercado, mercado)}
+        arrays = np.broadcast_arrays(*[np.atleast_1d(c) for c in colunas.values()])
+        if arrays[0].ndim != 1:
+            raise ValueError("As colunas do lote devem ser unidimensionais.")
+        colunas = dict(zip(colunas, arrays))
+        self.setup = {f.name: colunas[f.name] for f in fields(SetupInvestimento)}
+        self.ciclo = {f.name: colunas[f.name] for f in fields(ParametrosCiclo)}
+        self.mercado = {f.name: colunas[f.name] for f in fields(CustosMercado)}
+        self.tamanho = arrays[0].shape[0]
+
+    @classmethod
+    def de_cenarios(cls, cenarios: Iterable[Tuple[SetupInvestimento, ParametrosCiclo, CustosMercado]]) -> 'SimuladorLote':
+        """Monta o lote a partir de uma sequência de tuplas (setup, ciclo, mercado)."""
+        import numpy as np
+
+        cenarios = list(cenarios)
+        def colunas(posicao, classe):
+            return {f.name: np.array([getattr(c[posicao], f.name) for c in cenarios], dtype=np.float64) for f in fields(classe)}
+        return cls(colunas(0, SetupInvestimento), colunas(1, ParametrosCiclo), colunas(2, CustosMercado))
+
+    def simular(self) -> Dict[str, 'np.ndarray']:
+        import numpy as np
+
+        s, c, m = self.setup, self.ciclo, self.mercado
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # --- Custos de Investimento ---
+            # Mesma ordem de soma de `sum(asdict(setup).values()) - area_m2`.
+            custo_total_investimento = (s['area_m2'] + s['custo_equip_iluminacao'] + s['custo_tenda_estrutura']
+                                        + s['custo_ventilacao_exaustao'] + s['custo_outros_equipamentos']) - s['area_m2']
+
+            # --- Custos Operacionais por Ciclo ---
+            consumo_kwh_veg = (c['potencia_watts'] / 1000) * c['horas_luz_veg'] * c['dias_vegetativo']
+            consumo_kwh_flor = (c['potencia_watts'] / 1000) * c['horas_luz_flor'] * c['dias_floracao']
+            custo_energia = (consumo_kwh_veg + consumo_kwh_flor) * m['preco_kwh']
+            custo_operacional_total_ciclo = (custo_energia + m['custo_sementes_clones'] + m['custo_substrato']
+                                             + m['custo_nutrientes'] + m['custos_operacionais_misc'])
+
+            # --- Produção e Receita por Ciclo ---
+            producao_total_g = c['num_plantas'] * c['producao_por_planta_g']
+            receita_bruta_ciclo = producao_total_g * m['preco_venda_por_grama']
+            lucro_liquido_ciclo = receita_bruta_ciclo - custo_operacional_total_ciclo
+
+            # --- Métricas de Eficiência e Negócio ---
+            custo_por_grama = np.where(producao_total_g > 0, custo_operacional_total_ciclo / producao_total_g, 0.0)
+            gramas_por_watt = np.where(c['potencia_watts'] > 0, producao_total_g / c['potencia_watts'], 0.0)
+            gramas_por_m2 = np.where(s['area_m2'] > 0, producao_total_g / s['area_m2'], 0.0)
+
+            # --- Análise de Payback e ROI ---
+            duracao_ciclo = self.get_duracao_total_ciclo()
+            periodo_payback_ciclos = np.where(lucro_liquido_ciclo > 0, custo_total_investimento / lucro_liquido_ciclo, np.inf)
+            roi = ((lucro_liquido_ciclo * (365 / duracao_ciclo)) - custo_total_investimento) / custo_total_investimento * 100
+            roi_investimento_1_ano = np.where(custo_total_investimento > 0, np.where(duracao_ciclo != 0, roi, np.nan), np.inf)
+
+        return {
+            'custo_total_investimento': custo_total_investimento,
+            'custo_operacional_total_ciclo': custo_operacional_total_ciclo,
+            'receita_bruta_ciclo': receita_bruta_ciclo,
+            'lucro_liquido_ciclo': lucro_liquido_ciclo,
+            'custo_por_grama': custo_por_grama,
+            'gramas_por_watt': gramas_por_watt,
+            'gramas_por_m2': gramas_por_m2,
+            'periodo_payback_ciclos': periodo_payback_ciclos,
+            'roi_investimento_1_ano': roi_investimento_1_ano,
+            'custo_energia': custo_energia,
+            'producao_total_g': producao_total_g,
+        }
+
+    def get_duracao_total_ciclo(self) -> 'np.ndarray':
+        return self.ciclo['dias_vegetativo'] + self.ciclo['dias_floracao'] + self.ciclo['dias_secagem_cura']
@@ -0,0 +1,234 @@
+"""Solucionador inverso do simulador de cultivo: da meta para os parâmetros.
+
+`simular()` só roda para frente. Aqui uma meta (lucro, payback em ciclos, ROI
+ou custo por grama) é fixada e o solucionador encontra o valor de um campo de
+entrada que a atinge, ou — para dois campos — a curva de equilíbrio inteira
+sobre a faixa da barra lateral do primeiro.
+
+Cada meta é reescrita como um resíduo F que não tem divisões e vale >= 0
+exatamente quando a meta é atendida (L lucro, I investimento, D duração do
+ciclo, P produção, C custo operacional):
+
+    lucro_liquido_ciclo     F = L - alvo
+    periodo_payback_ciclos  F = alvo·L - I                (payback = I / L <= alvo)
+    roi_investimento_1_ano  F = 365·L - D·I·(1 + alvo/100)
+    custo_por_grama         F = alvo·P - C
+
+Como o modelo é afim em cada campo isolado (ver `sensibilidade`), F também é:
+avaliar o `SimuladorLote` nas pontas da faixa determina a reta e a raiz sai em
+forma fechada. Para dois campos F é afim no segundo para cada valor do
+primeiro, então a curva sai de um único lote de 3N cenários, e vários alvos
+reaproveitam as mesmas avaliações. Um terceiro ponto (o meio da faixa) confere
+a afinidade; onde ela não vale — um acoplamento futuro no modelo, por exemplo —
+a raiz é buscada por bisseção vetorizada dentro da faixa.
+"""
+
+from dataclasses import asdict
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from simulador_cultivo import SetupInvestimento, ParametrosCiclo, CustosMercado, SimuladorLote, FAIXAS_BARRA_LATERAL
+
+# métrica -> True se a meta é um mínimo (métrica >= alvo), False se é um máximo (métrica <= alvo)
+METAS = {
+    'lucro_liquido_ciclo': True,
+    'periodo_payback_ciclos': False,
+    'roi_investimento_1_ano': True,
+    'custo_por_grama': False,
+}
+PONTOS_CURVA = 200
+MAX_PONTOS_SUPERFICIE = 1_000_000
+MAX_ALVOS = 100
+ITERACOES_BISSECAO = 60
+TOLERANCIA_AFIM = 1e-9
+
+Alvo = Union[float, Sequence[float]]
+
+class SolucionadorInverso:
+    def __init__(self, setup: SetupInvestimento, ciclo: ParametrosCiclo, mercado: CustosMercado,
+                 meta: str = 'periodo_payback_ciclos',
+                 faixas: Optional[Mapping[str, Tuple[float, float, Optional[float]]]] = None):
+        if meta not in METAS:
+            raise ValueError(f"Meta inválida: '{meta}'. Use uma de {', '.join(METAS)}.")
+        self.base = {'setup': asdict(setup), 'cycle': asdict(ciclo), 'market': asdict(mercado)}
+        self.grupo = {nome: grupo for grupo, valores in self.base.items() for nome in valores}
+        self.meta = meta
+        self.faixas = {**FAIXAS_BARRA_LATERAL, **(faixas or {})}
+
+    # --- AVALIAÇÃO ---
+
+    def _faixa(self, campo: str) -> Tuple[float, float, Optional[float]]:
+        if campo not in self.grupo:
+            raise ValueError(f"Campo desconhecido: '{campo}'.")
+        if campo not in self.faixas:
+            raise ValueError(f"Campo sem faixa definida: '{campo}'.")
+        minimo, maximo, passo = self.faixas[campo]
+        if minimo > maximo:
+            raise ValueError(f"Faixa inválida para '{campo}'.")
+        return float(minimo), float(maximo), passo
+
+    def _alvos(self, alvo: Alvo) -> np.ndarray:
+        alvos = np.atleast_1d(np.asarray(alvo, dtype=np.float64))
+        if alvos.ndim != 1 or alvos.size == 0 or not np.isfinite(alvos).all():
+            raise ValueError("O alvo deve ser um número finito ou uma lista não vazia de números finitos.")
+        if alvos.size > MAX_ALVOS:
+            raise ValueError(f"No máximo {MAX_ALVOS} alvos por pedido.")
+        if self.meta in ('periodo_payback_ciclos', 'custo_por_grama') and (alvos <= 0).any():
+            raise ValueError(f"O alvo de '{self.meta}' deve ser positivo.")
+        return alvos
+
+    def _avaliar(self, valores: Mapping[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Roda o lote com os campos de `valores` (arrays com broadcast) e o restante na base."""
+        forma = np.broadcast_shapes(*(np.shape(v) for v in valores.values()))
+        grupos = {grupo: dict(campos) for grupo, campos in self.base.items()}
+        for nome, v in valores.items():
+            grupos[self.grupo[nome]][nome] = np.broadcast_to(np.asarray(v, dtype=np.float64), forma).ravel()
+        lote = SimuladorLote(grupos['setup'], grupos['cycle'], grupos['market'])
+        resultados = lote.simular()
+        resultados['duracao_ciclo'] = lote.get_duracao_total_ciclo()
+        return {chave: np.reshape(v, forma) for chave, v in resultados.items()}
+
+    def _residuo(self, r: Mapping[str, np.ndarray], alvo: np.ndarray) -> np.ndarray:
+        lucro = r['lucro_liquido_ciclo']
+        if self.meta == 'lucro_liquido_ciclo':
+            return lucro - alvo
+        if self.meta == 'periodo_payback_ciclos':
+            return alvo * lucro - r['custo_total_investimento']
+        if self.meta == 'roi_investimento_1_ano':
+            return 365 * lucro - r['duracao_ciclo'] * r['custo_total_investimento'] * (1 + alvo / 100)
+        return alvo * r['producao_total_g'] - r['custo_operacional_total_ciclo']
+
+    def _raizes(self, campo: str, fixos: Mapping[str, np.ndarray], alvos: np.ndarray) -> Dict[str, Any]:
+        """Raiz de F(campo) para cada alvo e cada linha de `fixos`; arrays (alvos, linhas).
+
+        `sentido` é +1 quando valores acima da raiz atendem a meta, -1 quando são
+        os abaixo e 0 quando o campo não altera o resíduo.
+        """
+        minimo, maximo, _ = self._faixa(campo)
+        if maximo == minimo:
+            maximo = minimo + 1.0
+        linhas = len(next(iter(fixos.values()))) if fixos else 1
+        pontos = np.array([minimo, (minimo + maximo) / 2, maximo])[:, None]
+        r = self._avaliar({**{nome: v[None, :] for nome, v in fixos.items()}, campo: pontos})
+        f = self._residuo(r, alvos[:, None, None])
+        f0, fm, f1 = f[:, 0], f[:, 1], f[:, 2]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inclinacao = (f1 - f0) / (maximo - minimo)
+            raiz = np.where(inclinacao != 0, minimo - f0 / inclinacao, np.nan)
+        sentido = np.sign(inclinacao)
+
+        afim = np.abs(fm - (f0 + f1) / 2) <= TOLERANCIA_AFIM * (np.abs(f0) + np.abs(f1))
+        if not afim.all():
+            ia, il = np.nonzero(~afim)
+            fixos_sel = {nome: v[il] for nome, v in fixos.items()}
+
+            def residuo(x: np.ndarray) -> np.ndarray:
+                return self._residuo(self._avaliar({**fixos_sel, campo: x}), alvos[ia])
+
+            # Meia faixa com troca de sinal; sem troca em nenhuma, não há raiz na faixa
+            fa, fb, fc = f0[ia, il], fm[ia, il], f1[ia, il]
+            primeira = np.sign(fa) != np.sign(fb)
+            a = np.where(primeira, minimo, (minimo + maximo) / 2)
+            b = np.where(primeira, (minimo + maximo) / 2, maximo)
+            fa = np.where(primeira, fa, fb)
+            for _ in range(ITERACOES_BISSECAO):
+                meio = (a + b) / 2
+                fmeio = residuo(meio)
+                mesmo_lado = np.sign(fmeio) == np.sign(fa)
+                a, fa = np.where(mesmo_lado, meio, a), np.where(mesmo_lado, fmeio, fa)
+                b = np.where(mesmo_lado, b, meio)
+            com_troca = primeira | (np.sign(fb) != np.sign(fc))
+            raiz[ia, il] = np.where(com_troca, (a + b) / 2, np.nan)
+            sentido[ia, il] = np.where(com_troca, np.sign(fc - f0[ia, il]), 0)
+
+        return {'raiz': raiz.reshape(len(alvos), linhas), 'sentido': sentido.reshape(len(alvos), linhas),
+                'metodo': 'fechado' if afim.all() else 'bissecao'}
+
+    def _no_passo(self, campo: str, raiz: np.ndarray, sentido: np.ndarray) -> np.ndarray:
+        """Valor da faixa, alinhado ao passo, mais próximo da raiz do lado que atende a meta."""
+        minimo, maximo, passo = self._faixa(campo)
+        if passo:
+            q = (raiz - minimo) / passo
+            acima = minimo + np.ceil(q - 1e-9) * passo
+            abaixo = minimo + np.floor(q + 1e-9) * passo
+        else:
+            acima = abaixo = raiz
+        valor = np.where(sentido > 0, np.maximum(acima, minimo), np.minimum(abaixo, maximo))
+        return np.where((sentido != 0) & (valor >= minimo) & (valor <= maximo), valor, np.nan)
+
+    @staticmethod
+    def _formatar(valor: np.ndarray, alvo: Alvo) -> np.ndarray:
+        return valor[0] if np.ndim(alvo) == 0 else valor
+
+    # --- API PÚBLICA ---
+
+    def resolver(self, campo: str, alvo: Alvo) -> Dict[str, Any]:
+        """Valor de `campo` que atinge a meta, com o valor de controle mais próximo que a atende.
+
+        Com um alvo escalar os resultados são escalares; com uma lista, arrays
+        alinhados com os alvos.
+        """
+        alvos = self._alvos(alvo)
+        solucao = self._raizes(campo, {}, alvos)
+        raiz, sentido = solucao['raiz'][:, 0], solucao['sentido'][:, 0]
+        minimo, maximo, _ = self._faixa(campo)
+        no_passo = self._no_passo(campo, raiz, sentido)
+
+        atual = self._avaliar({})
+        verificacao = self._avaliar({campo: np.stack([np.nan_to_num(raiz), np.nan_to_num(no_passo)])})[self.meta]
+        return {
+            'meta': self.meta,
+            'campo': campo,
+            'alvo': self._formatar(alvos, alvo),
+            'valor_atual': float(self.base[self.grupo[campo]][campo]),
+            'metrica_atual': float(atual[self.meta]),
+            'atendida_atual': self._formatar(self._residuo(atual, alvos) >= 0, alvo),
+            'valor': self._formatar(raiz, alvo),
+            'sentido': self._formatar(sentido, alvo),
+            'dentro_da_faixa': self._formatar((raiz >= minimo) & (raiz <= maximo), alvo),
+            'metrica_no_valor': self._formatar(np.where(np.isfinite(raiz), verificacao[0], np.nan), alvo),
+            'valor_no_passo': self._formatar(no_passo, alvo),
+            'metrica_no_passo': self._formatar(np.where(np.isfinite(no_passo), verificacao[1], np.nan), alvo),
+            'metodo': solucao['metodo'],
+        }
+
+    def curva(self, campo_x: str, campo_y: str, alvo: Alvo, pontos: int = PONTOS_CURVA) -> Dict[str, Any]:
+        """Curva de equilíbrio y*(x) sobre a faixa de `campo_x`; com vários alvos, uma curva por alvo.
+
+        Onde `campo_y` não atinge a meta para aquele x, y é `nan`.
+        """
+        if campo_x == campo_y:
+            raise ValueError("Os dois campos da curva devem ser diferentes.")
+        alvos = self._alvos(alvo)
+        # Os resíduos ocupam (alvos, 3, pontos); o limite vale para alvos × pontos
+        if pontos < 2 or len(alvos) * pontos > MAX_PONTOS_SUPERFICIE:
+            raise ValueError(f"'pontos' deve ser ao menos 2, com alvos × pontos até {MAX_PONTOS_SUPERFICIE}.")
+        minimo, maximo, _ = self._faixa(campo_x)
+        x = np.linspace(minimo, maximo, pontos)
+        solucao = self._raizes(campo_y, {campo_x: x}, alvos)
+        minimo_y, maximo_y, _ = self._faixa(campo_y)
+        y = solucao['raiz']
+        return {
+            'meta': self.meta,
+            'campos': [campo_x, campo_y],
+            'alvo': self._formatar(alvos, alvo),
+            'x': x,
+            'y': self._formatar(y, alvo),
+            'sentido': self._formatar(solucao['sentido'], alvo),
+            'dentro_da_faixa': self._formatar((y >= minimo_y) & (y <= maximo_y), alvo),
+            'metodo': solucao['metodo'],
+        }
+
+    def superficie(self, campo_x: str, campo_y: str, alvo: Alvo,
+                   pontos: Tuple[int, int] = (PONTOS_CURVA, PONTOS_CURVA)) -> Dict[str, Any]:
+        """Métrica sobre a grade das duas faixas (linhas = y), com a curva de equilíbrio em `y_equilibrio`."""
+        pontos_x, pontos_y = pontos
+        if pontos_y < 2 or pontos_x * pontos_y > MAX_PONTOS_SUPERFICIE:
+            raise ValueError(f"A grade deve ter ao menos 2 pontos por eixo e no máximo {MAX_PONTOS_SUPERFICIE} no total.")
+        curva = self.curva(campo_x, campo_y, alvo, pontos_x)
+        minimo, maximo, _ = self._faixa(campo_y)
+        y = np.linspace(minimo, maximo, pontos_y)
+        metrica = self._avaliar({campo_x: curva['x'][None, :], campo_y: y[:, None]})[self.meta]
+        curva['y_equilibrio'] = curva.pop('y')
+        return {**curva, 'y': y, 'metrica': metrica}
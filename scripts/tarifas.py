@@ -0,0 +1,100 @@
+"""Agendamento do fotoperíodo em tarifas horárias (tarifa branca / horário de ponta).
+
+`simular()` cobra toda a energia da iluminação a um `preco_kwh` único. Aqui a
+tarifa é um perfil de 24 valores (R$/kWh por hora do dia) ou de 7 × 24 (um
+por dia da semana, segunda = 0), e para cada fase escolhe-se o horário de
+acender as luzes que minimiza o custo, mantendo `horas_luz_veg` e
+`horas_luz_flor` contínuas e na mesma hora todos os dias.
+
+O custo de todas as 24 janelas possíveis é uma convolução circular do perfil
+com uma janela retangular do tamanho do fotoperíodo. Ela é calculada com somas
+prefixadas sobre o perfil repetido, uma vez para cada duração inteira de 0 a
+24 h; frações de hora somam linearmente o preço da hora seguinte. Assim cada
+cenário custa só uma consulta à tabela, sem laços em Python. Com perfil semanal, janelas que passam da meia-noite
+entram no dia seguinte, e o custo diário é a média da semana.
+"""
+
+from typing import Any, Dict, Sequence, Union
+
+import numpy as np
+
+from simulador_cultivo import SimuladorLote
+
+HORAS_DIA = 24
+
+def normalizar_tarifa(tarifa: Union[Sequence[float], Sequence[Sequence[float]], np.ndarray]) -> np.ndarray:
+    """Valida o perfil e devolve um array (dias, 24): 1 linha para o perfil diário, 7 para o semanal."""
+    perfil = np.asarray(tarifa, dtype=np.float64)
+    if perfil.shape == (HORAS_DIA,):
+        perfil = perfil[None, :]
+    if perfil.ndim != 2 or perfil.shape[1] != HORAS_DIA or perfil.shape[0] not in (1, 7):
+        raise ValueError("A tarifa deve ter 24 valores por hora ou 7 listas de 24 (uma por dia da semana).")
+    if not np.all(np.isfinite(perfil)) or np.any(perfil < 0):
+        raise ValueError("Os preços da tarifa devem ser números não negativos.")
+    return perfil
+
+def custo_por_inicio(perfil: np.ndarray, horas: np.ndarray) -> np.ndarray:
+    """Soma média diária das tarifas (R$/kWh × h) de uma janela de `horas` iniciada em cada hora.
+
+    `perfil` vem de `normalizar_tarifa`; `horas` tem um valor por cenário, em
+    [0, 24]. Devolve (cenários, 24).
+    """
+    horas = np.asarray(horas, dtype=np.float64)
+    if np.any((horas < 0) | (horas > HORAS_DIA)):
+        raise ValueError("As horas de luz devem estar entre 0 e 24.")
+    ciclo = perfil.ravel()
+    tamanho = ciclo.size
+    # Perfil repetido duas vezes, para que as janelas deem a volta sem índice modular
+    repetido = np.concatenate([ciclo, ciclo])
+    prefixo = np.concatenate([[0.0], np.cumsum(repetido)])
+    # Tabelas por duração inteira k = 0..24 e hora de início, já com a média entre os dias:
+    # soma das k horas cheias e preço da hora seguinte (usada pela fração de hora)
+    inicio = np.arange(tamanho)[None, :]
+    fim = inicio + np.arange(HORAS_DIA + 1)[:, None]
+    formato = (HORAS_DIA + 1, perfil.shape[0], HORAS_DIA)
+    cheias = (prefixo[fim] - prefixo[inicio]).reshape(formato).mean(axis=1)
+    seguinte = repetido[fim].reshape(formato).mean(axis=1)
+    inteiras = np.floor(horas).astype(np.intp)
+    fracao = (horas - inteiras)[:, None]
+    return cheias[inteiras] + fracao * seguinte[inteiras]
+
+def agendar_fotoperiodo(lote: SimuladorLote, tarifa, detalhar: bool = False) -> Dict[str, Any]:
+    """Melhor horário de acender as luzes por fase e custo de energia resultante, por cenário.
+
+    A economia é em relação ao custo de energia de `simular()` com
+    `preco_kwh`. `lucro_liquido_ciclo_tarifa` troca esse custo pelo da
+    tarifa horária. Com `detalhar=True` inclui o custo do ciclo para cada
+    hora de início (cenários × 24) das duas fases.
+    """
+    perfil = normalizar_tarifa(tarifa)
+    c = lote.ciclo
+    resultados = lote.simular()
+    kw = c['potencia_watts'] / 1000
+
+    saida: Dict[str, Any] = {}
+    custo_tarifa = np.zeros(lote.tamanho)
+    for fase, horas, dias in (('veg', c['horas_luz_veg'], c['dias_vegetativo']),
+                              ('flor', c['horas_luz_flor'], c['dias_floracao'])):
+        custo_ciclo = custo_por_inicio(perfil, horas) * (kw * dias)[:, None]
+        # Arredonda o ruído de ponto flutuante para que empates fiquem com a hora mais cedo
+        melhor = np.argmin(np.round(custo_ciclo, 9), axis=1)
+        custo_fase = custo_ciclo[np.arange(lote.tamanho), melhor]
+        consumo = kw * horas * dias
+        saida[f'inicio_{fase}'] = melhor
+        saida[f'custo_energia_{fase}'] = custo_fase
+        with np.errstate(divide='ignore', invalid='ignore'):
+            saida[f'preco_medio_kwh_{fase}'] = np.where(consumo > 0, custo_fase / consumo, 0.0)
+        if detalhar:
+            saida[f'custo_por_inicio_{fase}'] = custo_ciclo
+        custo_tarifa += custo_fase
+
+    plano = resultados['custo_energia']
+    economia = plano - custo_tarifa
+    saida.update({
+        'custo_energia_plano': plano,
+        'custo_energia_tarifa': custo_tarifa,
+        'economia': economia,
+        'economia_percentual': np.where(plano > 0, np.divide(economia * 100, plano, out=np.zeros_like(plano), where=plano > 0), 0.0),
+        'lucro_liquido_ciclo_tarifa': resultados['lucro_liquido_ciclo'] + economia,
+    })
+    return saida
@@ -0,0 +1,138 @@
+import json
+from dataclasses import asdict
+
+import pytest
+
+import api
+from fluxo_caixa import MAX_ANOS
+from jobs import GerenciadorJobs, FilaCheia
+from simulador_cultivo import SetupInvestimento, ParametrosCiclo, CustosMercado
+
+@pytest.fixture
+def cliente():
+    return api.app.test_client()
+
+def _cenario(**ciclo):
+    return {'setup': asdict(SetupInvestimento()), 'cycle': {**asdict(ParametrosCiclo()), **ciclo},
+            'market': asdict(CustosMercado())}
+
+def _json_estrito(resposta):
+    """Corpo da resposta como JSON estrito: NaN e Infinity são recusados."""
+    def recusar(constante):
+        raise AssertionError(f"JSON inválido: {constante}")
+    return json.loads(resposta.get_data(as_text=True), parse_constant=recusar)
+
+def _sem_lucro():
+    cenario = _cenario()
+    cenario['market']['preco_venda_por_grama'] = 1.0
+    return cenario
+
+def test_calculate(cliente):
+    resposta = cliente.post('/api/calculate', json=_cenario())
+    assert resposta.status_code == 200
+    assert resposta.get_json()['Custo Total Investimento (R$)'] == 4800.0
+
+@pytest.mark.parametrize('corpo', [
+    {},
+    {'setup': {}, 'cycle': {}},
+    {**_cenario(), 'setup': {'area_m2': 'grande'}},
+    {**_cenario(), 'setup': {'area_m2': True}},
+    {**_cenario(), 'setup': {'campo_inexistente': 1}},
+    _cenario(dias_vegetativo=0, dias_floracao=0, dias_secagem_cura=0),
+    [],
+])
+def test_calculate_recusa_entrada_invalida(cliente, corpo):
+    resposta = cliente.post('/api/calculate', json=corpo)
+    assert resposta.status_code == 400
+    assert resposta.get_json()['error']
+
+def test_calculate_recusa_corpo_que_nao_e_json(cliente):
+    assert cliente.post('/api/calculate', data='x', content_type='text/plain').status_code == 400
+
+def test_batch_reporta_erros_por_linha(cliente):
+    corpo = [_cenario(), {'setup': {}}, _cenario(dias_vegetativo=0, dias_floracao=0, dias_secagem_cura=0)]
+    resposta = cliente.post('/api/calculate/batch', json=corpo)
+    assert resposta.status_code == 200
+    linhas = resposta.get_data(as_text=True).splitlines()
+    assert [json.loads(linha)['index'] for linha in linhas] == [0, 1, 2]
+    assert 'result' in json.loads(linhas[0])
+    assert linhas[1].startswith('{"index":1,"error":')
+
+def test_sensitivity_sem_lucro_devolve_null(cliente):
+    resposta = cliente.post('/api/sensitivity', json=_sem_lucro())
+    assert resposta.status_code == 200
+    payback = _json_estrito(resposta)['metricas']['periodo_payback_ciclos']
+    assert payback['base'] is None
+    assert all(campo['derivada'] is None and campo['elasticidade'] is None for campo in payback['campos'])
+
+@pytest.mark.parametrize('anos', [0, -1, MAX_ANOS + 1, 'nan'])
+def test_cash_flow_limita_horizonte(cliente, anos):
+    resposta = cliente.post('/api/cash-flow', json={**_cenario(), 'years': anos})
+    assert resposta.status_code == 400
+
+def test_cash_flow_sem_retorno_devolve_null(cliente):
+    resposta = cliente.post('/api/cash-flow', json=_sem_lucro())
+    assert resposta.status_code == 200
+    corpo = _json_estrito(resposta)
+    assert corpo['tir_anual'] is None and corpo['payback_dias'] is None
+
+@pytest.mark.parametrize('rota, corpo', [('/api/cash-flow', _cenario()), ('/api/facility', {'rooms': [{'count': 1}]})])
+@pytest.mark.parametrize('taxa', [-1, -1.5])
+def test_taxa_de_desconto_invalida(cliente, rota, corpo, taxa):
+    assert cliente.post(rota, json={**corpo, 'discount_rate': taxa}).status_code == 400
+
+def test_monte_carlo_limita_amostras(cliente):
+    corpo = {**_cenario(), 'distributions': {'preco_venda_por_grama': {'type': 'normal', 'mean': 45, 'std': 5}}}
+    assert cliente.post('/api/monte-carlo', json={**corpo, 'samples': 1000}).status_code == 200
+    resposta = cliente.post('/api/monte-carlo', json={**corpo, 'samples': api.MAX_AMOSTRAS_MONTE_CARLO + 1})
+    assert resposta.status_code == 400
+    assert 'samples' in resposta.get_json()['error']
+
+def test_monte_carlo_sem_lucro_devolve_null(cliente):
+    corpo = {**_sem_lucro(), 'samples': 2000, 'seed': 1,
+             'distributions': {'custo_substrato': {'type': 'normal', 'mean': 100, 'std': 1}}}
+    resposta = cliente.post('/api/monte-carlo', json=corpo)
+    assert resposta.status_code == 200
+    payback = _json_estrito(resposta)['metricas']['periodo_payback_ciclos']
+    assert payback['prob_infinito'] == 1.0
+    assert payback['percentis']['p50'] is None and payback['media_finitos'] is None
+
+def test_facility_limita_horizonte(cliente):
+    resposta = cliente.post('/api/facility', json={'rooms': [{'count': 2}], 'years': MAX_ANOS + 1})
+    assert resposta.status_code == 400
+
+@pytest.mark.parametrize('equipamentos', [[1], ['ventilador'], {'power_kw': 1}])
+def test_facility_recusa_equipamento_invalido(cliente, equipamentos):
+    resposta = cliente.post('/api/facility', json={'rooms': [{'count': 2}], 'shared_equipment': equipamentos})
+    assert resposta.status_code == 400
+
+def test_facility_limita_janelas_da_carga_horaria(cliente):
+    corpo = {'rooms': [{'count': 1}] * 3000, 'light_start_hours': [i * 0.007 for i in range(3000)],
+             'years': MAX_ANOS, 'peak': True}
+    resposta = cliente.post('/api/facility', json=corpo)
+    assert resposta.status_code == 400
+    assert 'Janelas de luz' in resposta.get_json()['error']
+
+def test_lighting_fora_da_tabela_devolve_null(cliente):
+    corpo = {'width': [1, 3], 'depth': [1, 3], 'phase': 'floracao', 'light_type': 'led_padrao'}
+    resposta = cliente.post('/api/lighting', json=corpo)
+    assert resposta.status_code == 200
+    alturas = _json_estrito(resposta)['altura_min_cm']
+    assert alturas[0] is not None and alturas[1] is None
+
+@pytest.mark.parametrize('extra', [{'fixtures': 2000}, {'fixtures': [[0.5, 0.5]] * 1001},
+                                   {'fixtures': 1000, 'resolution_m': 0.002}])
+def test_lighting_map_limita_luminarias(cliente, extra):
+    corpo = {'width': 1, 'depth': 1, 'phase': 'floracao', 'light_type': 'led_padrao', 'height_cm': 40, **extra}
+    assert cliente.post('/api/lighting/map', json=corpo).status_code == 400
+
+def test_jobs_recusa_tipo_desconhecido(cliente):
+    assert cliente.post('/api/jobs', json={'type': 'inexistente', 'params': {}}).status_code == 400
+
+def test_fila_de_jobs_limitada():
+    gerenciador = GerenciadorJobs(num_workers=0, max_pendentes=2)
+    gerenciador.registrar_tipo('eco', lambda parametros, progresso: parametros)
+    gerenciador.submeter('eco', 1)
+    gerenciador.submeter('eco', 2)
+    with pytest.raises(FilaCheia):
+        gerenciador.submeter('eco', 3)
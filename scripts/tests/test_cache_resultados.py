@@ -0,0 +1,34 @@
+from dataclasses import replace
+
+import cache_resultados
+from cache_resultados import CacheResultados, chave_canonica
+from simulador_cultivo import SetupInvestimento, ParametrosCiclo, CustosMercado
+
+def test_chave_normaliza_inteiros_e_floats():
+    ciclo_int = replace(ParametrosCiclo(), potencia_watts=240, num_plantas=4)
+    ciclo_float = replace(ParametrosCiclo(), potencia_watts=240.0, num_plantas=4.0)
+    assert chave_canonica(SetupInvestimento(), ciclo_int, CustosMercado()) == \
+        chave_canonica(SetupInvestimento(), ciclo_float, CustosMercado())
+
+def test_chave_muda_com_qualquer_parametro():
+    base = chave_canonica(SetupInvestimento(), ParametrosCiclo(), CustosMercado())
+    assert chave_canonica(SetupInvestimento(), ParametrosCiclo(), replace(CustosMercado(), preco_kwh=0.91)) != base
+    assert chave_canonica(replace(SetupInvestimento(), area_m2=1.5), ParametrosCiclo(), CustosMercado()) != base
+
+def test_chave_inclui_impressao_do_motor(monkeypatch):
+    base = chave_canonica(SetupInvestimento(), ParametrosCiclo(), CustosMercado())
+    monkeypatch.setattr(cache_resultados, 'IMPRESSAO_MOTOR', 'outro-motor')
+    assert chave_canonica(SetupInvestimento(), ParametrosCiclo(), CustosMercado()) != base
+
+def test_cache_calcula_uma_vez_e_respeita_capacidade():
+    cache = CacheResultados(capacidade=2)
+    chamadas = []
+    def calcular(valor):
+        return lambda: chamadas.append(valor) or valor
+    assert cache.obter_ou_calcular('a', calcular(1)) == 1
+    assert cache.obter_ou_calcular('a', calcular(99)) == 1
+    cache.obter_ou_calcular('b', calcular(2))
+    cache.obter_ou_calcular('c', calcular(3))
+    # 'a' foi o menos usado recentemente e saiu
+    assert cache.obter_ou_calcular('a', calcular(4)) == 4
+    assert chamadas == [1, 2, 3, 4]
@@ -0,0 +1,63 @@
+import math
+from dataclasses import replace
+
+import pytest
+
+import benchmark
+from simulador_cultivo import (SetupInvestimento, ParametrosCiclo, CustosMercado, SimuladorCultivoCompleto,
+                               SimuladorLote, ROTULOS_RESULTADO)
+
+def _calcular(setup=None, ciclo=None, mercado=None):
+    return SimuladorCultivoCompleto(setup or SetupInvestimento(), ciclo or ParametrosCiclo(),
+                                    mercado or CustosMercado()).calcular()
+
+def test_cenario_padrao():
+    r = _calcular()
+    assert r.custo_total_investimento == 4800.0
+    assert r.producao_total_g == 300
+    assert r.receita_bruta_ciclo == 13500.0
+    assert r.lucro_liquido_ciclo == pytest.approx(12001.36)
+    assert r.periodo_payback_ciclos == pytest.approx(4800.0 / 12001.36)
+
+def test_simular_usa_rotulos_de_exibicao():
+    simulador = SimuladorCultivoCompleto(SetupInvestimento(), ParametrosCiclo(), CustosMercado())
+    resultados, r = simulador.simular(), simulador.calcular()
+    for campo, rotulo in ROTULOS_RESULTADO.items():
+        assert resultados[rotulo] == getattr(r, campo)
+
+def test_producao_zero():
+    r = _calcular(ciclo=replace(ParametrosCiclo(), producao_por_planta_g=0))
+    assert r.custo_por_grama == 0
+    assert r.lucro_liquido_ciclo < 0
+    assert r.periodo_payback_ciclos == math.inf
+
+def test_investimento_zero():
+    setup = SetupInvestimento(custo_equip_iluminacao=0.0, custo_tenda_estrutura=0.0,
+                              custo_ventilacao_exaustao=0.0, custo_outros_equipamentos=0.0)
+    r = _calcular(setup=setup)
+    assert r.custo_total_investimento == 0
+    assert r.periodo_payback_ciclos == 0
+    assert r.roi_investimento_1_ano == math.inf
+
+def test_lucro_negativo_sem_payback():
+    r = _calcular(mercado=replace(CustosMercado(), preco_venda_por_grama=1.0))
+    assert r.lucro_liquido_ciclo < 0
+    assert r.periodo_payback_ciclos == math.inf
+    assert r.roi_investimento_1_ano < -100
+
+def test_ciclo_de_duracao_zero_no_motor_escalar():
+    ciclo = replace(ParametrosCiclo(), dias_vegetativo=0, dias_floracao=0, dias_secagem_cura=0)
+    with pytest.raises(ZeroDivisionError):
+        _calcular(ciclo=ciclo)
+
+def test_lote_igual_ao_escalar():
+    cenarios = [benchmark._dataclasses(c) for c in benchmark.cenarios_aleatorios(200, semente=3)]
+    resultados = SimuladorLote.de_cenarios(cenarios).simular()
+    for i, cenario in enumerate(cenarios):
+        esperado = SimuladorCultivoCompleto(*cenario).calcular()._asdict()
+        for campo, valor in esperado.items():
+            assert resultados[campo][i] == pytest.approx(valor, rel=1e-12)
+
+def test_golden():
+    golden = benchmark.verificar_golden()
+    assert golden['ok'], golden['divergencias']